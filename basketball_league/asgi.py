@@ -13,4 +13,5 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'basketball_league.settings')
 
+# The live updates stream (/api/live/) is only served through this application.
 application = get_asgi_application()
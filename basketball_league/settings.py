@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 
@@ -50,18 +52,21 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'league.authentication.LeagueJWTAuthentication',
         # 'rest_framework.authentication.SessionAuthentication',
         # 'rest_framework.authentication.TokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
-    )
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'league.pagination.KeysetPagination',
 }
 
 SIMPLE_JWT = {
    'AUTH_HEADER_TYPES': ('JWT',),
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
+    # Role and team claims let read-only requests authenticate without a User query.
+    'TOKEN_OBTAIN_SERIALIZER': 'league.authentication.LeagueTokenObtainPairSerializer',
 }
 
 
@@ -117,6 +122,78 @@ DATABASES = {
     }
 }
 
+# `manage.py test` runs the test and query-budget suites on SQLite, so no MySQL server is needed.
+if len(sys.argv) > 1 and sys.argv[1] == 'test':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        }
+    }
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# The 'league' cache holds API responses. LEAGUE_CACHE_BACKEND=file or db shares it
+# between worker processes (db needs `manage.py createcachetable`).
+
+LEAGUE_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'league',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.league_cache',
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'league_cache',
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'league': LEAGUE_CACHE_BACKENDS[os.environ.get('LEAGUE_CACHE_BACKEND', 'locmem')],
+    # Token revocations (league.authentication), kept apart so responses never evict them.
+    'league-auth': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'league-auth',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+LEAGUE_CACHE_TIMEOUT = 300
+
+# Seconds a token revocation state read from the ClaimsRevocation table is trusted from
+# the 'league-auth' cache: how long other processes may still accept revoked claims
+# when that cache is process-local.
+LEAGUE_AUTH_REVOCATION_TTL = 10
+
+# Presence: a session without a heartbeat for LEAGUE_PRESENCE_TIMEOUT seconds counts as
+# ended. Heartbeats are recorded at most once per interval per session, and buffered
+# events are folded into the session/User tables at most once per flush interval
+# (or by `manage.py flush_presence` from cron).
+LEAGUE_PRESENCE_TIMEOUT = 300
+LEAGUE_PRESENCE_HEARTBEAT_INTERVAL = 60
+LEAGUE_PRESENCE_FLUSH_INTERVAL = 60
+
+# The aggregated user statistics are cached briefly; online counts move without writes.
+LEAGUE_USER_STATS_CACHE_TIMEOUT = 30
+
+# Live updates (/api/live/, served under ASGI). The broker class must provide
+# subscribe/unsubscribe/publish like league.live.LocalBroker, which only reaches
+# clients connected to the same process. A client more than LEAGUE_LIVE_QUEUE_SIZE
+# events behind is told to resync; idle streams get a comment every
+# LEAGUE_LIVE_KEEPALIVE seconds.
+LEAGUE_LIVE_BROKER = 'league.live.LocalBroker'
+LEAGUE_LIVE_QUEUE_SIZE = 100
+LEAGUE_LIVE_KEEPALIVE = 15
+LEAGUE_LIVE_MAX_TOPICS = 50
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
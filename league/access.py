@@ -0,0 +1,113 @@
+# access.py
+#
+# Request-scoped access context: the user's role and the ids of the teams they may
+# see, loaded once per request and shared by the permission classes and viewsets.
+# The team ids come from the token's claims when the request was authenticated from
+# them; otherwise they are read lazily and cached per user under the Team/Player
+# versions, so repeated requests from a coach or player do not look them up again.
+
+from functools import cached_property
+from django.db.models import Q
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .authentication import LeagueTokenUser
+from .caching import get_cache, get_versions
+from .models import Team, Player
+
+
+class AccessContext:
+    def __init__(self, request):
+        user = request.user
+        self.request = request
+        self.user = user
+        self.is_authenticated = bool(user and user.is_authenticated)
+        self.is_admin = self.is_authenticated and user.is_admin
+        self.is_coach = self.is_authenticated and user.is_coach
+        self.is_player = self.is_authenticated and user.is_player
+        self.is_staff = self.is_authenticated and user.is_staff
+
+    @cached_property
+    def memberships(self):
+        """
+        (ids of the teams the user coaches, id of the team they play for).
+        """
+        if not self.is_authenticated:
+            return frozenset(), None
+        if isinstance(self.user, LeagueTokenUser):
+            return self.user.memberships
+        versions = get_versions(self.request, (Team, Player))
+        key = 'league:access:%s:%s' % (self.user.pk, ':'.join(str(version) for version, _ in versions.values()))
+        cache = get_cache()
+        memberships = cache.get(key)
+        if memberships is None:
+            coached, player_team_id = set(), None
+            rows = Team.objects.filter(Q(coach_id=self.user.pk) | Q(players__user_id=self.user.pk)) \
+                .values_list('id', 'coach_id', 'players__user_id').distinct()
+            for team_id, coach_id, player_user_id in rows:
+                if coach_id == self.user.pk:
+                    coached.add(team_id)
+                if player_user_id == self.user.pk:
+                    player_team_id = team_id
+            memberships = (frozenset(coached), player_team_id)
+            cache.set(key, memberships)
+        return memberships
+
+    @property
+    def coached_team_ids(self):
+        return self.memberships[0]
+
+    @property
+    def player_team_id(self):
+        return self.memberships[1]
+
+    @property
+    def team_ids(self):
+        """
+        Ids of the teams whose rows the user may see, or None for every team.
+        """
+        if self.is_admin:
+            return None
+        team_ids = set(self.coached_team_ids)
+        if self.player_team_id is not None:
+            team_ids.add(self.player_team_id)
+        return frozenset(team_ids)
+
+    def filter(self, queryset, *team_lookups):
+        """
+        Restricts a queryset to rows whose team, through any of `team_lookups`, is visible.
+        """
+        team_ids = self.team_ids
+        if team_ids is None:
+            return queryset
+        condition = Q(pk__in=[])
+        for lookup in team_lookups:
+            condition |= Q(**{f'{lookup}__in': team_ids})
+        return queryset.filter(condition)
+
+    def coached_teams(self, queryset=None):
+        """
+        The teams a coach manages; every team for admins.
+        """
+        queryset = Team.objects.all() if queryset is None else queryset
+        if self.is_admin:
+            return queryset
+        return queryset.filter(id__in=self.coached_team_ids)
+
+
+def get_access(request):
+    """
+    The request's AccessContext, built on first use.
+    """
+    access = request.__dict__.get('_league_access')
+    if access is None:
+        access = request.__dict__['_league_access'] = AccessContext(request)
+    return access
+
+
+def get_view_access(request):
+    """
+    The AccessContext of a plain Django request (the async and streaming views),
+    authenticated with the API's authentication classes. Raises AuthenticationFailed.
+    """
+    authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    return get_access(Request(request, authenticators=authenticators))
@@ -1,49 +1,111 @@
+import datetime
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Team, Player, Game, PlayerGameParticipation, Score, Tournament, TournamentRound, RoundTeam
+from django.db.models import Q
+from .models import User, Team, Player, Game, PlayerGameParticipation, Score, Tournament, TournamentRound, RoundTeam, \
+    SearchEntry
+
+
+class IndexedSearchMixin:
+    """
+    Changelist search through the SearchEntry index instead of LIKE '%term%' scans over
+    joins. `search_index` maps lookups to index kinds; a row matches when the object at
+    any of the lookups matches. `search_like_fields` are not indexed and keep the usual
+    substring match. `search_date_field` matches a YYYY, YYYY-MM or YYYY-MM-DD term as
+    the year, month or day it names.
+    """
+    search_index = {}
+    search_like_fields = ()
+    search_date_field = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        condition = Q()
+        for lookup, kind in self.search_index.items():
+            matches = SearchEntry.objects.matching(search_term, [kind]).values('object_id')
+            condition |= Q(**{f'{lookup}__in': matches})
+        for field in self.search_like_fields:
+            condition |= Q(**{f'{field}__icontains': search_term.strip()})
+        if self.search_date_field is not None:
+            days = date_range(search_term.strip())
+            if days is not None:
+                condition |= Q(**{f'{self.search_date_field}__gte': days[0],
+                                  f'{self.search_date_field}__lt': days[1]})
+        return queryset.filter(condition), False
+
+
+def date_range(term):
+    """
+    [first day, first day after) of the year, month or day a YYYY[-MM[-DD]] term names,
+    or None for anything else.
+    """
+    parts = term.split('-')
+    if not 1 <= len(parts) <= 3 or not all(part.isdigit() for part in parts) or len(parts[0]) != 4:
+        return None
+    try:
+        if len(parts) == 1:
+            start = datetime.date(int(parts[0]), 1, 1)
+            return start, start.replace(year=start.year + 1)
+        if len(parts) == 2:
+            start = datetime.date(int(parts[0]), int(parts[1]), 1)
+            return start, (start + datetime.timedelta(days=31)).replace(day=1)
+        start = datetime.date(*map(int, parts))
+        return start, start + datetime.timedelta(days=1)
+    except (ValueError, OverflowError):
+        return None
+
 
 # User Admin
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(IndexedSearchMixin, BaseUserAdmin):
     list_display = ('username', 'email', 'is_admin', 'is_coach', 'is_player')
     list_filter = ('is_admin', 'is_coach', 'is_player')
     search_fields = ('username', 'email')
+    search_index = {'pk': 'user'}
+    search_like_fields = ('email',)
 
 # Team Admin
 @admin.register(Team)
-class TeamAdmin(admin.ModelAdmin):
+class TeamAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('name', 'coach', 'average_score')
     search_fields = ('name',)
-    list_select_related = ('coach',)
+    search_index = {'pk': 'team'}
+    list_select_related = ('coach', 'stats')
 
 # Player Admin
 @admin.register(Player)
-class PlayerAdmin(admin.ModelAdmin):
+class PlayerAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('user', 'team', 'name', 'height', 'average_score')
     list_filter = ('team',)
     search_fields = ('name', 'user__username')
+    search_index = {'pk': 'player', 'user': 'user'}
     list_select_related = ('team',)  # Optimizes query to fetch related team objects
 
 # Game Admin
 @admin.register(Game)
-class GameAdmin(admin.ModelAdmin):
+class GameAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('date', 'location', 'referee', 'team_a', 'team_b', 'team_a_score', 'team_b_score')
     list_filter = ('date', 'location')
-    search_fields = ('team_a__name', 'team_b__name')
+    search_fields = ('team_a__name', 'team_b__name', 'location', 'referee')
+    search_index = {'team_a': 'team', 'team_b': 'team', 'pk': 'game'}
 
 # PlayerGameParticipation Admin
 @admin.register(PlayerGameParticipation)
-class PlayerGameParticipationAdmin(admin.ModelAdmin):
+class PlayerGameParticipationAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('player', 'game', 'team', 'points_scored')
     list_filter = ('game', 'team')
     search_fields = ('player__name', 'team__name')
+    search_index = {'player': 'player', 'team': 'team'}
 
 # Score Admin
 @admin.register(Score)
-class ScoreAdmin(admin.ModelAdmin):
+class ScoreAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('player', 'game', 'score')
     list_filter = ('game', 'player')
     search_fields = ('player__name', 'game__date')
+    search_index = {'player': 'player'}
+    search_date_field = 'game__date'
 
 class ScoreInline(admin.TabularInline):
     model = Score
@@ -56,10 +118,11 @@ class PlayerGameParticipationInline(admin.TabularInline):
 # class GameAdmin(admin.ModelAdmin):
 #     inlines = [PlayerGameParticipationInline, ScoreInline]
 
-class GameAdmin(admin.ModelAdmin):
+class GameAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('date', 'location', 'referee', 'team_a', 'team_b', 'team_a_score', 'team_b_score')
     list_filter = ('date', 'location')
-    search_fields = ('team_a__name', 'team_b__name')
+    search_fields = ('team_a__name', 'team_b__name', 'location', 'referee')
+    search_index = {'team_a': 'team', 'team_b': 'team', 'pk': 'game'}
     inlines = [PlayerGameParticipationInline, ScoreInline]
 
 admin.site.unregister(Game)
@@ -70,10 +133,11 @@ class TournamentRoundInline(admin.TabularInline):
     extra = 1 
 
 @admin.register(Tournament)
-class TournamentAdmin(admin.ModelAdmin):
+class TournamentAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'start_date', 'end_date', 'champion')
     list_filter = ('start_date', 'end_date', 'champion')
     search_fields = ('name',)
+    search_index = {'pk': 'tournament'}
     inlines = [TournamentRoundInline]
 
 class RoundTeamInline(admin.TabularInline):
@@ -87,7 +151,8 @@ class TournamentRoundAdmin(admin.ModelAdmin):
     inlines = [RoundTeamInline]
 
 @admin.register(RoundTeam)
-class RoundTeamAdmin(admin.ModelAdmin):
+class RoundTeamAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'round', 'team', 'eliminated')
     list_filter = ('round', 'eliminated')
-    search_fields = ('round__tournament__name', 'team__name')
\ No newline at end of file
+    search_fields = ('round__tournament__name', 'team__name')
+    search_index = {'round__tournament': 'tournament', 'team': 'team'}
\ No newline at end of file
@@ -0,0 +1,104 @@
+# archive.py
+#
+# Moves closed seasons out of the hot Game, Score and PlayerGameParticipation tables
+# into the archive tables, keeping their ids, and stores a precomputed summary on the
+# Season. The season's standings stay in the Standing table, and TeamStats, player
+# score totals and games_participated do not change: their rebuilds count the
+# archive tables too.
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from .models import Game, Score, PlayerGameParticipation, Season, Standing, ArchivedGame, ArchivedScore, \
+    ArchivedParticipation, ModelVersion, SearchEntry
+
+BATCH_SIZE = 5000
+TOP_SCORERS = 10
+
+GAME_FIELDS = ('id', 'season_id', 'date', 'location', 'referee', 'team_a_id', 'team_b_id', 'team_a_score',
+               'team_b_score', 'source_ref')
+SCORE_FIELDS = ('id', 'season_id', 'game_id', 'player_id', 'score')
+PARTICIPATION_FIELDS = ('id', 'season_id', 'game_id', 'player_id', 'team_id', 'points_scored')
+
+
+def archivable_seasons(today=None):
+    """
+    Years of the seasons that are over and still in the hot tables.
+    """
+    today = today or timezone.localdate()
+    return list(Season.objects.filter(end_date__lte=today, archived_at__isnull=True)
+                .order_by('year').values_list('year', flat=True))
+
+
+def summarize(season):
+    totals = Game.objects.filter(season_id=season).aggregate(
+        games=Count('id'), points=Sum(F('team_a_score') + F('team_b_score')))
+    standings = [
+        {'rank': row['rank'], 'team': {'id': row['team_id'], 'name': row['team__name']},
+         'wins': row['wins'], 'losses': row['losses'], 'draws': row['draws'],
+         'points_for': row['points_for'], 'points_against': row['points_against']}
+        for row in Standing.objects.filter(season=season).order_by('rank').values(
+            'rank', 'team_id', 'team__name', 'wins', 'losses', 'draws', 'points_for', 'points_against')
+    ]
+    top_scorers = [
+        {'player': {'id': row['player_id'], 'name': row['player__name']}, 'team_id': row['team_id'],
+         'points': row['points'], 'games': row['games']}
+        for row in PlayerGameParticipation.objects.filter(season_id=season)
+        .values('player_id', 'player__name', 'team_id')
+        .annotate(points=Sum('points_scored'), games=Count('id'))
+        .order_by('-points', 'player_id')[:TOP_SCORERS]
+    ]
+    return {
+        'games': totals['games'],
+        'points': totals['points'] or 0,
+        'champion': standings[0]['team'] if standings else None,
+        'standings': standings,
+        'top_scorers': top_scorers,
+    }
+
+
+def _copy(queryset, fields, model, batch_size):
+    copied = 0
+    batch = []
+    for row in queryset.order_by('id').values(*fields).iterator(chunk_size=batch_size):
+        batch.append(model(**row))
+        if len(batch) == batch_size:
+            model.objects.bulk_create(batch)
+            copied += len(batch)
+            batch = []
+    model.objects.bulk_create(batch)
+    return copied + len(batch)
+
+
+def archive_season(season, batch_size=BATCH_SIZE, today=None):
+    """
+    Archives one closed season in a single transaction. Returns the number of games,
+    scores and participations moved; raises ValueError for unknown or running seasons.
+    """
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        row = Season.objects.select_for_update().filter(pk=season).first()
+        if row is None:
+            raise ValueError(f'Unknown season {season}.')
+        if row.archived_at is not None:
+            return {'games': 0, 'scores': 0, 'participations': 0}
+        if row.end_date > today:
+            raise ValueError(f'Season {season} is not over yet.')
+
+        Standing.objects.refresh(season)
+        row.summary = summarize(season)
+        moved = {
+            'games': _copy(Game.objects.filter(season_id=season), GAME_FIELDS, ArchivedGame, batch_size),
+            'scores': _copy(Score.objects.filter(season_id=season), SCORE_FIELDS, ArchivedScore, batch_size),
+            'participations': _copy(PlayerGameParticipation.objects.filter(season_id=season),
+                                    PARTICIPATION_FIELDS, ArchivedParticipation, batch_size),
+        }
+        SearchEntry.objects.remove(Game, Game.objects.filter(season_id=season).values('id'))
+        for model in (Score, PlayerGameParticipation, Game):
+            queryset = model.objects.filter(season_id=season)
+            # No delete signals: they would take the season back out of TeamStats and the player totals.
+            queryset._raw_delete(queryset.db)
+        row.archived_at = timezone.now()
+        row.save(update_fields=['summary', 'archived_at'])
+    ModelVersion.objects.bump(Game, Score, PlayerGameParticipation)
+    return moved
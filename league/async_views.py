@@ -0,0 +1,152 @@
+# async_views.py
+#
+# Async versions of the high-traffic GETs for the ASGI app, under /api/async/. They
+# render the same JSON as their DRF counterparts but use the async ORM, so a request
+# waiting on the database does not hold a worker thread, and independent queries are
+# issued together with asyncio.gather. They are not response-cached and take no
+# ?fields=/?expand= parameters; the DRF endpoints remain the full-featured path.
+
+import asyncio
+from asgiref.sync import sync_to_async
+from django.db.models import Q, Subquery
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from . import readers
+from .access import get_view_access
+from .models import User, Team, Player, Game, Standing, TournamentSnapshot
+
+
+def json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    # The DRF renderer keeps the bytes identical to the sync endpoints.
+    return HttpResponse(JSONRenderer().render(data), status=status_code, headers=headers,
+                        content_type='application/json')
+
+
+def error(message, status_code):
+    return json_response({'error': message}, status_code)
+
+
+def requires(check):
+    """
+    Authenticates the request like the API views and applies `check(access)`.
+    """
+    def decorator(view):
+        async def wrapper(request, *args, **kwargs):
+            try:
+                access = await sync_to_async(get_view_access)(request)
+            except AuthenticationFailed as exc:
+                return error(str(exc.detail), status.HTTP_401_UNAUTHORIZED)
+            if not access.is_authenticated:
+                return error('Authentication credentials were not provided.', status.HTTP_401_UNAUTHORIZED)
+            if not check(access):
+                return error('You do not have permission to perform this action.', status.HTTP_403_FORBIDDEN)
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def any_role(access):
+    return access.is_admin or access.is_coach or access.is_player
+
+
+def admin_staff(access):
+    return access.is_admin and access.is_staff
+
+
+async def alist(queryset):
+    return [row async for row in queryset.aiterator()]
+
+
+@requires(any_role)
+async def game_details(request, pk):
+    """
+    GameDetailsSerializer's shape: the game row and both rosters, fetched concurrently.
+    """
+    sides = ('team_a', 'team_b')
+    game, players = await asyncio.gather(
+        Game.objects.filter(pk=pk).values(
+            'date', 'location', 'team_a_id', 'team_b_id', 'team_a_score', 'team_b_score',
+            *(f'{side}__{field}' for side in sides for field in ('name', 'coach__username'))).afirst(),
+        alist(Player.objects.filter(Q(team__in=Game.objects.filter(pk=pk).values('team_a'))
+                                    | Q(team__in=Game.objects.filter(pk=pk).values('team_b')))
+              .order_by('id').values('id', 'name', 'team_id')),
+    )
+    if game is None:
+        return error('Not found.', status.HTTP_404_NOT_FOUND)
+
+    def team(side):
+        return {
+            'name': game[f'{side}__name'],
+            'coach_name': game[f'{side}__coach__username'],
+            'players': [{'id': row['id'], 'name': row['name']}
+                        for row in players if row['team_id'] == game[f'{side}_id']],
+        }
+    if game['team_a_score'] > game['team_b_score']:
+        winner = game['team_a__name']
+    elif game['team_b_score'] > game['team_a_score']:
+        winner = game['team_b__name']
+    else:
+        winner = 'Draw'
+    return json_response({
+        'date': game['date'].isoformat(),
+        'location': game['location'],
+        'team_a': team('team_a'),
+        'team_b': team('team_b'),
+        'team_a_score': game['team_a_score'],
+        'team_b_score': game['team_b_score'],
+        'winner': winner,
+    })
+
+
+@requires(admin_staff)
+async def team_details(request, pk):
+    """
+    TeamSerializer's shape: team, coach and players, fetched concurrently.
+    """
+    team, coach, players = await asyncio.gather(
+        Team.objects.filter(pk=pk).values('id', 'name', 'stats__games_played', 'stats__points_for').afirst(),
+        User.objects.filter(coached_teams=pk).values(*readers.USER_FIELDS).afirst(),
+        alist(Player.objects.filter(team_id=pk).order_by('id').values(*readers.PLAYER_FIELDS)),
+    )
+    if team is None:
+        return error('Not found.', status.HTTP_404_NOT_FOUND)
+    games_played = team['stats__games_played']
+    return json_response({
+        'id': team['id'],
+        'name': team['name'],
+        'coach': coach,
+        'players': [readers.player_dict(row) for row in players],
+        'average_score': team['stats__points_for'] / games_played if games_played else 0,
+    })
+
+
+@requires(lambda access: True)
+async def tournament_structure(request, pk):
+    """
+    Served from the tournament's snapshot; only a missing or invalidated snapshot is
+    rebuilt, on a worker thread.
+    """
+    snapshot = await TournamentSnapshot.objects.filter(tournament_id=pk, payload__isnull=False).afirst()
+    if snapshot is None:
+        snapshot = await sync_to_async(readers.tournament_snapshot)(pk)
+        if snapshot is None:
+            return error('Not found.', status.HTTP_404_NOT_FOUND)
+    etag = f'"{snapshot.etag}"'
+    headers = {'ETag': etag, 'X-Snapshot-Version': str(snapshot.version)}
+    if etag in request.headers.get('If-None-Match', ''):
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return json_response(snapshot.payload['rounds'], headers=headers)
+
+
+@requires(any_role)
+async def standings(request):
+    try:
+        season = int(request.GET['season']) if 'season' in request.GET else None
+    except ValueError:
+        return error('season must be a year', status.HTTP_400_BAD_REQUEST)
+    if season is None:
+        season = Subquery(Standing.objects.order_by('-season').values('season')[:1])
+    rows = Standing.objects.filter(season=season).select_related('team').order_by('rank')
+    return json_response([readers.standing_dict(row) async for row in rows.aiterator()])
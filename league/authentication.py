@@ -0,0 +1,189 @@
+# authentication.py
+#
+# JWT authentication with a query-free path for reads. Tokens carry the user's role
+# flags and team memberships as claims; safe requests are authenticated from those
+# claims alone. Writes, and tokens whose claims were revoked because the user, their
+# player row or the teams changed since the token was issued, load the User row.
+# Revocations are stored in the ClaimsRevocation table and mirrored in the
+# 'league-auth' cache for LEAGUE_AUTH_REVOCATION_TTL seconds. A revocation state the
+# cache cannot confirm (evicted, expired, or never loaded by this process) is read
+# from the table, so a process-local cache delays other workers by at most the TTL
+# and never trusts revoked claims because an entry was culled.
+
+import time
+from collections import OrderedDict
+from functools import cached_property
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .models import Team, Player, ClaimsRevocation
+
+AUTH_CACHE_ALIAS = 'league-auth'
+CLAIMS_AT = 'league_claims_at'
+ROLE_CLAIMS = ('is_admin', 'is_coach', 'is_player', 'is_staff')
+REVOKED_KEY = 'league:auth:revoked:%s'
+
+
+def get_auth_cache():
+    return caches[AUTH_CACHE_ALIAS]
+
+
+def add_league_claims(token, user):
+    token[CLAIMS_AT] = time.time()
+    token['username'] = user.username
+    for claim in ROLE_CLAIMS:
+        token[claim] = bool(getattr(user, claim))
+    token['coached_team_ids'] = sorted(Team.objects.filter(coach=user).values_list('id', flat=True))
+    token['player_team_id'] = Player.objects.filter(user=user).values_list('team_id', flat=True).first()
+    return token
+
+
+def revoke_claims(user_id=None):
+    """
+    Stops trusting the claims of tokens issued so far, for one user or (None) everybody.
+    """
+    subject = ClaimsRevocation.EVERYONE if user_id is None else int(user_id)
+    revoked_at = time.time()
+    ClaimsRevocation.objects.bulk_create([ClaimsRevocation(user_id=subject, revoked_at=revoked_at)],
+                                         update_conflicts=True, unique_fields=['user_id'],
+                                         update_fields=['revoked_at'])
+    get_auth_cache().set(REVOKED_KEY % subject, revoked_at, timeout=settings.LEAGUE_AUTH_REVOCATION_TTL)
+    if user_id is None:
+        fallback_users.clear()
+    else:
+        fallback_users.discard(str(user_id))
+
+
+def revoke_claims_of(user_ids):
+    """
+    revoke_claims() for many users at once, for bulk paths that skip the User signals.
+    """
+    revoked_at = time.time()
+    ClaimsRevocation.objects.bulk_create(
+        [ClaimsRevocation(user_id=user_id, revoked_at=revoked_at) for user_id in user_ids], batch_size=1000,
+        update_conflicts=True, unique_fields=['user_id'], update_fields=['revoked_at'])
+    get_auth_cache().set_many({REVOKED_KEY % user_id: revoked_at for user_id in user_ids},
+                              timeout=settings.LEAGUE_AUTH_REVOCATION_TTL)
+    for user_id in user_ids:
+        fallback_users.discard(str(user_id))
+
+
+def revocation_times(user_id):
+    """
+    {subject: revoked_at (0: never)} for the user and everybody; from the auth cache,
+    or from the table for whatever the cache cannot confirm.
+    """
+    keys = {REVOKED_KEY % subject: subject for subject in (ClaimsRevocation.EVERYONE, int(user_id))}
+    cache = get_auth_cache()
+    found = cache.get_many(list(keys))
+    missing = {key: subject for key, subject in keys.items() if key not in found}
+    if missing:
+        stored = dict(ClaimsRevocation.objects.filter(user_id__in=missing.values())
+                      .values_list('user_id', 'revoked_at'))
+        loaded = {key: stored.get(subject, 0) for key, subject in missing.items()}
+        cache.set_many(loaded, timeout=settings.LEAGUE_AUTH_REVOCATION_TTL)
+        found.update(loaded)
+    return {keys[key]: revoked_at for key, revoked_at in found.items()}
+
+
+class LeagueTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # Claims on the refresh token are copied into every access token refreshed from it.
+        return add_league_claims(super().get_token(user), user)
+
+
+class LeagueTokenUser(TokenUser):
+    """
+    A user built from the token's claims; has no database row behind it.
+    """
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def is_admin(self):
+        return self.token.get('is_admin', False)
+
+    @cached_property
+    def is_coach(self):
+        return self.token.get('is_coach', False)
+
+    @cached_property
+    def is_player(self):
+        return self.token.get('is_player', False)
+
+    @cached_property
+    def memberships(self):
+        return frozenset(self.token.get('coached_team_ids', ())), self.token.get('player_team_id')
+
+
+class UserLRU:
+    """
+    Small in-process LRU of User rows loaded by the fallback path, kept for `ttl` seconds.
+    """
+    def __init__(self, maxsize=256, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    def get(self, user_id):
+        entry = self.entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            self.entries.pop(user_id, None)
+            return None
+        self.entries.move_to_end(user_id)
+        return entry[1]
+
+    def set(self, user_id, user):
+        self.entries[user_id] = (time.monotonic() + self.ttl, user)
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def discard(self, user_id):
+        self.entries.pop(user_id, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+fallback_users = UserLRU()
+
+
+class LeagueJWTAuthentication(JWTAuthentication):
+    """
+    Safe requests with trusted claims get a LeagueTokenUser and cost no queries. Writes
+    always load the User row; reads with revoked claims load it through fallback_users.
+    """
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        token = self.get_validated_token(raw_token)
+
+        if request.method not in SAFE_METHODS:
+            return self.get_user(token), token
+        if self.claims_trusted(token):
+            return LeagueTokenUser(token), token
+
+        user_id = str(token.get(api_settings.USER_ID_CLAIM))
+        user = fallback_users.get(user_id)
+        if user is None:
+            user = self.get_user(token)
+            fallback_users.set(user_id, user)
+        return user, token
+
+    def claims_trusted(self, token):
+        claims_at = token.get(CLAIMS_AT)
+        if claims_at is None or api_settings.USER_ID_CLAIM not in token:
+            return False
+        revoked = revocation_times(token[api_settings.USER_ID_CLAIM])
+        return all(claims_at > revoked_at for revoked_at in revoked.values())
@@ -0,0 +1,172 @@
+# caching.py
+#
+# Response caching and conditional GET for read-heavy endpoints. Both are driven by
+# the ModelVersion counters the model signals bump: cache keys and ETags include the
+# versions of every model an endpoint depends on, so a write makes the dependent
+# entries unreachable without pattern deletes. That works the same on the locmem,
+# file and database cache backends and across worker processes.
+
+import functools
+import hashlib
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import http_date, parse_http_date_safe, parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+from .models import ModelVersion
+
+CACHE_ALIAS = 'league'
+
+stats = Counter()
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def get_versions(request, models):
+    """
+    {label: (version, modified_at)} for the models, read once per request.
+    """
+    known = request.__dict__.setdefault('_league_versions', {})
+    missing = [model for model in models if model._meta.label_lower not in known]
+    if missing:
+        known.update(ModelVersion.objects.current(missing))
+    return {model._meta.label_lower: known[model._meta.label_lower] for model in models}
+
+
+def request_scope(request, scope):
+    """
+    'shared': one entry for every caller; 'role': admins share one entry, everyone else
+    gets their own; 'user': one entry per user.
+    """
+    if scope == 'shared':
+        return 'shared'
+    user = request.user
+    if scope == 'role' and user.is_admin:
+        return 'admin'
+    return f'user:{user.pk}'
+
+
+def request_digest(request, models, scope):
+    params = sorted(request.query_params.lists())
+    raw = '|'.join([
+        request.get_host(),
+        request.path,
+        repr(params),
+        request_scope(request, scope),
+        repr(sorted(get_versions(request, models).items())),
+    ])
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def cache_response(*models, scope='shared', name=None, timeout=None):
+    """
+    Caches a view method's successful response data.
+
+    models: the models whose changes invalidate the entry.
+    scope: 'shared' when every permitted caller sees the same data, 'role' when admins
+    share one entry and everyone else gets their own (e.g. coaches' own teams).
+    timeout: seconds, for data that also changes without a version bump; defaults to
+    LEAGUE_CACHE_TIMEOUT.
+    """
+    def decorator(method):
+        endpoint = name or method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            cache = get_cache()
+            key = 'league:response:' + request_digest(request, models, scope)
+            data = cache.get(key)
+            if data is not None:
+                stats[f'{endpoint}:hits'] += 1
+                return Response(data, headers={'X-Cache': 'HIT'})
+
+            stats[f'{endpoint}:misses'] += 1
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout=timeout or settings.LEAGUE_CACHE_TIMEOUT)
+                response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    hits = sum(count for key, count in stats.items() if key.endswith(':hits'))
+    misses = sum(count for key, count in stats.items() if key.endswith(':misses'))
+    endpoints = {}
+    for key, count in stats.items():
+        endpoint, kind = key.rsplit(':', 1)
+        endpoints.setdefault(endpoint, {'hits': 0, 'misses': 0})[kind] = count
+    return {
+        'backend': settings.CACHES[CACHE_ALIAS]['BACKEND'],
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / (hits + misses) if hits + misses else None,
+        'endpoints': endpoints,
+    }
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+    def __init__(self, headers):
+        super().__init__()
+        self.headers = headers
+
+
+class ConditionalGetMixin:
+    """
+    Answers If-None-Match / If-Modified-Since with 304 right after authentication and
+    permission checks, before any queryset or serializer work. The validators come from
+    the versions of `version_models`, so an unchanged poll costs one small query.
+    """
+    version_models = ()
+    conditional_actions = None  # None: every GET action
+
+    def get_validators(self, request):
+        versions = get_versions(request, self.version_models)
+        # ETags are per user: they are never shared, and scoped endpoints differ per caller.
+        etag = '"%s"' % request_digest(request, self.version_models, scope='user')
+        modified = [modified_at for _, modified_at in versions.values() if modified_at is not None]
+        last_modified = max(modified) if len(modified) == len(versions) else None
+        return etag, last_modified
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.conditional_headers = None
+        if request.method != 'GET' or not self.version_models:
+            return
+        if self.conditional_actions is not None and self.action not in self.conditional_actions:
+            return
+
+        etag, last_modified = self.get_validators(request)
+        self.conditional_headers = {'ETag': etag}
+        if last_modified is not None:
+            self.conditional_headers['Last-Modified'] = http_date(last_modified.timestamp())
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            if etag in parse_etags(if_none_match) or if_none_match.strip() == '*':
+                raise NotModified(self.conditional_headers)
+            return
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        if last_modified is not None and if_modified_since is not None \
+                and int(last_modified.timestamp()) <= if_modified_since:
+            raise NotModified(self.conditional_headers)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=exc.headers)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        headers = getattr(self, 'conditional_headers', None)
+        if headers and response.status_code == 200:
+            for header, value in headers.items():
+                response.setdefault(header, value)
+        return response
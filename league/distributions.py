@@ -0,0 +1,229 @@
+# distributions.py
+#
+# Distribution statistics (count, min, max, mean, percentiles, quantile cut points and
+# histograms) of box-score points, game scores and player heights, league-wide or per
+# team or season. Count/min/max/mean and the histogram buckets are GROUP BY queries on
+# every backend. Percentiles use PERCENTILE_CONT where the backend has it; elsewhere
+# they come from one pass over the values in sorted order, read in keyset chunks, that
+# keeps only the values at the ranks it needs, so memory does not grow with the table
+# on any driver. Both give PERCENTILE_CONT's linear interpolation. Results are cached
+# per version of the source tables.
+#
+# Points and score statistics cover the live and the archive tables: both together,
+# or only the one holding `season` when a season is given. Statistics over both are
+# merged per group; their percentiles come from one pass over the two tables' sorted
+# values merged into a single order, as PERCENTILE_CONT cannot span two tables.
+
+import hashlib
+import heapq
+import math
+from collections import Counter, namedtuple
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, Max, Min, FloatField, IntegerField, Q, Value
+from django.db.models.functions import Cast, Floor, Least
+from .caching import get_cache
+from .models import Player, Score, PlayerGameParticipation, ArchivedScore, ArchivedParticipation, Season, \
+    ModelVersion
+from .utils import Percentile, PERCENTILE_VENDORS
+
+# archive: the season archive table, or None for metrics without seasons; team: the
+# lookup to the team; versions: the models whose changes invalidate the cached results.
+Metric = namedtuple('Metric', ['model', 'archive', 'field', 'team', 'versions'])
+
+METRICS = {
+    'points': Metric(PlayerGameParticipation, ArchivedParticipation, 'points_scored', 'team',
+                     (PlayerGameParticipation,)),
+    'score': Metric(Score, ArchivedScore, 'score', 'player__team', (Score, Player)),
+    'height': Metric(Player, None, 'height', 'team', (Player,)),
+}
+GROUPINGS = ('team', 'season')
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90, 99)
+MAX_QUANTILES = 100
+MAX_BINS = 100
+# Rows per query of the ordered percentile pass. Each query sorts what is left of the
+# table again, so chunks are large: memory stays bounded, the pass takes ~2x one sort.
+CHUNK_SIZE = 50000
+
+
+def distribution(metric, group_by=None, season=None, team=None, percentiles=DEFAULT_PERCENTILES, quantiles=4,
+                 bins=10):
+    """
+    percentiles: 0-100; quantiles: number of equal-count buckets to give cut points for;
+    bins: number of equal-width histogram bins, shared by every group. Raises ValueError
+    for unknown metrics or groupings and out-of-range parameters.
+    """
+    source = METRICS.get(metric)
+    if source is None:
+        raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+    if group_by is not None and group_by not in GROUPINGS:
+        raise ValueError(f"group_by must be one of {', '.join(GROUPINGS)}")
+    if source.archive is None and (season is not None or group_by == 'season'):
+        raise ValueError(f'{metric} has no seasons')
+    percentiles = sorted(set(percentiles))
+    if not all(0 <= percentile <= 100 for percentile in percentiles):
+        raise ValueError('percentiles must be within 0-100')
+    if not 1 <= quantiles <= MAX_QUANTILES or not 1 <= bins <= MAX_BINS:
+        raise ValueError(f'quantiles must be within 1-{MAX_QUANTILES} and bins within 1-{MAX_BINS}')
+
+    params = (metric, group_by, season, team, tuple(percentiles), quantiles, bins)
+    versions = ModelVersion.objects.current(source.versions)
+    key = 'league:distribution:' + hashlib.md5(repr((params, sorted(versions.items()))).encode()).hexdigest()
+    cache = get_cache()
+    result = cache.get(key)
+    if result is None:
+        with transaction.atomic():
+            result = _compute(source, *params)
+        cache.set(key, result, timeout=settings.LEAGUE_CACHE_TIMEOUT)
+    return result
+
+
+def _compute(source, metric, group_by, season, team, percentiles, quantiles, bins):
+    models = [source.model]
+    if source.archive is not None:
+        archived = set(Season.objects.filter(archived_at__isnull=False).values_list('year', flat=True))
+        if season is not None:
+            models = [source.archive if season in archived else source.model]
+        elif archived:
+            models.append(source.archive)
+    querysets = []
+    for model in models:
+        queryset = model.objects.order_by()
+        if season is not None:
+            queryset = queryset.filter(season_id=season)
+        if team is not None:
+            queryset = queryset.filter(**{source.team: team})
+        querysets.append(queryset)
+    group = {'team': source.team, 'season': 'season'}.get(group_by)
+    value = Cast(source.field, FloatField())
+
+    cut_points = [k / quantiles for k in range(1, quantiles)]
+    fractions = sorted({percentile / 100 for percentile in percentiles} | {0.5} | set(cut_points))
+    aggregates = {'count': Count(source.field), 'min': Min(value), 'max': Max(value), 'mean': Avg(value)}
+    native = connection.vendor in PERCENTILE_VENDORS and len(querysets) == 1
+    if native:
+        aggregates.update({f'p{index}': Percentile(value, fraction) for index, fraction in enumerate(fractions)})
+    stats = {}
+    for queryset in querysets:
+        if group is None:
+            rows = [{'key': None, **queryset.aggregate(**aggregates)}]
+        else:
+            rows = queryset.values(key=F(group)).annotate(**aggregates).order_by('key')
+        for row in rows:
+            if row['count']:
+                _merge_stats(stats, row)
+    if not stats:
+        return {'metric': metric, 'group_by': group_by, 'season': season, 'team': team, 'bin_edges': [],
+                'groups': []}
+    if len(querysets) > 1 and group is not None:
+        stats = dict(sorted(stats.items()))
+
+    if native:
+        for row in stats.values():
+            row['values'] = {fraction: row[f'p{index}'] for index, fraction in enumerate(fractions)}
+    else:
+        _stream_percentiles(querysets, group, source.field, stats, fractions)
+
+    low = min(row['min'] for row in stats.values())
+    high = max(row['max'] for row in stats.values())
+    width = (high - low) / bins or 1.0
+    bucket = Least(Cast(Floor((value - Value(low)) / Value(width)), IntegerField()), Value(bins - 1))
+    keys = {'key': F(group)} if group is not None else {}
+    histogram = Counter()
+    for queryset in querysets:
+        for row in queryset.values(**keys, bucket=bucket).annotate(count=Count('pk')):
+            histogram[row.get('key'), row['bucket']] += row['count']
+
+    groups = []
+    for key, row in stats.items():
+        values = row['values']
+        groups.append({
+            **({group_by: key} if group_by is not None else {}),
+            'count': row['count'],
+            'min': row['min'],
+            'max': row['max'],
+            'mean': row['mean'],
+            'median': values[0.5],
+            'percentiles': {f'{percentile:g}': values[percentile / 100] for percentile in percentiles},
+            'quantiles': [values[fraction] for fraction in cut_points],
+            'histogram': [histogram.get((key, index), 0) for index in range(bins)],
+        })
+    return {
+        'metric': metric,
+        'group_by': group_by,
+        'season': season,
+        'team': team,
+        'bin_edges': [low + index * width for index in range(bins + 1)],
+        'groups': groups,
+    }
+
+
+def _merge_stats(stats, row):
+    """
+    Folds one table's count/min/max/mean row into the group's row in `stats`.
+    """
+    merged = stats.setdefault(row['key'], row)
+    if merged is row:
+        return
+    count = merged['count'] + row['count']
+    merged['mean'] = (merged['mean'] * merged['count'] + row['mean'] * row['count']) / count
+    merged['count'] = count
+    merged['min'] = min(merged['min'], row['min'])
+    merged['max'] = max(merged['max'], row['max'])
+
+
+def _stream_percentiles(querysets, group, field, stats, fractions):
+    """
+    Fills in each group's row['values'] {fraction: percentile} from one ordered pass
+    over the querysets' merged rows, keeping only the values at the two ranks around
+    each percentile's position.
+    """
+    positions = {}
+    for key, row in stats.items():
+        positions[key] = [(fraction, fraction * (row['count'] - 1)) for fraction in fractions]
+        row['ranks'] = {rank for _, position in positions[key]
+                        for rank in (math.floor(position), math.ceil(position))}
+        row['picked'] = {}
+
+    fields = [group, field] if group is not None else [field]
+    current, index, row = object(), 0, None
+    for values in heapq.merge(*(_sorted_rows(queryset, fields) for queryset in querysets)):
+        key = values[0] if group is not None else None
+        if key != current:
+            current, index, row = key, 0, stats[key]
+        if index in row['ranks']:
+            row['picked'][index] = float(values[-2])
+        index += 1
+
+    for key, row in stats.items():
+        picked = row.pop('picked')
+        del row['ranks']
+        row['values'] = {}
+        for fraction, position in positions[key]:
+            below, above = picked[math.floor(position)], picked[math.ceil(position)]
+            row['values'][fraction] = below + (above - below) * (position - math.floor(position))
+
+
+def _sorted_rows(queryset, fields):
+    """
+    (*fields, id) rows in that order, CHUNK_SIZE per query, each chunk starting after
+    the last row of the one before. Like the exports' id keyset, so drivers that buffer
+    whole result sets never hold more than a chunk.
+    """
+    keys = [*fields, 'id']
+    queryset = queryset.order_by(*keys).values_list(*keys)
+    last = None
+    while True:
+        chunk = list((queryset if last is None else queryset.filter(_after(keys, last)))[:CHUNK_SIZE])
+        yield from chunk
+        if len(chunk) < CHUNK_SIZE:
+            return
+        last = chunk[-1]
+
+
+def _after(keys, row):
+    # The rows sorting after `row` on `keys`: (a, b, c) > (x, y, z) spelled out.
+    condition = Q(pk__in=[])
+    for position, key in enumerate(keys):
+        condition |= Q(**dict(zip(keys[:position], row[:position])), **{f'{key}__gt': row[position]})
+    return condition
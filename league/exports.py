@@ -0,0 +1,122 @@
+# exports.py
+#
+# Flat, denormalized exports streamed row by row. Names are joined in SQL and rows
+# are read in keyset chunks (id > last id, CHUNK_SIZE at a time), so memory stays
+# flat regardless of how many seasons are exported, on drivers that buffer a whole
+# result set as well as on those with server-side cursors. Archived seasons are read
+# from the archive tables first, then the live ones; ids are kept when a season is
+# archived, so they stay unique across both.
+
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from .models import Game, Score, PlayerGameParticipation, ArchivedGame, ArchivedScore, ArchivedParticipation
+
+CHUNK_SIZE = 2000
+
+# name -> (model, archive model, date lookup, team lookups, columns); the lookups apply to both models.
+EXPORTS = {
+    'games': (Game, ArchivedGame, 'date', ('team_a', 'team_b'), (
+        ('id', 'id'),
+        ('season', 'season_id'),
+        ('date', 'date'),
+        ('location', 'location'),
+        ('referee', 'referee'),
+        ('team_a_id', 'team_a_id'),
+        ('team_a_name', 'team_a__name'),
+        ('team_b_id', 'team_b_id'),
+        ('team_b_name', 'team_b__name'),
+        ('team_a_score', 'team_a_score'),
+        ('team_b_score', 'team_b_score'),
+    )),
+    'scores': (Score, ArchivedScore, 'game__date', ('player__team',), (
+        ('id', 'id'),
+        ('season', 'season_id'),
+        ('game_id', 'game_id'),
+        ('game_date', 'game__date'),
+        ('player_id', 'player_id'),
+        ('player_name', 'player__name'),
+        ('username', 'player__user__username'),
+        ('team_id', 'player__team_id'),
+        ('team_name', 'player__team__name'),
+        ('score', 'score'),
+    )),
+    'participations': (PlayerGameParticipation, ArchivedParticipation, 'game__date', ('team',), (
+        ('id', 'id'),
+        ('season', 'season_id'),
+        ('game_id', 'game_id'),
+        ('game_date', 'game__date'),
+        ('player_id', 'player_id'),
+        ('player_name', 'player__name'),
+        ('team_id', 'team_id'),
+        ('team_name', 'team__name'),
+        ('points_scored', 'points_scored'),
+    )),
+}
+
+
+class Echo:
+    """
+    File-like object whose write() just returns the line, for csv.writer.
+    """
+    def write(self, value):
+        return value
+
+
+def export_rows(name, date_from=None, date_to=None, team_id=None):
+    model, archive, date_lookup, team_lookups, columns = EXPORTS[name]
+    lookups = [lookup for _, lookup in columns]
+    for source in (archive, model):
+        queryset = source.objects.all()
+        if date_from is not None:
+            queryset = queryset.filter(**{f'{date_lookup}__gte': date_from})
+        if date_to is not None:
+            queryset = queryset.filter(**{f'{date_lookup}__lte': date_to})
+        if team_id is not None:
+            team_filter = Q()
+            for lookup in team_lookups:
+                team_filter |= Q(**{lookup: team_id})
+            queryset = queryset.filter(team_filter)
+        yield from _keyset_rows(queryset, lookups)
+
+
+def _keyset_rows(queryset, lookups):
+    """
+    Rows of `lookups` in id order, CHUNK_SIZE per query, each chunk starting after the
+    last id of the one before.
+    """
+    queryset = queryset.order_by('id').values_list('id', *lookups)
+    last_id = None
+    while True:
+        chunk = list((queryset if last_id is None else queryset.filter(id__gt=last_id))[:CHUNK_SIZE])
+        for row in chunk:
+            yield row[1:]
+        if len(chunk) < CHUNK_SIZE:
+            return
+        last_id = chunk[-1][0]
+
+
+def stream_csv(name, rows):
+    columns = [column for column, _ in EXPORTS[name][4]]
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(name, rows):
+    columns = [column for column, _ in EXPORTS[name][4]]
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_response(name, export_format, **filters):
+    rows = export_rows(name, **filters)
+    if export_format == 'csv':
+        response = StreamingHttpResponse(stream_csv(name, rows), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{name}.csv"'
+    else:
+        response = StreamingHttpResponse(stream_ndjson(name, rows), content_type='application/x-ndjson')
+    return response
@@ -0,0 +1,56 @@
+# fieldsets.py
+#
+# Sparse fieldsets for GET requests. `?fields=a,b` keeps only the listed top-level
+# fields; `?expand=x,y` lists the nested relations to embed, and relations that are
+# not expanded are rendered as primary keys (`?expand=` embeds nothing). Without the
+# parameters every field is returned fully expanded, as before. The readers and the
+# viewsets use the shape to skip the joins and queries for whatever was not asked for.
+
+
+class Shape:
+    def __init__(self, fields=None, expand=None):
+        # None: every field / every relation expanded.
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, request):
+        def names(param):
+            value = request.query_params.get(param)
+            if value is None:
+                return None
+            return frozenset(name.strip() for name in value.split(',') if name.strip())
+        return cls(names('fields'), names('expand'))
+
+    def wants(self, field):
+        return self.fields is None or field in self.fields
+
+    def expands(self, relation):
+        return self.wants(relation) and (self.expand is None or relation in self.expand)
+
+    def trim(self, row):
+        if self.fields is None:
+            return row
+        return {field: value for field, value in row.items() if field in self.fields}
+
+
+FULL = Shape()
+
+
+class ShapeMixin:
+    """
+    Viewset mixin: `get_shape()` reads the request's fields/expand parameters on GET
+    requests, and serializers receive the shape through their context.
+    """
+    def get_shape(self):
+        if self.request is None or self.request.method != 'GET':
+            return FULL
+        shape = self.__dict__.get('_shape')
+        if shape is None:
+            shape = self._shape = Shape.from_request(self.request)
+        return shape
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['shape'] = self.get_shape()
+        return context
@@ -0,0 +1,155 @@
+# forecast.py
+#
+# Tournament forecasts: each remaining team's chance of reaching every later round of
+# its bracket and of becoming champion. Team strength is an Elo rating replayed over
+# the archived and live game results, and each match is won with the Elo expectation.
+# Brackets pair teams in RoundTeam order and give an odd team out a bye, as
+# populate_data builds them, so the bracket is a fixed tree: the distribution of each
+# match's winner follows exactly from the distributions of its two sides. That gives
+# the probabilities a Monte Carlo run converges to, without sampling error and in
+# O(teams²) work, a few milliseconds for a 64-team bracket.
+#
+# Ratings after each closed season are stored in TeamRating, so a rating refresh
+# replays only the games of the seasons after the last stored one: usually just the
+# current season. A change to an older season's games drops the stored ratings from
+# that season on.
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from .caching import get_cache
+from .models import Team, Game, ArchivedGame, Tournament, TournamentRound, RoundTeam, ModelVersion, Season, \
+    TeamRating, season_of
+
+INITIAL_RATING = 1500
+K_FACTOR = 20
+RATINGS_KEY = 'league:forecast:ratings:%s'
+
+
+def win_probability(rating, opponent_rating):
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def team_ratings():
+    """
+    {team_id: Elo rating} after every archived and live game in date order; cached
+    per Game version. Teams without games are rated INITIAL_RATING.
+    """
+    version = ModelVersion.objects.current([Game])[Game._meta.label_lower][0]
+    cache = get_cache()
+    ratings = cache.get(RATINGS_KEY % version)
+    if ratings is not None:
+        return ratings
+
+    stored = TeamRating.objects.aggregate(season=Max('season'))['season']
+    ratings = {}
+    seasons = Season.objects.order_by('year')
+    if stored is not None:
+        ratings = dict(TeamRating.objects.filter(season=stored).values_list('team_id', 'rating'))
+        seasons = seasons.filter(year__gt=stored)
+    current = season_of(timezone.localdate())
+    closed = []
+    for season in seasons.values_list('year', flat=True):
+        for model in (ArchivedGame, Game):
+            replay(ratings, model.objects.filter(season_id=season))
+        if season < current:
+            closed.extend(TeamRating(season=season, team_id=team_id, rating=rating)
+                          for team_id, rating in ratings.items())
+    if closed:
+        with transaction.atomic():
+            TeamRating.objects.bulk_create(closed, batch_size=1000, ignore_conflicts=True)
+            # A game written during the replay may have dropped these seasons already.
+            if ModelVersion.objects.current([Game])[Game._meta.label_lower][0] != version:
+                transaction.set_rollback(True)
+    cache.set(RATINGS_KEY % version, ratings, timeout=settings.LEAGUE_CACHE_TIMEOUT)
+    return ratings
+
+
+def replay(ratings, games):
+    """
+    Updates {team_id: rating} in place with the games' results in date order.
+    """
+    fields = ('team_a_id', 'team_b_id', 'team_a_score', 'team_b_score')
+    for team_a, team_b, team_a_score, team_b_score in games.order_by('date', 'id').values_list(*fields).iterator(
+            chunk_size=5000):
+        rating_a = ratings.get(team_a, INITIAL_RATING)
+        rating_b = ratings.get(team_b, INITIAL_RATING)
+        result = 1 if team_a_score > team_b_score else 0 if team_a_score < team_b_score else 0.5
+        change = K_FACTOR * (result - win_probability(rating_a, rating_b))
+        ratings[team_a] = rating_a + change
+        ratings[team_b] = rating_b - change
+
+
+def play(side_a, side_b, ratings):
+    """
+    Distribution of the winner of a match between two {team_id: probability} sides.
+    """
+    winners = dict.fromkeys(side_a, 0.0) | dict.fromkeys(side_b, 0.0)
+    for team_a, p_a in side_a.items():
+        rating_a = ratings.get(team_a, INITIAL_RATING)
+        for team_b, p_b in side_b.items():
+            p_match = p_a * p_b
+            p_a_wins = p_match * win_probability(rating_a, ratings.get(team_b, INITIAL_RATING))
+            winners[team_a] += p_a_wins
+            winners[team_b] += p_match - p_a_wins
+    return winners
+
+
+def bracket_odds(entries, ratings):
+    """
+    entries: [(team_id, eliminated), ...] of the current round in bracket order; a pair
+    with an eliminated team is already decided. Returns ([{team_id: p}, ...] per round
+    from the current one, {team_id: p} of becoming champion).
+    """
+    eliminated = {team_id for team_id, out in entries if out}
+    sides = [{team_id: 1.0} for team_id, _ in entries]
+    rounds = []
+    while len(sides) > 1:
+        reach = {}
+        for side in sides:
+            reach.update(side)
+        rounds.append(reach)
+        next_sides = []
+        for side_a, side_b in zip(sides[::2], sides[1::2]):
+            losers = [side for side in (side_a, side_b) if not eliminated.isdisjoint(side)]
+            if len(rounds) == 1 and len(losers) == 1:
+                # Already played in the current round.
+                next_sides.append(side_b if losers[0] is side_a else side_a)
+            else:
+                next_sides.append(play(side_a, side_b, ratings))
+        if len(sides) % 2:
+            next_sides.append(sides[-1])
+        sides = next_sides
+    return rounds, sides[0] if sides else {}
+
+
+def forecast(tournament_id, ratings=None):
+    """
+    The forecast for the tournament's remaining teams, or None when it does not exist.
+    """
+    tournament = Tournament.objects.filter(pk=tournament_id).values('id', 'name').first()
+    if tournament is None:
+        return None
+    current = TournamentRound.objects.filter(tournament_id=tournament_id).order_by('-round_number').first()
+    if current is None:
+        return {'tournament': tournament['id'], 'name': tournament['name'], 'round': None, 'teams': []}
+
+    entries = list(RoundTeam.objects.filter(round=current).order_by('id').values_list('team_id', 'eliminated'))
+    if ratings is None:
+        ratings = team_ratings()
+    rounds, champion = bracket_odds(entries, ratings)
+    remaining = [team_id for team_id, out in entries if not out]
+    names = dict(Team.objects.filter(id__in=remaining).values_list('id', 'name'))
+    teams = [
+        {
+            'team': team_id,
+            'name': names[team_id],
+            'rating': round(ratings.get(team_id, INITIAL_RATING), 1),
+            'rounds': {current.round_number + index: reach.get(team_id, 0.0) for index, reach in enumerate(rounds)},
+            'champion': champion.get(team_id, 0.0),
+        }
+        for team_id in remaining
+    ]
+    teams.sort(key=lambda team: -team['champion'])
+    return {'tournament': tournament['id'], 'name': tournament['name'], 'round': current.round_number, 'teams': teams}
@@ -0,0 +1,119 @@
+# ingest.py
+#
+# Batched game-result ingestion. A whole batch is validated against one prefetched
+# player -> team map, written with a few bulk inserts in one transaction, and the
+# denormalized aggregates (TeamStats, standings, stored ratings, player totals,
+# games_participated, tournament snapshots, model versions) are refreshed once per
+# batch with set-based updates instead of once per row through the model signals.
+# The new games are published to the live stream when the batch commits.
+
+import uuid
+from django.db import transaction
+from rest_framework import serializers
+from . import live
+from .models import Team, Player, Game, Score, PlayerGameParticipation, TeamStats, Standing, TournamentSnapshot, \
+    ModelVersion, SearchEntry, Season, TeamRating, season_of
+
+MAX_GAMES = 500
+BATCH_SIZE = 1000
+
+
+def _result_errors(result, known_teams, player_teams, taken_refs, archived_seasons):
+    errors = {}
+    if season_of(result['date']) in archived_seasons:
+        errors['date'] = [f"Season {season_of(result['date'])} is archived."]
+    for side in ('team_a', 'team_b'):
+        if result[side] not in known_teams:
+            errors[side] = [f'Unknown team {result[side]}.']
+    if result['source_ref'] in taken_refs:
+        errors['source_ref'] = [f"Game '{result['source_ref']}' was already recorded."]
+
+    lines = []
+    seen = set()
+    points = {result['team_a']: 0, result['team_b']: 0}
+    for line in result['box_score']:
+        player_id = line['player']
+        team_id = player_teams.get(player_id)
+        if team_id is None:
+            lines.append({'player': [f'Unknown player {player_id}.']})
+        elif team_id not in points:
+            lines.append({'player': [f'Player {player_id} does not play for either team.']})
+        elif player_id in seen:
+            lines.append({'player': [f'Player {player_id} appears twice.']})
+        else:
+            lines.append({})
+            points[team_id] += line['points_scored']
+        seen.add(player_id)
+    if any(lines):
+        errors['box_score'] = lines
+    elif result['box_score']:
+        for side in ('team_a', 'team_b'):
+            if points[result[side]] != result[f'{side}_score']:
+                errors[f'{side}_score'] = [
+                    f"Box score adds up to {points[result[side]]}, not {result[f'{side}_score']}."]
+    return errors
+
+
+def ingest_games(results):
+    """
+    Records a batch of validated GameResultSerializer dicts. Raises ValidationError with
+    one error dict per game, in input order, if any game is rejected; nothing is written then.
+    Returns the created games' ids in input order.
+    """
+    for result in results:
+        result.setdefault('source_ref', uuid.uuid4().hex)
+    refs = [result['source_ref'] for result in results]
+    team_ids = {result[side] for result in results for side in ('team_a', 'team_b')}
+    player_ids = {line['player'] for result in results for line in result['box_score']}
+
+    known_teams = set(Team.objects.filter(id__in=team_ids).values_list('id', flat=True))
+    player_teams = dict(Player.objects.filter(id__in=player_ids).values_list('id', 'team_id'))
+    taken_refs = set(Game.objects.filter(source_ref__in=refs).values_list('source_ref', flat=True))
+    seasons = {season_of(result['date']) for result in results}
+    archived_seasons = set(Season.objects.filter(pk__in=seasons, archived_at__isnull=False).values_list('pk', flat=True))
+    batch_refs = set()
+    errors = []
+    for result in results:
+        result_errors = _result_errors(result, known_teams, player_teams, taken_refs | batch_refs, archived_seasons)
+        batch_refs.add(result['source_ref'])
+        errors.append(result_errors)
+    if any(errors):
+        raise serializers.ValidationError({'games': errors})
+
+    with transaction.atomic():
+        games = Game.objects.bulk_create([
+            Game(source_ref=result['source_ref'], date=result['date'], location=result['location'],
+                 referee=result['referee'], team_a_id=result['team_a'], team_b_id=result['team_b'],
+                 team_a_score=result['team_a_score'], team_b_score=result['team_b_score'])
+            for result in results
+        ], batch_size=BATCH_SIZE, refresh_aggregates=False)
+        # MySQL's bulk_create does not return primary keys; read them back by source_ref.
+        game_ids = dict(Game.objects.filter(source_ref__in=refs).values_list('source_ref', 'id'))
+
+        scores, participations = [], []
+        for result in results:
+            game_id = game_ids[result['source_ref']]
+            season = season_of(result['date'])
+            for line in result['box_score']:
+                scores.append(Score(player_id=line['player'], game_id=game_id, season_id=season,
+                                    score=line.get('score', line['points_scored'])))
+                participations.append(PlayerGameParticipation(
+                    player_id=line['player'], game_id=game_id, team_id=player_teams[line['player']],
+                    season_id=season, points_scored=line['points_scored']))
+        Score.objects.bulk_create(scores, batch_size=BATCH_SIZE, refresh_totals=False)
+        PlayerGameParticipation.objects.bulk_create(participations, batch_size=BATCH_SIZE)
+
+        TeamStats.objects.rebuild(team_ids=team_ids)
+        Standing.objects.refresh_games(games)
+        TeamRating.objects.invalidate({season_of(result['date']) for result in results})
+        if player_ids:
+            players = Player.objects.filter(id__in=player_ids)
+            players.refresh_score_totals()
+            players.refresh_games_participated()
+        TournamentSnapshot.objects.invalidate(team_ids=list(team_ids))
+        for game in games:
+            game.pk = game_ids[game.source_ref]
+        SearchEntry.objects.index(games, created=True)
+        live.publish_games(games)
+    ModelVersion.objects.bump(Game, Score, Player, PlayerGameParticipation)
+    return [game_ids[ref] for ref in refs]
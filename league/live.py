@@ -0,0 +1,162 @@
+# live.py
+#
+# Live updates: model signals publish small delta events (score changes, box-score
+# rows, bracket eliminations) to topics such as 'game:12', 'team:3' or
+# 'tournament:5', and the /api/live/ Server-Sent Events stream fans them out to the
+# subscribed clients. Events are published once the writing transaction commits.
+# The broker is pluggable through LEAGUE_LIVE_BROKER; the default LocalBroker fans
+# out within one process, so a multi-process deployment needs a shared backend
+# with the same publish/subscribe interface.
+
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+TOPIC_KINDS = ('game', 'team', 'tournament')
+
+
+def topic(kind, pk):
+    return f'{kind}:{pk}'
+
+
+def encode(event_id, kind, data):
+    return f'id: {event_id}\nevent: {kind}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+class Subscription:
+    """
+    One client's queue of encoded events; created and consumed on the client's event loop.
+    A client that falls `queue_size` events behind is sent a 'resync' event and dropped.
+    """
+    def __init__(self, broker, topics, queue_size):
+        self.broker = broker
+        self.topics = frozenset(topics)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def put(self, message):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self):
+        """
+        The next encoded event, or None once the subscription overflowed.
+        """
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """
+    In-process pub/sub. publish() may be called from any thread: each event is encoded
+    once and handed to every subscriber's event loop in one callback per loop.
+    """
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or settings.LEAGUE_LIVE_QUEUE_SIZE
+        self.subscribers = defaultdict(set)
+        self.lock = threading.Lock()
+        self.sequence = itertools.count(1)
+
+    def subscribe(self, topics):
+        subscription = Subscription(self, topics, self.queue_size)
+        with self.lock:
+            for name in subscription.topics:
+                self.subscribers[name].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for name in subscription.topics:
+                subscribers = self.subscribers.get(name)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.subscribers[name]
+
+    def subscriber_count(self):
+        with self.lock:
+            return len(set().union(*self.subscribers.values()))
+
+    def publish(self, topics, kind, data):
+        """
+        Sends an event to the subscribers of any of `topics`; returns how many received it.
+        """
+        with self.lock:
+            targets = set().union(*(self.subscribers.get(name, ()) for name in topics))
+        if not targets:
+            return 0
+        message = encode(next(self.sequence), kind, data)
+        by_loop = defaultdict(list)
+        for subscription in targets:
+            by_loop[subscription.loop].append(subscription)
+        for loop, subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, subscriptions, message)
+            except RuntimeError:
+                # The loop was closed; its subscriptions are being torn down.
+                pass
+        return len(targets)
+
+
+def _deliver(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.put(message)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.LEAGUE_LIVE_BROKER)()
+    return _broker
+
+
+def publish(topics, kind, data):
+    """
+    Publishes once the current transaction commits, so clients never see rolled-back writes.
+    """
+    topics = list(topics)
+    transaction.on_commit(lambda: get_broker().publish(topics, kind, data))
+
+
+# Event payloads; kept to the fields that changed plus what a client needs to route them.
+
+def game_data(game):
+    return {
+        'game': game.pk,
+        'date': game.date,
+        'team_a': game.team_a_id,
+        'team_b': game.team_b_id,
+        'team_a_score': game.team_a_score,
+        'team_b_score': game.team_b_score,
+    }
+
+
+def game_topics(game):
+    return [topic('game', game.pk), topic('team', game.team_a_id), topic('team', game.team_b_id)]
+
+
+def publish_games(games, kind='game'):
+    for game in games:
+        publish(game_topics(game), kind, game_data(game))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from league import archive
+
+
+class Command(BaseCommand):
+    help = 'Moves the games, scores and participations of closed seasons into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--season', type=int, action='append', dest='seasons',
+                            help='Only archive the given season (may be repeated)')
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        seasons = options['seasons'] or archive.archivable_seasons()
+        for season in seasons:
+            try:
+                moved = archive.archive_season(season, batch_size=options['batch_size'])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(f"Season {season}: {moved['games']} games, {moved['scores']} scores and "
+                              f"{moved['participations']} participations archived.")
+        self.stdout.write(self.style.SUCCESS(f'Archived {len(seasons)} seasons.'))
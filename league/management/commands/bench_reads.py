@@ -0,0 +1,156 @@
+import asyncio
+import math
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+from league.authentication import LeagueTokenObtainPairSerializer
+from league.models import Game, Team, Tournament
+
+User = get_user_model()
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'league': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    # Token revocations are not a response cache; authentication needs the alias either way.
+    'league-auth': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-auth'},
+}
+
+
+def call_wsgi(application, path, token):
+    environ = {'PATH_INFO': path, 'HTTP_HOST': 'localhost', 'HTTP_AUTHORIZATION': f'JWT {token}'}
+    setup_testing_defaults(environ)
+    result = {}
+
+    def start_response(status, headers, exc_info=None):
+        result['status'] = int(status.split()[0])
+
+    body = application(environ, start_response)
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return result['status']
+
+
+async def call_asgi(application, path, token):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'authorization', f'JWT {token}'.encode())],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    sent = asyncio.Event()
+    received = False
+    result = {}
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await sent.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            result['status'] = message['status']
+        elif not message.get('more_body'):
+            sent.set()
+
+    await application(scope, receive, send)
+    return result['status']
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[max(0, math.ceil(len(latencies) * 0.99) - 1)]
+    errors = sum(1 for status in statuses if status >= 400)
+    return len(latencies) / elapsed, statistics.median(latencies), p99, errors
+
+
+class Command(BaseCommand):
+    help = ('Compares throughput and p50/p99 latency of the high-traffic reads: the DRF views under WSGI '
+            '(basketball_league/wsgi.py) and ASGI, and the async views under ASGI')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per route and mode')
+        parser.add_argument('--concurrency', type=int, default=20,
+                            help='WSGI worker threads / concurrent ASGI requests')
+        parser.add_argument('--username', default='manager', help='An admin/staff user to issue the requests')
+        parser.add_argument('--cache', action='store_true',
+                            help='Keep the response cache; by default every request reaches the database')
+
+    def handle(self, *args, **options):
+        from basketball_league.asgi import application as asgi_application
+        from basketball_league.wsgi import application as wsgi_application
+
+        user = User.objects.filter(username=options['username']).first()
+        game = Game.objects.order_by('id').first()
+        team = Team.objects.order_by('id').first()
+        tournament = Tournament.objects.order_by('id').first()
+        if user is None or game is None or team is None or tournament is None:
+            raise CommandError('Needs the user and some games, teams and tournaments; run populate_data first.')
+        token = str(LeagueTokenObtainPairSerializer.get_token(user).access_token)
+
+        routes = [
+            ('game-details', reverse('game-details-detail', kwargs={'pk': game.pk}),
+             reverse('async-game-details', kwargs={'pk': game.pk})),
+            ('team-detail', reverse('team-detail', kwargs={'pk': team.pk}),
+             reverse('async-team-details', kwargs={'pk': team.pk})),
+            ('tournament-structure', reverse('tournament-tournament-structure', kwargs={'pk': tournament.pk}),
+             reverse('async-tournament-structure', kwargs={'pk': tournament.pk})),
+            ('standings', reverse('standings-list'), reverse('async-standings')),
+        ]
+        requests, concurrency = options['requests'], options['concurrency']
+
+        def run_wsgi(path):
+            call_wsgi(wsgi_application, path, token)
+            results = []
+
+            def timed(_):
+                started = time.perf_counter()
+                status = call_wsgi(wsgi_application, path, token)
+                results.append((time.perf_counter() - started, status))
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(timed, range(requests)))
+            return summarize([latency for latency, _ in results], [status for _, status in results],
+                             time.perf_counter() - started)
+
+        async def run_asgi(path):
+            await call_asgi(asgi_application, path, token)
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def timed():
+                async with semaphore:
+                    started = time.perf_counter()
+                    status = await call_asgi(asgi_application, path, token)
+                    return time.perf_counter() - started, status
+
+            started = time.perf_counter()
+            results = await asyncio.gather(*(timed() for _ in range(requests)))
+            return summarize([latency for latency, _ in results], [status for _, status in results],
+                             time.perf_counter() - started)
+
+        rows = []
+        with override_settings(**({} if options['cache'] else {'CACHES': NO_CACHE})):
+            for name, sync_path, async_path in routes:
+                rows.append((name, 'wsgi', *run_wsgi(sync_path)))
+                rows.append((name, 'asgi-sync', *asyncio.run(run_asgi(sync_path))))
+                rows.append((name, 'asgi-async', *asyncio.run(run_asgi(async_path))))
+
+        self.stdout.write(f"{'route':<24}{'mode':<12}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for name, mode, throughput, p50, p99, errors in rows:
+            self.stdout.write(f'{name:<24}{mode:<12}{throughput:>9.1f}{p50 * 1000:>9.1f}{p99 * 1000:>9.1f}{errors:>8}')
+        failed = sum(row[-1] for row in rows)
+        if failed:
+            raise CommandError(f'{failed} requests failed; the timings above are not comparable.')
+        self.stdout.write(self.style.SUCCESS(f'{requests} requests per route and mode at concurrency {concurrency}.'))
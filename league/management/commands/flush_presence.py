@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from league import presence
+
+
+class Command(BaseCommand):
+    help = 'Folds buffered login/logout/heartbeat events into user sessions and login counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=presence.FLUSH_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            flushed = presence.flush(batch_size=options['batch_size'])
+            total += flushed
+            if flushed < options['batch_size']:
+                break
+        self.stdout.write(self.style.SUCCESS(f'Flushed {total} presence events.'))
@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from league.forecast import forecast
+
+
+class Command(BaseCommand):
+    help = "Prints each remaining team's probability of reaching every later round of a tournament and of winning it"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament', type=int, help='Tournament id')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        data = forecast(options['tournament'])
+        elapsed = time.perf_counter() - started
+        if data is None:
+            raise CommandError(f"Tournament {options['tournament']} does not exist.")
+        if not data['teams']:
+            self.stdout.write(f"{data['name']} has no rounds yet.")
+            return
+
+        rounds = list(data['teams'][0]['rounds'])
+        self.stdout.write(f"{'team':<24}{'rating':>8}" + ''.join(f'{f"R{number}":>8}' for number in rounds)
+                          + f"{'champion':>10}")
+        for team in data['teams']:
+            self.stdout.write(f"{team['name']:<24}{team['rating']:>8.1f}"
+                              + ''.join(f"{team['rounds'][number]:>8.1%}" for number in rounds)
+                              + f"{team['champion']:>10.1%}")
+        self.stdout.write(self.style.SUCCESS(f"Forecast {data['name']} from round {data['round']} "
+                                             f'in {elapsed * 1000:.0f} ms.'))
@@ -1,7 +1,15 @@
 from datetime import timedelta, date
+from itertools import islice
+from django.apps import apps
 from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
 from django.contrib.auth import get_user_model
-from league.models import Team, Player, Game, Score, Tournament, TournamentRound, RoundTeam
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Max
+from league.authentication import revoke_claims_of
+from league.models import Team, Player, Game, Score, PlayerGameParticipation, Tournament, TournamentRound, RoundTeam, \
+    TeamStats, Standing, ModelVersion, SearchEntry, ClaimsRevocation
 import random
 
 User = get_user_model()
@@ -9,56 +17,214 @@ User = get_user_model()
 class Command(BaseCommand):
     help = 'Populates the database with fake users, teams, players, games, scores, and tournaments'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--teams', type=int, default=16)
+        parser.add_argument('--players-per-team', type=int, default=10)
+        parser.add_argument('--games', type=int, default=500, help='Total games across all seasons')
+        parser.add_argument('--seasons', type=int, default=1)
+        parser.add_argument('--tournaments', type=int, default=4, help='Total tournaments across all seasons')
+        parser.add_argument('--bracket-size', type=int, default=16)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None)
+
     def handle(self, *args, **options):
         self.stdout.write("Starting to populate the database...")
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        teams = options['teams']
+        players_per_team = options['players_per_team']
+        if teams < 2:
+            self.stderr.write('At least two teams are needed to schedule games.')
+            return
+
+        self.clear()
+
+        # Primary keys are assigned up front so rows can reference each other without
+        # reading ids back (MySQL's bulk_create does not return them).
+        first_user = (User.objects.aggregate(m=Max('id'))['m'] or 0) + 1
+        manager_id = first_user
+        coach_ids = range(first_user + 1, first_user + 1 + teams)
+        player_user_start = first_user + 1 + teams
+        team_ids = range(1, teams + 1)
+        player_start = 1
+
+        # Hashing is deliberately slow, so every account shares one precomputed hash.
+        password = make_password('pass1234')
+        self.stdout.write(f'Creating {teams * (players_per_team + 1) + 1} users...')
+        self.insert(User, self.generate_users(password, manager_id, coach_ids, player_user_start, teams, players_per_team))
+        self.insert(Team, (Team(id=team_id, name=f'Team {i + 1}', coach_id=coach_ids[i])
+                           for i, team_id in enumerate(team_ids)))
+        self.insert(TeamStats, (TeamStats(team_id=team_id) for team_id in team_ids))
+        self.insert(Player, (
+            Player(id=player_start + t * players_per_team + j, user_id=player_user_start + t * players_per_team + j,
+                   team_id=team_ids[t], name=f'Player {j + 1} of Team {t + 1}',
+                   height=self.rng.uniform(1.75, 2.10), games_participated=0)
+            for t in range(teams) for j in range(players_per_team)
+        ))
+
+        self.stdout.write(f"Creating {options['games']} games with scores and participations...")
+        self.populate_games(options['games'], options['seasons'], list(team_ids), player_start, players_per_team)
+
+        self.stdout.write(f"Creating {options['tournaments']} tournaments...")
+        for tournament_index in range(options['tournaments']):
+            season = tournament_index % options['seasons']
+            self.populate_tournament(tournament_index, self.season_start(season, options['seasons']),
+                                     list(team_ids), options['bracket_size'])
+
+        self.stdout.write("Refreshing aggregates...")
+        self.refresh_aggregates()
+        self.stdout.write("Building the search index...")
+        SearchEntry.objects.rebuild()
+        self.reset_sequences()
+        ModelVersion.objects.bump(*apps.get_app_config('league').get_models())
+
+        self.stdout.write(self.style.SUCCESS('Database has been populated with fake data.'))
+
+    def clear(self):
+        # Truncate the league tables directly; deleting row by row would fire the
+        # stats signals for every game and score. Claim revocations are kept, so tokens
+        # revoked before the reset stay revoked.
+        flushed = [model for model in apps.get_app_config('league').get_models()
+                   if model not in (User, ClaimsRevocation)]
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sql_flush(no_style(), [model._meta.db_table for model in flushed],
+                                                    allow_cascade=True):
+                    cursor.execute(sql)
+            # Users go in bulk too, without the per-user claim and search index signals:
+            # first the rows of other apps that point at them, then the users, then one
+            # batch of claim revocations.
+            users = User.objects.filter(is_superuser=False)
+            user_ids = list(users.values_list('id', flat=True))
+            for relation in User._meta.related_objects:
+                if relation.related_model not in flushed:
+                    relation.related_model._base_manager.filter(
+                        **{f'{relation.field.name}__is_superuser': False}).delete()
+            for through in (User.groups.through, User.user_permissions.through):
+                through.objects.filter(user__is_superuser=False).delete()
+            users._raw_delete(users.db)
+            revoke_claims_of(user_ids)
+
+    def insert(self, model, objs):
+        """
+        Streams generated objects into chunked bulk_create calls, one transaction per batch.
+        """
+        objs = iter(objs)
+        total = 0
+        while True:
+            batch = list(islice(objs, self.batch_size))
+            if not batch:
+                return total
+            with transaction.atomic():
+                if model is Score:
+                    model.objects.bulk_create(batch, refresh_totals=False)
+                else:
+                    model.objects.bulk_create(batch)
+            total += len(batch)
+
+    def generate_users(self, password, manager_id, coach_ids, player_user_start, teams, players_per_team):
+        yield User(id=manager_id, username='manager', email='manager@example.com', password=password,
+                   is_staff=True, is_admin=True)
+        for i, coach_id in enumerate(coach_ids):
+            yield User(id=coach_id, username=f'coach{i+1}', email=f'coach{i+1}@example.com', password=password,
+                       is_coach=True)
+        for t in range(teams):
+            for j in range(players_per_team):
+                username = f'player_team{t+1}_{j+1}'
+                yield User(id=player_user_start + t * players_per_team + j, username=username,
+                           email=f'{username}@example.com', password=password, is_player=True)
+
+    def season_start(self, season, seasons):
+        # Seasons are calendar years (models.season_of), the last of them the current one.
+        return date(date.today().year - seasons + 1 + season, 1, 1)
+
+    def season_days(self, season, seasons):
+        # Days of the season so far: the whole year, or up to today for the current one.
+        start = self.season_start(season, seasons)
+        return (min(start.replace(year=start.year + 1), date.today() + timedelta(days=1)) - start).days
+
+    def populate_games(self, games, seasons, team_ids, player_start, players_per_team):
+        rosters = {
+            team_id: range(player_start + t * players_per_team, player_start + (t + 1) * players_per_team)
+            for t, team_id in enumerate(team_ids)
+        }
+        # Box scores are drawn once per game and shared by the Game, Score and participation rows.
+        box_scores = {}
+
+        def game_rows():
+            for game_id in range(1, games + 1):
+                team_a, team_b = self.rng.sample(team_ids, 2)
+                points = {team: [self.rng.randint(0, 25) for _ in rosters[team]] for team in (team_a, team_b)}
+                season = (game_id - 1) * seasons // games
+                start = self.season_start(season, seasons)
+                day = start + timedelta(days=self.rng.randrange(self.season_days(season, seasons)))
+                box_scores[game_id] = (team_a, team_b, points, day.year)
+                yield Game(id=game_id, date=day,
+                           location=f'Arena {self.rng.randint(1, 20)}', referee=f'Referee {self.rng.randint(1, 50)}',
+                           team_a_id=team_a, team_b_id=team_b,
+                           team_a_score=sum(points[team_a]), team_b_score=sum(points[team_b]))
+
+        # Generate and flush games in batches so the box scores kept in memory stay bounded.
+        pending = game_rows()
+        while True:
+            batch = list(islice(pending, self.batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                Game.objects.bulk_create(batch, refresh_aggregates=False)
+            self.insert(Score, (
+                Score(player_id=player_id, game_id=game_id, season_id=season, score=points)
+                for game_id, (team_a, team_b, box, season) in box_scores.items()
+                for team in (team_a, team_b)
+                for player_id, points in zip(rosters[team], box[team])
+            ))
+            self.insert(PlayerGameParticipation, (
+                PlayerGameParticipation(player_id=player_id, game_id=game_id, team_id=team, season_id=season,
+                                        points_scored=points)
+                for game_id, (team_a, team_b, box, season) in box_scores.items()
+                for team in (team_a, team_b)
+                for player_id, points in zip(rosters[team], box[team])
+            ))
+            box_scores.clear()
+
+    def populate_tournament(self, tournament_index, start_date, team_ids, bracket_size):
+        tournament = Tournament.objects.create(name=f"Tournament {tournament_index + 1}", start_date=start_date,
+                                               end_date=start_date + timedelta(days=30))
+        current_teams = self.rng.sample(team_ids, min(bracket_size, len(team_ids)))
+
+        round_number = 1
+        while len(current_teams) > 1:
+            round = TournamentRound.objects.create(tournament=tournament, round_number=round_number)
+            next_round_teams = []
+            round_teams = []
+
+            # Create matches for each round; an odd team out gets a bye
+            for i in range(0, len(current_teams) - 1, 2):
+                team_a, team_b = current_teams[i], current_teams[i + 1]
+                winner = self.rng.choice([team_a, team_b])
+                next_round_teams.append(winner)
+                round_teams.append(RoundTeam(round=round, team_id=team_a, eliminated=(winner != team_a)))
+                round_teams.append(RoundTeam(round=round, team_id=team_b, eliminated=(winner != team_b)))
+            if len(current_teams) % 2:
+                next_round_teams.append(current_teams[-1])
+                round_teams.append(RoundTeam(round=round, team_id=current_teams[-1], eliminated=False))
+            RoundTeam.objects.bulk_create(round_teams)
+
+            current_teams = next_round_teams
+            round_number += 1
+
+        tournament.champion_id = current_teams[0]
+        tournament.save(update_fields=['champion'])
+
+    def refresh_aggregates(self):
+        TeamStats.objects.rebuild()
+        Standing.objects.rebuild()
+        Player.objects.refresh_score_totals()
+        Player.objects.refresh_games_participated()
 
-        # Clear existing data
-        User.objects.filter(is_superuser=False).delete()
-        Team.objects.all().delete()
-        Player.objects.all().delete()
-        Game.objects.all().delete()
-        Score.objects.all().delete()
-        Tournament.objects.all().delete()
-        TournamentRound.objects.all().delete()
-        RoundTeam.objects.all().delete()
-
-        # Create users and teams
-        manager = User.objects.create_user(username='manager', email='manager@example.com', password='pass1234', is_staff=True, is_admin=True)
-        coaches = [User.objects.create_user(username=f'coach{i+1}', email=f'coach{i+1}@example.com', password='pass1234', is_coach=True) for i in range(16)]
-        teams = [Team.objects.create(name=f"Team {i+1}", coach=coaches[i]) for i in range(16)]
-        
-        # Create players
-        players = []
-        for team in teams:
-            for j in range(10):  # Ensuring not to exceed 10 players per team
-                player_user = User.objects.create_user(username=f'player_{team.name}_{j+1}', email=f'player_{team.name}_{j+1}@example.com', password='pass1234', is_player=True)
-                players.append(Player.objects.create(user=player_user, team=team, name=f'Player {j+1} of {team.name}', height=random.uniform(1.75, 2.10), games_participated=0))
-        
-        # Create tournaments
-        for tournament_index in range(4):  # Creating 4 tournaments
-            tournament = Tournament.objects.create(name=f"Tournament {tournament_index + 1}", start_date=date.today(), end_date=date.today() + timedelta(days=30))
-            current_teams = teams[:]
-            random.shuffle(current_teams)  # Shuffle teams for varied matchups
-
-            # Create rounds
-            for round_number in range(1, 6):  # There should be 5 rounds to end with a single champion
-                round = TournamentRound.objects.create(tournament=tournament, round_number=round_number)
-                next_round_teams = []
-
-                # Create matches for each round
-                match_count = len(current_teams) // 2
-                for i in range(match_count):
-                    team_a = current_teams[2 * i]
-                    team_b = current_teams[2 * i + 1]
-                    winner = random.choice([team_a, team_b])
-                    next_round_teams.append(winner)
-                    RoundTeam.objects.create(round=round, team=team_a, eliminated=(winner != team_a))
-                    RoundTeam.objects.create(round=round, team=team_b, eliminated=(winner != team_b))
-
-                current_teams = next_round_teams
-                if len(current_teams) == 1:  # Final champion determined
-                    tournament.champion = current_teams[0]
-                    tournament.save()
-                    break
-
-        self.stdout.write(self.style.SUCCESS('Database has been populated with fake data.'))
\ No newline at end of file
+    def reset_sequences(self):
+        # Explicit ids leave PostgreSQL-style sequences behind; MySQL and SQLite need nothing here.
+        models = [User, Team, Player, Game, Score, PlayerGameParticipation]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from league.models import SearchEntry
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search index from the player, user, team, game and tournament tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        count = SearchEntry.objects.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} search terms.'))
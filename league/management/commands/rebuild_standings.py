@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from league.models import Standing
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the precomputed season standings from the games table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--season', type=int, action='append', dest='seasons',
+                            help='Only rebuild the given season (may be repeated)')
+
+    def handle(self, *args, **options):
+        if options['seasons']:
+            for season in options['seasons']:
+                Standing.objects.refresh(season)
+            seasons = options['seasons']
+        else:
+            seasons = Standing.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt standings for {len(seasons)} seasons.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from league.models import TeamStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the denormalized per-team scoring stats from the games table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--team', type=int, action='append', dest='team_ids',
+                            help='Only rebuild the given team id (may be repeated)')
+
+    def handle(self, *args, **options):
+        count = TeamStats.objects.rebuild(team_ids=options['team_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {count} teams.'))
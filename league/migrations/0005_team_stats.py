@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_team_stats(apps, schema_editor):
+    Team = apps.get_model('league', 'Team')
+    Game = apps.get_model('league', 'Game')
+    TeamStats = apps.get_model('league', 'TeamStats')
+
+    home = {row['team_a']: row for row in Game.objects.values('team_a').annotate(
+        n=Count('id'), scored=Sum('team_a_score'), conceded=Sum('team_b_score'))}
+    away = {row['team_b']: row for row in Game.objects.values('team_b').annotate(
+        n=Count('id'), scored=Sum('team_b_score'), conceded=Sum('team_a_score'))}
+    empty = {'n': 0, 'scored': 0, 'conceded': 0}
+
+    stats = []
+    for team_id in Team.objects.values_list('id', flat=True):
+        h = home.get(team_id, empty)
+        a = away.get(team_id, empty)
+        stats.append(TeamStats(
+            team_id=team_id,
+            games_played=h['n'] + a['n'],
+            home_games=h['n'],
+            away_games=a['n'],
+            points_for=h['scored'] + a['scored'],
+            points_against=h['conceded'] + a['conceded'],
+            home_points_for=h['scored'],
+            home_points_against=h['conceded'],
+            away_points_for=a['scored'],
+            away_points_against=a['conceded'],
+        ))
+    TeamStats.objects.bulk_create(stats, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0004_roundteam_tournament_tournamentround_roundteam_round'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamStats',
+            fields=[
+                ('team', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='league.team')),
+                ('games_played', models.IntegerField(default=0)),
+                ('home_games', models.IntegerField(default=0)),
+                ('away_games', models.IntegerField(default=0)),
+                ('points_for', models.BigIntegerField(default=0)),
+                ('points_against', models.BigIntegerField(default=0)),
+                ('home_points_for', models.BigIntegerField(default=0)),
+                ('home_points_against', models.BigIntegerField(default=0)),
+                ('away_points_for', models.BigIntegerField(default=0)),
+                ('away_points_against', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'league_team_stats',
+            },
+        ),
+        migrations.RunPython(populate_team_stats, migrations.RunPython.noop),
+    ]
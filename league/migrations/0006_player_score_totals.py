@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:32
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_score_totals(apps, schema_editor):
+    Player = apps.get_model('league', 'Player')
+    Score = apps.get_model('league', 'Score')
+
+    scores = Score.objects.filter(player=OuterRef('pk')).order_by().values('player')
+    Player.objects.update(
+        score_total=Coalesce(Subquery(scores.annotate(total=Sum('score')).values('total')), Value(0),
+                             output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+        score_count=Coalesce(Subquery(scores.annotate(n=Count('id')).values('n')), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0005_team_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='score_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='score_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(populate_score_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0007_game_date_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TournamentSnapshot',
+            fields=[
+                ('tournament', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='league.tournament')),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('payload', models.JSONField(blank=True, null=True)),
+                ('etag', models.CharField(blank=True, max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'league_tournament_snapshot',
+            },
+        ),
+    ]
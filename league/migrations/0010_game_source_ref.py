@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0009_model_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='source_ref',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_standings(apps, schema_editor):
+    Game = apps.get_model('league', 'Game')
+    Standing = apps.get_model('league', 'Standing')
+
+    results = {}
+    for day, team_a, team_b, score_a, score_b in Game.objects.order_by('date', 'id').values_list(
+            'date', 'team_a_id', 'team_b_id', 'team_a_score', 'team_b_score'):
+        for team_id, scored, conceded in ((team_a, score_a, score_b), (team_b, score_b, score_a)):
+            results.setdefault(day.year, {}).setdefault(team_id, []).append((scored, conceded))
+
+    standings = []
+    for season, teams in results.items():
+        rows = []
+        for team_id, games in teams.items():
+            outcomes = ''.join('W' if scored > conceded else 'L' if scored < conceded else 'D'
+                               for scored, conceded in games)
+            rows.append(Standing(
+                season=season,
+                team_id=team_id,
+                games_played=len(outcomes),
+                wins=outcomes.count('W'),
+                losses=outcomes.count('L'),
+                draws=outcomes.count('D'),
+                points_for=sum(scored for scored, _ in games),
+                points_against=sum(conceded for _, conceded in games),
+                streak=f'{outcomes[-1]}{len(outcomes) - len(outcomes.rstrip(outcomes[-1]))}',
+                last_10=outcomes[:-11:-1],
+            ))
+        rows.sort(key=lambda row: (-(row.wins + row.draws / 2) / row.games_played,
+                                   row.points_against - row.points_for, -row.points_for, row.team_id))
+        for rank, row in enumerate(rows, start=1):
+            row.rank = rank
+        standings.extend(rows)
+    Standing.objects.bulk_create(standings, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0010_game_source_ref'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Standing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField()),
+                ('rank', models.PositiveIntegerField(default=0)),
+                ('games_played', models.IntegerField(default=0)),
+                ('wins', models.IntegerField(default=0)),
+                ('losses', models.IntegerField(default=0)),
+                ('draws', models.IntegerField(default=0)),
+                ('points_for', models.BigIntegerField(default=0)),
+                ('points_against', models.BigIntegerField(default=0)),
+                ('streak', models.CharField(blank=True, max_length=8)),
+                ('last_10', models.CharField(blank=True, max_length=10)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='league.team')),
+            ],
+            options={
+                'db_table': 'league_standing',
+                'indexes': [models.Index(fields=['season', 'rank'], name='league_stan_season_ad81f2_idx')],
+                'unique_together': {('season', 'team')},
+            },
+        ),
+        migrations.RunPython(populate_standings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0011_standing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresenceEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session', models.CharField(max_length=64)),
+                ('kind', models.CharField(choices=[('login', 'Login'), ('logout', 'Logout'), ('heartbeat', 'Heartbeat')], max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='presence_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'league_presence_event',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session', models.CharField(max_length=64)),
+                ('started_at', models.DateTimeField()),
+                ('last_seen_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('duration', models.DurationField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'league_user_session',
+                'indexes': [models.Index(fields=['ended_at', 'last_seen_at'], name='league_user_ended_a_49ea6c_idx'), models.Index(fields=['user', 'session'], name='league_user_user_id_2850e0_idx')],
+            },
+        ),
+    ]
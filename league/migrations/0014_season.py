@@ -0,0 +1,119 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0013_user_login_time_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Season',
+            fields=[
+                ('year', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('archived_at', models.DateTimeField(blank=True, null=True)),
+                ('summary', models.JSONField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'league_season',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedGame',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('location', models.CharField(max_length=255)),
+                ('referee', models.CharField(max_length=100)),
+                ('team_a_score', models.IntegerField()),
+                ('team_b_score', models.IntegerField()),
+                ('source_ref', models.CharField(blank=True, max_length=64, null=True)),
+                ('team_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_home_games', to='league.team')),
+                ('team_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_away_games', to='league.team')),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_games', to='league.season')),
+            ],
+            options={
+                'db_table': 'league_game_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedScore',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('score', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='league.archivedgame')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_scores', to='league.player')),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_scores', to='league.season')),
+            ],
+            options={
+                'db_table': 'league_score_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedParticipation',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('points_scored', models.IntegerField(default=0)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='league.archivedgame')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_participations', to='league.player')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_participations', to='league.team')),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_participations', to='league.season')),
+            ],
+            options={
+                'db_table': 'league_participation_archive',
+            },
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='season',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='games', to='league.season'),
+        ),
+        migrations.AddField(
+            model_name='playergameparticipation',
+            name='season',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='participations', to='league.season'),
+        ),
+        migrations.AddField(
+            model_name='score',
+            name='season',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='scores', to='league.season'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['season', 'date'], name='league_game_season__9bc899_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['team_a', 'date'], name='league_game_team_a__81148f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['team_b', 'date'], name='league_game_team_b__5e3364_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playergameparticipation',
+            index=models.Index(fields=['season', 'player'], name='player_game_season__3503d7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='score',
+            index=models.Index(fields=['season', 'player'], name='league_scor_season__520ee1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedscore',
+            index=models.Index(fields=['season', 'player'], name='league_scor_season__4905b9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedparticipation',
+            index=models.Index(fields=['season', 'player'], name='league_part_season__e3d4d4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedgame',
+            index=models.Index(fields=['season', 'date'], name='league_game_season__2cb92c_idx'),
+        ),
+    ]
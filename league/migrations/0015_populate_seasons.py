@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+import datetime
+
+from django.db import migrations
+
+
+def populate_seasons(apps, schema_editor):
+    Season = apps.get_model('league', 'Season')
+    Game = apps.get_model('league', 'Game')
+    Score = apps.get_model('league', 'Score')
+    PlayerGameParticipation = apps.get_model('league', 'PlayerGameParticipation')
+
+    # Seasons are calendar years; one UPDATE per season and table.
+    for day in Game.objects.dates('date', 'year'):
+        year = day.year
+        Season.objects.get_or_create(year=year, defaults={
+            'start_date': datetime.date(year, 1, 1), 'end_date': datetime.date(year + 1, 1, 1)})
+        games = Game.objects.filter(date__gte=datetime.date(year, 1, 1), date__lt=datetime.date(year + 1, 1, 1))
+        games.update(season_id=year)
+        game_ids = Game.objects.filter(season_id=year).values('id')
+        Score.objects.filter(game_id__in=game_ids).update(season_id=year)
+        PlayerGameParticipation.objects.filter(game_id__in=game_ids).update(season_id=year)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0014_season'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_seasons, migrations.RunPython.noop),
+    ]
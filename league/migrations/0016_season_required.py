@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0015_populate_seasons'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='game',
+            name='season',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='games', to='league.season'),
+        ),
+        migrations.AlterField(
+            model_name='playergameparticipation',
+            name='season',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='participations', to='league.season'),
+        ),
+        migrations.AlterField(
+            model_name='score',
+            name='season',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='scores', to='league.season'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:22
+
+import unicodedata
+
+from django.db import migrations, models
+
+# model name: (kind, indexed fields), as SEARCHABLE in league.models at the time of this migration.
+SEARCHABLE = {
+    'Player': ('player', ('name',)),
+    'User': ('user', ('username',)),
+    'Team': ('team', ('name',)),
+    'Game': ('game', ('location', 'referee')),
+    'Tournament': ('tournament', ('name',)),
+}
+
+# The tokenizer as league.models had it at the time of this migration.
+SEARCH_MAX_WORDS = 8
+
+
+def normalize_search_text(value):
+    text = unicodedata.normalize('NFKD', str(value or ''))
+    text = ''.join(char if char.isalnum() else ' ' for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+
+def search_entries(kind, object_id, values):
+    rows = []
+    for field, value in values.items():
+        words = normalize_search_text(value).split()
+        for position in range(min(len(words), SEARCH_MAX_WORDS)):
+            rows.append({'kind': kind, 'object_id': object_id, 'field': field, 'label': str(value)[:255],
+                         'term': ' '.join(words[position:])[:255]})
+    return rows
+
+
+def populate_search_index(apps, schema_editor):
+    SearchEntry = apps.get_model('league', 'SearchEntry')
+    for model_name, (kind, fields) in SEARCHABLE.items():
+        model = apps.get_model('league', model_name)
+        batch = []
+        for object_id, *values in model.objects.order_by('id').values_list('id', *fields).iterator(chunk_size=5000):
+            batch.extend(SearchEntry(**row) for row in search_entries(kind, object_id, dict(zip(fields, values))))
+            if len(batch) >= 5000:
+                SearchEntry.objects.bulk_create(batch)
+                batch = []
+        SearchEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0016_season_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('player', 'Player'), ('user', 'User'), ('team', 'Team'), ('game', 'Game'), ('tournament', 'Tournament')], max_length=16)),
+                ('object_id', models.IntegerField()),
+                ('field', models.CharField(max_length=32)),
+                ('label', models.CharField(max_length=255)),
+                ('term', models.CharField(max_length=255)),
+            ],
+            options={
+                'db_table': 'league_search_index',
+                'indexes': [models.Index(fields=['term'], name='league_sear_term_72194b_idx'), models.Index(fields=['kind', 'term'], name='league_sear_kind_3dc7c9_idx'), models.Index(fields=['kind', 'object_id'], name='league_sear_kind_c7c380_idx')],
+            },
+        ),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
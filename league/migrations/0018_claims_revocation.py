@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:37
+
+import time
+
+from django.db import migrations, models
+
+
+def revoke_existing_claims(apps, schema_editor):
+    # Revocations used to live only in the cache; distrust every token issued before now.
+    ClaimsRevocation = apps.get_model('league', 'ClaimsRevocation')
+    ClaimsRevocation.objects.create(user_id=0, revoked_at=time.time())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0017_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaimsRevocation',
+            fields=[
+                ('user_id', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('revoked_at', models.FloatField()),
+            ],
+            options={
+                'db_table': 'league_claims_revocation',
+            },
+        ),
+        migrations.RunPython(revoke_existing_claims, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('league', '0020_archive_big_ids'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchentry',
+            name='object_id',
+            field=models.BigIntegerField(),
+        ),
+    ]
@@ -1,10 +1,13 @@
 # models.py
 
 import datetime
-from django.db import models
+import unicodedata
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
-from django.db.models import Avg
+from django.db.models import Avg, Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 
 class User(AbstractUser):
     is_admin = models.BooleanField(default=False)
@@ -17,6 +20,9 @@ class User(AbstractUser):
 
     class Meta:
         db_table = 'league_user'
+        indexes = [
+            models.Index(fields=['total_login_time'])
+        ]
 
 class Team(models.Model):
     name = models.CharField(max_length=100)
@@ -27,17 +33,50 @@ class Team(models.Model):
 
     @property
     def average_score(self):
-        from django.db.models import Q
+        # Read from the denormalized TeamStats row; select_related('stats') keeps this query-free.
+        try:
+            stats = self.stats
+        except TeamStats.DoesNotExist:
+            return 0
+        return stats.average_score
 
-        home_avg = self.home_games.aggregate(avg_score=Avg('team_a_score'))['avg_score'] or 0
-        away_avg = self.away_games.aggregate(avg_score=Avg('team_b_score'))['avg_score'] or 0
-        total_games = self.home_games.count() + self.away_games.count()
 
-        if total_games == 0:
-            return 0
-        else:
-            total_avg_score = (home_avg * self.home_games.count() + away_avg * self.away_games.count()) / total_games
-            return total_avg_score
+class PlayerQuerySet(models.QuerySet):
+    def with_live_average(self):
+        """
+        Annotates `live_average_score` computed from the score rows in the same query.
+        """
+        return self.annotate(live_average_score=Coalesce(
+            Avg('scores__score'), Value(0), output_field=models.DecimalField(max_digits=5, decimal_places=2)))
+
+    def refresh_score_totals(self):
+        """
+        Recomputes the running score sum/count of every player in the queryset with one UPDATE,
+        counting archived seasons too.
+        """
+        def total(model):
+            scores = model.objects.filter(player=OuterRef('pk')).order_by().values('player')
+            return Coalesce(Subquery(scores.annotate(total=Sum('score')).values('total')), Value(0),
+                            output_field=models.DecimalField(max_digits=12, decimal_places=2))
+
+        def count(model):
+            scores = model.objects.filter(player=OuterRef('pk')).order_by().values('player')
+            return Coalesce(Subquery(scores.annotate(n=Count('id')).values('n')), Value(0))
+
+        return self.update(score_total=total(Score) + total(ArchivedScore),
+                           score_count=count(Score) + count(ArchivedScore))
+
+    def refresh_games_participated(self):
+        """
+        Recounts games_participated of every player in the queryset with one UPDATE,
+        counting archived seasons too.
+        """
+        def count(model):
+            participations = model.objects.filter(player=OuterRef('pk')).order_by() \
+                .values('player').annotate(n=Count('id')).values('n')
+            return Coalesce(Subquery(participations), Value(0))
+
+        return self.update(games_participated=count(PlayerGameParticipation) + count(ArchivedParticipation))
 
 
 class Player(models.Model):
@@ -46,6 +85,10 @@ class Player(models.Model):
     name = models.CharField(max_length=100)
     height = models.FloatField()
     games_participated = models.IntegerField()
+    score_total = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    score_count = models.IntegerField(default=0, editable=False)
+
+    objects = PlayerQuerySet.as_manager()
 
     class Meta:
         db_table = 'league_player'
@@ -55,8 +98,142 @@ class Player(models.Model):
 
     @property
     def average_score(self):
-        total_score = self.scores.aggregate(avg_score=Avg('score'))['avg_score']
-        return total_score if total_score is not None else 0 
+        # Running totals are kept by the Score signals and ScoreQuerySet bulk paths.
+        if not self.score_count:
+            return 0
+        return self.score_total / self.score_count
+
+
+def season_of(day):
+    # A season is the calendar year the game was played in.
+    if isinstance(day, str):
+        day = datetime.date.fromisoformat(day)
+    return day.year
+
+
+def season_bounds(season):
+    return datetime.date(season, 1, 1), datetime.date(season + 1, 1, 1)
+
+
+class SeasonManager(models.Manager):
+    def ensure(self, seasons):
+        """
+        Creates the missing Season rows for the given years with one insert.
+        """
+        self.bulk_create([self.model.for_year(season) for season in set(seasons)], ignore_conflicts=True)
+
+    def for_date(self, day):
+        year = season_of(day)
+        season = self.filter(pk=year).first()
+        if season is None:
+            self.ensure([year])
+            season = self.get(pk=year)
+        return season
+
+
+class Season(models.Model):
+    """
+    A season's date range. Games, scores and participations carry the season so
+    current-season queries stay on the (season, ...) indexes; closed seasons can be
+    moved to the archive tables by the archive_seasons command.
+    """
+    year = models.PositiveSmallIntegerField(primary_key=True)
+    start_date = models.DateField()
+    # Exclusive: the first day after the season.
+    end_date = models.DateField()
+    archived_at = models.DateTimeField(null=True, blank=True)
+    # Precomputed when archived: game and point totals, final standings, top scorers.
+    summary = models.JSONField(null=True, blank=True)
+
+    objects = SeasonManager()
+
+    class Meta:
+        db_table = 'league_season'
+
+    def __str__(self):
+        return str(self.year)
+
+    @classmethod
+    def for_year(cls, year):
+        start, end = season_bounds(year)
+        return cls(year=year, start_date=start, end_date=end)
+
+    @property
+    def is_closed(self):
+        return self.end_date <= timezone.localdate()
+
+
+class GameQuerySet(models.QuerySet):
+    # bulk_create and update() skip the model signals, so they refresh the games' team
+    # stats, standings, stored ratings, snapshots and search entries themselves.
+
+    def bulk_create(self, objs, *args, refresh_aggregates=True, **kwargs):
+        # Game.save assigns the season; bulk inserts bypass it. Loaders inserting many
+        # batches can pass refresh_aggregates=False and refresh once at the end.
+        objs = list(objs)
+        for game in objs:
+            game.season_id = season_of(game.date)
+        Season.objects.ensure(game.season_id for game in objs)
+        if not refresh_aggregates:
+            return super().bulk_create(objs, *args, **kwargs)
+        with transaction.atomic():
+            created = super().bulk_create(objs, *args, **kwargs)
+            _refresh_game_aggregates(created)
+            # Backends that do not return primary keys leave these to rebuild_search_index.
+            SearchEntry.objects.index([game for game in created if game.pk is not None], created=True)
+        ModelVersion.objects.bump(Game)
+        return created
+
+    def update(self, **kwargs):
+        fields = ('id', 'date', 'team_a', 'team_b', 'season')
+        with transaction.atomic():
+            before = list(self.only(*fields))
+            rows = super().update(**kwargs)
+            after = list(Game.objects.filter(id__in=[game.pk for game in before]).only(*fields))
+            moved = _move_game_seasons(after)
+            _refresh_game_aggregates(before + after)
+            if {'location', 'referee'} & set(kwargs):
+                SearchEntry.objects.index(after)
+        ModelVersion.objects.bump(Game, *((Score, PlayerGameParticipation) if moved else ()))
+        return rows
+
+
+def _move_game_seasons(games):
+    """
+    Files the games whose date moved into another season, with their scores and
+    participations, under the new season. Returns whether any moved.
+    """
+    moved = {}
+    for game in games:
+        season = season_of(game.date)
+        if season != game.season_id:
+            moved.setdefault(season, []).append(game.pk)
+            game.season_id = season
+    if not moved:
+        return False
+    Season.objects.ensure(moved)
+    archived = Season.objects.filter(pk__in=moved, archived_at__isnull=False).values_list('year', flat=True).first()
+    if archived is not None:
+        raise ValidationError(f'Season {archived} is archived.')
+    for season, game_ids in moved.items():
+        # Plain QuerySet.update: the season does not change any of the maintained totals.
+        for model, lookup in ((Game, 'id__in'), (Score, 'game_id__in'), (PlayerGameParticipation, 'game_id__in')):
+            models.QuerySet.update(model.objects.filter(**{lookup: game_ids}), season_id=season)
+    return True
+
+
+def _refresh_game_aggregates(games):
+    """
+    Recomputes the team stats and standings of the games' teams, and drops the stored
+    ratings and tournament snapshots they feed, from the games' (old and new) rows.
+    """
+    team_ids = {game.team_a_id for game in games} | {game.team_b_id for game in games}
+    if not team_ids:
+        return
+    TeamStats.objects.rebuild(team_ids=team_ids)
+    Standing.objects.refresh_games(games)
+    TeamRating.objects.invalidate({season_of(game.date) for game in games})
+    TournamentSnapshot.objects.invalidate(team_ids=list(team_ids))
 
 
 class Game(models.Model):
@@ -67,10 +244,310 @@ class Game(models.Model):
     team_b = models.ForeignKey(Team, related_name='away_games', on_delete=models.CASCADE)
     team_a_score = models.IntegerField()
     team_b_score = models.IntegerField()
+    # Client-supplied key of ingested results, so retried uploads are not recorded twice.
+    source_ref = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    season = models.ForeignKey(Season, on_delete=models.PROTECT, related_name='games')
 
+    objects = GameQuerySet.as_manager()
 
     class Meta:
         db_table = 'league_game'
+        indexes = [
+            models.Index(fields=['date', 'id']),
+            models.Index(fields=['season', 'date']),
+            models.Index(fields=['team_a', 'date']),
+            models.Index(fields=['team_b', 'date']),
+        ]
+
+    def save(self, *args, **kwargs):
+        season = Season.objects.for_date(self.date)
+        if season.archived_at is not None:
+            raise ValidationError(f'Season {season.year} is archived.')
+        self.season = season
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'date' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'season'}
+        # TeamStats is maintained from the pre/post save signals, so keep them in one transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+def _game_season_id(obj):
+    # Scores and participations are filed under their game's season.
+    if type(obj).game.is_cached(obj) and obj.game.pk == obj.game_id:
+        return obj.game.season_id
+    return Game.objects.filter(pk=obj.game_id).values_list('season_id', flat=True).first()
+
+
+def _fill_game_seasons(objs):
+    missing = {obj.game_id for obj in objs if obj.season_id is None}
+    if missing:
+        seasons = dict(Game.objects.filter(id__in=missing).values_list('id', 'season_id'))
+        for obj in objs:
+            if obj.season_id is None:
+                obj.season_id = seasons.get(obj.game_id)
+
+
+class TeamStatsManager(models.Manager):
+    def record_game(self, game, sign=1):
+        """
+        Adds (sign=1) or removes (sign=-1) a game's contribution to both teams' stats.
+        """
+        self.filter(team_id=game.team_a_id).update(
+            games_played=F('games_played') + sign,
+            home_games=F('home_games') + sign,
+            points_for=F('points_for') + sign * game.team_a_score,
+            points_against=F('points_against') + sign * game.team_b_score,
+            home_points_for=F('home_points_for') + sign * game.team_a_score,
+            home_points_against=F('home_points_against') + sign * game.team_b_score,
+        )
+        self.filter(team_id=game.team_b_id).update(
+            games_played=F('games_played') + sign,
+            away_games=F('away_games') + sign,
+            points_for=F('points_for') + sign * game.team_b_score,
+            points_against=F('points_against') + sign * game.team_a_score,
+            away_points_for=F('away_points_for') + sign * game.team_b_score,
+            away_points_against=F('away_points_against') + sign * game.team_a_score,
+        )
+
+    def rebuild(self, team_ids=None):
+        """
+        Recomputes stats from the Game and archived game tables with two grouped queries each.
+        """
+        teams = Team.objects.all()
+        if team_ids is not None:
+            teams = teams.filter(id__in=team_ids)
+
+        home_by_team, away_by_team = {}, {}
+        for model in (Game, ArchivedGame):
+            games = model.objects.order_by()
+            home = games.values('team_a').annotate(
+                n=Count('id'), scored=Sum('team_a_score'), conceded=Sum('team_b_score'))
+            away = games.values('team_b').annotate(
+                n=Count('id'), scored=Sum('team_b_score'), conceded=Sum('team_a_score'))
+            if team_ids is not None:
+                home = home.filter(team_a__in=team_ids)
+                away = away.filter(team_b__in=team_ids)
+            for rows, by_team, side in ((home, home_by_team, 'team_a'), (away, away_by_team, 'team_b')):
+                for row in rows:
+                    total = by_team.setdefault(row[side], {'n': 0, 'scored': 0, 'conceded': 0})
+                    for field in total:
+                        total[field] += row[field]
+
+        stats = []
+        for team_id in teams.values_list('id', flat=True):
+            h = home_by_team.get(team_id, {'n': 0, 'scored': 0, 'conceded': 0})
+            a = away_by_team.get(team_id, {'n': 0, 'scored': 0, 'conceded': 0})
+            stats.append(self.model(
+                team_id=team_id,
+                games_played=h['n'] + a['n'],
+                home_games=h['n'],
+                away_games=a['n'],
+                points_for=h['scored'] + a['scored'],
+                points_against=h['conceded'] + a['conceded'],
+                home_points_for=h['scored'],
+                home_points_against=h['conceded'],
+                away_points_for=a['scored'],
+                away_points_against=a['conceded'],
+            ))
+
+        with transaction.atomic():
+            existing = self.all()
+            if team_ids is not None:
+                existing = existing.filter(team_id__in=team_ids)
+            existing.delete()
+            self.bulk_create(stats, batch_size=1000)
+        return len(stats)
+
+
+class TeamStats(models.Model):
+    team = models.OneToOneField(Team, primary_key=True, on_delete=models.CASCADE, related_name='stats')
+    games_played = models.IntegerField(default=0)
+    home_games = models.IntegerField(default=0)
+    away_games = models.IntegerField(default=0)
+    points_for = models.BigIntegerField(default=0)
+    points_against = models.BigIntegerField(default=0)
+    home_points_for = models.BigIntegerField(default=0)
+    home_points_against = models.BigIntegerField(default=0)
+    away_points_for = models.BigIntegerField(default=0)
+    away_points_against = models.BigIntegerField(default=0)
+
+    objects = TeamStatsManager()
+
+    class Meta:
+        db_table = 'league_team_stats'
+
+    @property
+    def average_score(self):
+        if self.games_played == 0:
+            return 0
+        return self.points_for / self.games_played
+
+
+class StandingManager(models.Manager):
+    def refresh(self, season, team_ids=None):
+        """
+        Recomputes the season rows of the given teams (every team when None) from their
+        games in date order and re-ranks the season: one query for the games, one for the
+        season's rows, then bulk writes of the rows that changed. Archived seasons have no
+        games left to count and are kept as they are.
+        """
+        if Season.objects.filter(pk=season, archived_at__isnull=False).exists():
+            return 0
+        games = Game.objects.filter(season_id=season)
+        if team_ids is not None:
+            team_ids = set(team_ids)
+            games = games.filter(Q(team_a__in=team_ids) | Q(team_b__in=team_ids))
+        results = {team_id: [] for team_id in team_ids or ()}
+        for team_a, team_b, score_a, score_b in games.order_by('date', 'id').values_list(
+                'team_a_id', 'team_b_id', 'team_a_score', 'team_b_score'):
+            for team_id, scored, conceded in ((team_a, score_a, score_b), (team_b, score_b, score_a)):
+                if team_ids is None or team_id in team_ids:
+                    results.setdefault(team_id, []).append((scored, conceded))
+
+        with transaction.atomic():
+            rows = {row.team_id: row for row in self.select_for_update().filter(season=season)}
+            emptied = [team_id for team_id in rows if not results.get(team_id) and
+                       (team_ids is None or team_id in team_ids)]
+            for team_id in emptied:
+                del rows[team_id]
+            created, changed = [], {}
+            for team_id, team_results in results.items():
+                if not team_results:
+                    continue
+                row = rows.get(team_id)
+                if row is None:
+                    row = rows[team_id] = self.model(season=season, team_id=team_id)
+                    created.append(row)
+                else:
+                    changed[team_id] = row
+                row.tally(team_results)
+
+            for rank, row in enumerate(sorted(rows.values(), key=Standing.sort_key), start=1):
+                if row.rank != rank:
+                    row.rank = rank
+                    if row.pk is not None:
+                        changed[row.team_id] = row
+
+            if emptied:
+                self.filter(season=season, team_id__in=emptied).delete()
+            self.bulk_update(changed.values(), Standing.TALLY_FIELDS + ['rank'], batch_size=500)
+            self.bulk_create(created, batch_size=1000)
+        ModelVersion.objects.bump(Standing)
+        return len(rows)
+
+    def refresh_games(self, games):
+        """
+        Refreshes the seasons and teams touched by the given games.
+        """
+        touched = {}
+        for game in games:
+            touched.setdefault(season_of(game.date), set()).update((game.team_a_id, game.team_b_id))
+        for season, team_ids in touched.items():
+            self.refresh(season, team_ids)
+
+    def rebuild(self):
+        """
+        Recomputes every season that has not been archived from scratch.
+        """
+        seasons = sorted(Game.objects.order_by().values_list('season_id', flat=True).distinct())
+        archived = Season.objects.filter(archived_at__isnull=False).values('year')
+        self.exclude(season__in=seasons).exclude(season__in=archived).delete()
+        for season in seasons:
+            self.refresh(season)
+        return seasons
+
+
+class Standing(models.Model):
+    """
+    A team's record in one season, precomputed so the standings table is one range scan
+    of the (season, rank) index. Maintained from Game writes by the signals.
+    """
+    TALLY_FIELDS = ['games_played', 'wins', 'losses', 'draws', 'points_for', 'points_against', 'streak', 'last_10']
+
+    season = models.PositiveSmallIntegerField()
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='standings')
+    rank = models.PositiveIntegerField(default=0)
+    games_played = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+    draws = models.IntegerField(default=0)
+    points_for = models.BigIntegerField(default=0)
+    points_against = models.BigIntegerField(default=0)
+    # 'W3': three wins in a row; last_10: most recent results first, e.g. 'WWLDW'.
+    streak = models.CharField(max_length=8, blank=True)
+    last_10 = models.CharField(max_length=10, blank=True)
+
+    objects = StandingManager()
+
+    class Meta:
+        db_table = 'league_standing'
+        unique_together = ('season', 'team')
+        indexes = [
+            models.Index(fields=['season', 'rank'])
+        ]
+
+    def tally(self, results):
+        """
+        Sets the record from (scored, conceded) pairs, oldest game first.
+        """
+        outcomes = ''.join('W' if scored > conceded else 'L' if scored < conceded else 'D'
+                           for scored, conceded in results)
+        self.games_played = len(outcomes)
+        self.wins, self.losses, self.draws = outcomes.count('W'), outcomes.count('L'), outcomes.count('D')
+        self.points_for = sum(scored for scored, _ in results)
+        self.points_against = sum(conceded for _, conceded in results)
+        last = outcomes[-1]
+        self.streak = f'{last}{len(outcomes) - len(outcomes.rstrip(last))}'
+        self.last_10 = outcomes[:-11:-1]
+
+    @property
+    def win_pct(self):
+        if not self.games_played:
+            return 0
+        return (self.wins + self.draws / 2) / self.games_played
+
+    @property
+    def point_diff(self):
+        return self.points_for - self.points_against
+
+    def sort_key(self):
+        return -self.win_pct, -self.point_diff, -self.points_for, self.team_id
+
+
+class TeamRatingManager(models.Manager):
+    def invalidate(self, seasons):
+        """
+        Drops the ratings from the earliest of the given seasons on; each season's ratings
+        carry on from the one before, so later seasons are replayed again too.
+        """
+        seasons = [season for season in seasons if season is not None]
+        if seasons:
+            self.filter(season__gte=min(seasons)).delete()
+
+
+class TeamRating(models.Model):
+    """
+    A team's Elo rating after the last game of a season, for every team rated by then.
+    Written by forecast.team_ratings() and dropped by the Game signals and game ingest
+    when a season's results change.
+    """
+    season = models.PositiveSmallIntegerField()
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='ratings')
+    rating = models.FloatField()
+
+    objects = TeamRatingManager()
+
+    class Meta:
+        db_table = 'league_team_rating'
+        unique_together = ('season', 'team')
+
+
+class PlayerGameParticipationQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        _fill_game_seasons(objs)
+        return super().bulk_create(objs, *args, **kwargs)
 
 
 class PlayerGameParticipation(models.Model):
@@ -78,27 +555,132 @@ class PlayerGameParticipation(models.Model):
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='player_participations')
     team = models.ForeignKey(Team, on_delete=models.CASCADE)
     points_scored = models.IntegerField(default=0)
+    season = models.ForeignKey(Season, on_delete=models.PROTECT, related_name='participations')
+
+    objects = PlayerGameParticipationQuerySet.as_manager()
 
     class Meta:
         db_table = 'player_game_participation'
         unique_together = ('player', 'game')
+        indexes = [
+            models.Index(fields=['season', 'player'])
+        ]
 
     def save(self, *args, **kwargs):
-        if self.player.team != self.team:
+        if self.player.team_id != self.team_id:
             raise ValidationError("Player's team must match the participating team in the game.")
+        self.season_id = _game_season_id(self)
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.player.name} in game {self.game.id}"
 
 
+class ScoreQuerySet(models.QuerySet):
+    # bulk_create and update() skip the model signals, so they refresh the players' totals themselves.
+
+    def bulk_create(self, objs, *args, refresh_totals=True, **kwargs):
+        # Loaders inserting many batches can pass refresh_totals=False and refresh once at the end.
+        objs = list(objs)
+        _fill_game_seasons(objs)
+        if not refresh_totals:
+            return super().bulk_create(objs, *args, **kwargs)
+        with transaction.atomic():
+            created = super().bulk_create(objs, *args, **kwargs)
+            players = Player.objects.filter(id__in={score.player_id for score in created})
+            players.refresh_score_totals()
+            TournamentSnapshot.objects.invalidate(team_ids=players.values('team_id'))
+        ModelVersion.objects.bump(Score, Player)
+        return created
+
+    def update(self, **kwargs):
+        with transaction.atomic():
+            player_ids = set(self.values_list('player_id', flat=True))
+            rows = super().update(**kwargs)
+            new_player = kwargs.get('player', kwargs.get('player_id'))
+            if new_player is not None:
+                player_ids.add(getattr(new_player, 'pk', new_player))
+            players = Player.objects.filter(id__in=player_ids)
+            players.refresh_score_totals()
+            TournamentSnapshot.objects.invalidate(team_ids=players.values('team_id'))
+        ModelVersion.objects.bump(Score, Player)
+        return rows
+
+
 class Score(models.Model):
     player = models.ForeignKey(Player, related_name='scores', on_delete=models.CASCADE)
     game = models.ForeignKey(Game, related_name='scores', on_delete=models.CASCADE)
     score = models.DecimalField(max_digits=5, decimal_places=2)
+    season = models.ForeignKey(Season, on_delete=models.PROTECT, related_name='scores')
+
+    objects = ScoreQuerySet.as_manager()
 
     class Meta:
         db_table = 'league_score'
+        indexes = [
+            models.Index(fields=['season', 'player'])
+        ]
+
+    def save(self, *args, **kwargs):
+        self.season_id = _game_season_id(self)
+        # The player's running totals are updated from the save signals; keep them in one transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+# Archive tables: the games, scores and participations of archived seasons, moved out
+# of the hot tables with their ids kept. Aggregate rebuilds (TeamStats, player totals)
+# still count them.
+
+class ArchivedGame(models.Model):
+    # The live row's id, kept so ids stay unique across the live and archive tables.
+    id = models.BigIntegerField(primary_key=True)
+    season = models.ForeignKey(Season, on_delete=models.PROTECT, related_name='archived_games')
+    date = models.DateField()
+    location = models.CharField(max_length=255)
+    referee = models.CharField(max_length=100)
+    team_a = models.ForeignKey(Team, related_name='archived_home_games', on_delete=models.CASCADE)
+    team_b = models.ForeignKey(Team, related_name='archived_away_games', on_delete=models.CASCADE)
+    team_a_score = models.IntegerField()
+    team_b_score = models.IntegerField()
+    source_ref = models.CharField(max_length=64, null=True, blank=True)
+
+    class Meta:
+        db_table = 'league_game_archive'
+        indexes = [
+            models.Index(fields=['season', 'date'])
+        ]
+
+
+class ArchivedScore(models.Model):
+    # The live row's id, kept so ids stay unique across the live and archive tables.
+    id = models.BigIntegerField(primary_key=True)
+    season = models.ForeignKey(Season, on_delete=models.PROTECT, related_name='archived_scores')
+    game = models.ForeignKey(ArchivedGame, related_name='scores', on_delete=models.CASCADE)
+    player = models.ForeignKey(Player, related_name='archived_scores', on_delete=models.CASCADE)
+    score = models.DecimalField(max_digits=5, decimal_places=2)
+
+    class Meta:
+        db_table = 'league_score_archive'
+        indexes = [
+            models.Index(fields=['season', 'player'])
+        ]
+
+
+class ArchivedParticipation(models.Model):
+    # The live row's id, kept so ids stay unique across the live and archive tables.
+    id = models.BigIntegerField(primary_key=True)
+    season = models.ForeignKey(Season, on_delete=models.PROTECT, related_name='archived_participations')
+    game = models.ForeignKey(ArchivedGame, related_name='participations', on_delete=models.CASCADE)
+    player = models.ForeignKey(Player, related_name='archived_participations', on_delete=models.CASCADE)
+    team = models.ForeignKey(Team, related_name='archived_participations', on_delete=models.CASCADE)
+    points_scored = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'league_participation_archive'
+        indexes = [
+            models.Index(fields=['season', 'player'])
+        ]
+
 
 class Tournament(models.Model):
     name = models.CharField(max_length=100)
@@ -125,3 +707,279 @@ class RoundTeam(models.Model):
 
     class Meta:
         db_table = 'league_round_team'
+
+
+class TournamentSnapshotManager(models.Manager):
+    def invalidate(self, tournament_ids=None, team_ids=None):
+        """
+        Marks the snapshots of the given tournaments, and of every tournament the given
+        teams play in or won, for regeneration on their next read. Both arguments accept
+        id lists or values() subqueries.
+        """
+        condition = models.Q(pk__in=[])
+        if tournament_ids is not None:
+            condition |= models.Q(tournament_id__in=tournament_ids)
+        if team_ids is not None:
+            condition |= models.Q(tournament_id__in=RoundTeam.objects.filter(team_id__in=team_ids)
+                                  .values('round__tournament_id'))
+            condition |= models.Q(tournament__champion_id__in=team_ids)
+        return self.filter(condition).update(payload=None, version=F('version') + 1)
+
+
+class TournamentSnapshot(models.Model):
+    """
+    Materialized TournamentSerializer output. `payload` is cleared by the model signals
+    when the bracket or its teams change and rebuilt on the next read.
+    """
+    tournament = models.OneToOneField(Tournament, primary_key=True, on_delete=models.CASCADE, related_name='snapshot')
+    version = models.PositiveIntegerField(default=1)
+    payload = models.JSONField(null=True, blank=True)
+    etag = models.CharField(max_length=64, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TournamentSnapshotManager()
+
+    class Meta:
+        db_table = 'league_tournament_snapshot'
+
+
+class ModelVersionManager(models.Manager):
+    def bump(self, *models):
+        """
+        Increments the version and modified time of each model, inside the caller's transaction.
+        """
+        labels = [model._meta.label_lower for model in models]
+        now = timezone.now()
+        updated = self.filter(label__in=labels).update(version=F('version') + 1, modified_at=now)
+        if updated < len(labels):
+            self.bulk_create([self.model(label=label, version=1, modified_at=now) for label in labels],
+                             ignore_conflicts=True)
+
+    def current(self, models):
+        """
+        Returns {label: (version, modified_at)} for the given models in one query.
+        """
+        labels = [model._meta.label_lower for model in models]
+        found = {label: (version, modified_at) for label, version, modified_at in
+                 self.filter(label__in=labels).values_list('label', 'version', 'modified_at')}
+        return {label: found.get(label, (0, None)) for label in labels}
+
+
+class ModelVersion(models.Model):
+    """
+    Per-model change counter, bumped by the save/delete signals. Drives response cache
+    keys and the ETag/Last-Modified validators of the API.
+    """
+    label = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    modified_at = models.DateTimeField(default=timezone.now)
+
+    objects = ModelVersionManager()
+
+    class Meta:
+        db_table = 'league_model_version'
+
+
+class ClaimsRevocation(models.Model):
+    """
+    When the token claims of a user (user_id 0: of everybody) were last revoked; claims
+    issued before then are not trusted. The durable record behind the auth cache.
+    """
+    EVERYONE = 0
+
+    user_id = models.PositiveIntegerField(primary_key=True)
+    revoked_at = models.FloatField()
+
+    class Meta:
+        db_table = 'league_claims_revocation'
+
+
+class PresenceEvent(models.Model):
+    """
+    Append-only journal of logins, logouts and heartbeats. Requests only insert here;
+    presence.flush() folds the events into UserSession and the User counters in batches.
+    """
+    LOGIN = 'login'
+    LOGOUT = 'logout'
+    HEARTBEAT = 'heartbeat'
+    KIND_CHOICES = [(LOGIN, 'Login'), (LOGOUT, 'Logout'), (HEARTBEAT, 'Heartbeat')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='presence_events')
+    session = models.CharField(max_length=64)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'league_presence_event'
+
+
+class UserSession(models.Model):
+    """
+    One client session of a user, from its first login/heartbeat to its logout, or to
+    its last heartbeat once it has been silent for LEAGUE_PRESENCE_TIMEOUT.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sessions')
+    session = models.CharField(max_length=64)
+    started_at = models.DateTimeField()
+    last_seen_at = models.DateTimeField()
+    ended_at = models.DateTimeField(null=True, blank=True)
+    duration = models.DurationField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'league_user_session'
+        indexes = [
+            models.Index(fields=['ended_at', 'last_seen_at']),
+            models.Index(fields=['user', 'session']),
+        ]
+
+    def close(self, ended_at):
+        self.ended_at = ended_at
+        self.duration = ended_at - self.started_at
+
+
+def normalize_search_text(value):
+    """
+    Lowercase, accent-free words separated by single spaces: 'Zoë O'Neil' -> 'zoe o neil'.
+    """
+    text = unicodedata.normalize('NFKD', str(value or ''))
+    text = ''.join(char if char.isalnum() else ' ' for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+
+def search_entries(kind, object_id, values):
+    """
+    Index rows for one object: per field, one term starting at each of its first
+    SEARCH_MAX_WORDS words, so a prefix of any word finds it with an index range scan.
+    """
+    rows = []
+    for field, value in values.items():
+        words = normalize_search_text(value).split()
+        for position in range(min(len(words), SEARCH_MAX_WORDS)):
+            rows.append({'kind': kind, 'object_id': object_id, 'field': field, 'label': str(value)[:255],
+                         'term': ' '.join(words[position:])[:255]})
+    return rows
+
+
+def prefix_range(prefix):
+    """
+    (low, high) bounds of the strings starting with `prefix`, for term__gte/term__lt.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SearchEntryManager(models.Manager):
+    def index(self, objects, created=False):
+        """
+        Replaces the index rows of the given Player, User, Team, Game or Tournament objects;
+        `created` skips removing the rows of objects that cannot have any yet.
+        """
+        by_model = {}
+        for obj in objects:
+            by_model.setdefault(type(obj), []).append(obj)
+        for model, objs in by_model.items():
+            kind, fields = SEARCHABLE[model]
+            if not created:
+                self.filter(kind=kind, object_id__in=[obj.pk for obj in objs]).delete()
+            self.bulk_create([
+                SearchEntry(**row) for obj in objs
+                for row in search_entries(kind, obj.pk, {field: getattr(obj, field) for field in fields})
+            ])
+
+    def remove(self, model, ids):
+        """
+        Drops the index rows of `model` objects; `ids` is a list or a values() subquery.
+        """
+        return self.filter(kind=SEARCHABLE[model][0], object_id__in=ids).delete()
+
+    def rebuild(self, models=None, batch_size=5000):
+        """
+        Rebuilds the index rows of the given searchable models (default: all) from their tables.
+        """
+        total = 0
+        for model in models or SEARCHABLE:
+            kind, fields = SEARCHABLE[model]
+            self.filter(kind=kind).delete()
+            batch = []
+            for object_id, *values in model.objects.order_by('id').values_list('id', *fields).iterator(
+                    chunk_size=batch_size):
+                batch.extend(SearchEntry(**row) for row in search_entries(kind, object_id, dict(zip(fields, values))))
+                if len(batch) >= batch_size:
+                    self.bulk_create(batch, batch_size=batch_size)
+                    total += len(batch)
+                    batch = []
+            self.bulk_create(batch, batch_size=batch_size)
+            total += len(batch)
+        return total
+
+    def matching(self, query, kinds=None):
+        """
+        Entries whose text, from the start of any word, begins with the normalized query
+        ('of team 1' finds 'Player 2 of Team 12'); one index range scan on `term`.
+        """
+        prefix = normalize_search_text(query)
+        if not prefix:
+            return self.none()
+        low, high = prefix_range(prefix)
+        entries = self.filter(term__gte=low, term__lt=high)
+        if kinds is not None:
+            entries = entries.filter(kind__in=kinds)
+        return entries
+
+    def lookup(self, query, kinds=None, limit=10):
+        """
+        Up to `limit` distinct matching objects in term order, as {kind, id, field, label}.
+        An object has a row per matching word, so rows are read a window at a time until
+        `limit` objects were seen or the matches run out.
+        """
+        results, seen = [], set()
+        rows = self.matching(query, kinds).order_by('term', 'kind', 'object_id').values_list(
+            'kind', 'object_id', 'field', 'label')
+        window, start = limit * 2, 0
+        while len(results) < limit:
+            batch = list(rows[start:start + window])
+            for kind, object_id, field, label in batch:
+                if (kind, object_id) not in seen:
+                    seen.add((kind, object_id))
+                    results.append({'kind': kind, 'id': object_id, 'field': field, 'label': label})
+            if len(batch) < window:
+                break
+            start += window
+        return results[:limit]
+
+
+class SearchEntry(models.Model):
+    """
+    Normalized search index over names, usernames, game locations and referees, kept
+    current by the model signals. Prefix lookups are B-tree range scans on `term`, so
+    they work alike on every backend and do not scan the source tables.
+    """
+    KIND_CHOICES = [('player', 'Player'), ('user', 'User'), ('team', 'Team'), ('game', 'Game'),
+                    ('tournament', 'Tournament')]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    field = models.CharField(max_length=32)
+    label = models.CharField(max_length=255)
+    term = models.CharField(max_length=255)
+
+    objects = SearchEntryManager()
+
+    class Meta:
+        db_table = 'league_search_index'
+        indexes = [
+            models.Index(fields=['term']),
+            models.Index(fields=['kind', 'term']),
+            models.Index(fields=['kind', 'object_id']),
+        ]
+
+
+SEARCH_MAX_WORDS = 8
+
+# model: (kind, indexed fields)
+SEARCHABLE = {
+    Player: ('player', ('name',)),
+    User: ('user', ('username',)),
+    Team: ('team', ('name',)),
+    Game: ('game', ('location', 'referee')),
+    Tournament: ('tournament', ('name',)),
+}
@@ -0,0 +1,122 @@
+# pagination.py
+
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination: the cursor holds the ordering values of the last row
+    seen, so every page is an indexed range scan of `page_size` rows no matter how
+    deep it is. `ordering` must end in a unique field to keep the order stable.
+    """
+    ordering = ('id',)
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, values, reverse=False):
+        payload = json.dumps({'v': [str(value) for value in values], 'r': reverse})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values, reverse = payload['v'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def seek_filter(self, values, ordering):
+        """
+        Rows strictly after `values` in `ordering`: (a > x) OR (a = x AND b > y) ...
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = '__lt' if field.startswith('-') else '__gt'
+            condition |= equal & Q(**{name + lookup: value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        values, reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(field[1:] if field.startswith('-') else '-' + field for field in ordering)
+        keys_queryset = queryset.order_by(*ordering)
+        if values is not None:
+            try:
+                keys_queryset = keys_queryset.filter(self.seek_filter(values, ordering))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Walk the index for the page's keys first, then load just those rows.
+        names = [field.lstrip('-') for field in self.ordering]
+        keys = list(keys_queryset.values_list('pk', *names)[:self.page_size_value + 1])
+        has_more = len(keys) > self.page_size_value
+        keys = keys[:self.page_size_value]
+        if reverse:
+            keys.reverse()
+
+        first, last = (keys[0][1:], keys[-1][1:]) if keys else (None, None)
+        self.next_cursor = self.previous_cursor = None
+        if keys and (has_more or reverse):
+            self.next_cursor = self.encode_cursor(last)
+        if keys and (has_more if reverse else values is not None):
+            self.previous_cursor = self.encode_cursor(first, reverse=True)
+
+        return queryset.filter(pk__in=[key[0] for key in keys]).order_by(*self.ordering)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.next_cursor),
+            'previous': self.get_link(self.previous_cursor),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class GameKeysetPagination(KeysetPagination):
+    # Newest games first; served by the (date, id) index on league_game.
+    ordering = ('-date', '-id')
@@ -2,6 +2,7 @@
 
 from rest_framework import permissions
 from rest_framework.permissions import IsAuthenticated
+from .access import get_access
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
@@ -9,14 +10,16 @@ class IsAdminOrReadOnly(permissions.BasePermission):
     to coach and player users.
     """
     def has_permission(self, request, view):
+        access = get_access(request)
         if request.method in permissions.SAFE_METHODS:
-            return request.user.is_authenticated and (request.user.is_admin or request.user.is_coach or request.user.is_player)
-        return request.user.is_authenticated and request.user.is_admin
+            return access.is_admin or access.is_coach or access.is_player
+        return access.is_admin
 
 
 class IsAdminOrCoach(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and (request.user.is_admin or request.user.is_coach)
+        access = get_access(request)
+        return access.is_admin or access.is_coach
 
 
 class IsAdminStaff(permissions.BasePermission):
@@ -24,4 +27,5 @@ class IsAdminStaff(permissions.BasePermission):
     Allows access only to admin users who are also marked as staff.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.is_admin and request.user.is_staff
+        access = get_access(request)
+        return access.is_admin and access.is_staff
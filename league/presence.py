@@ -0,0 +1,180 @@
+# presence.py
+#
+# Online presence and session accounting. Logins, logouts and heartbeats are appended
+# to PresenceEvent; nothing on the request path writes to the league_user row. flush()
+# folds the buffered events into UserSession rows and updates the User counters
+# (login_count, total_login_time, last_login_end, is_online) with batched writes.
+# Sessions are tracked per client, so concurrent logins of one user are accounted
+# separately.
+
+import datetime
+import hashlib
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from .caching import get_cache
+from .models import User, PresenceEvent, UserSession, ModelVersion
+
+FLUSH_BATCH_SIZE = 5000
+
+# Session-duration histogram buckets, as upper bounds in minutes.
+DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 240)
+
+
+def session_key(request):
+    """
+    Identifies the client session: the Django session, else the JWT id, else the
+    client's address and user agent.
+    """
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        return session.session_key
+    token = getattr(request, 'auth', None)
+    if token is not None and hasattr(token, 'get') and token.get('jti'):
+        return str(token.get('jti'))
+    raw = f"{request.META.get('REMOTE_ADDR', '')}|{request.META.get('HTTP_USER_AGENT', '')}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def record(user, kind, request):
+    PresenceEvent.objects.create(user=user, session=session_key(request), kind=kind)
+
+
+def heartbeat(user, request):
+    """
+    Records a heartbeat unless this session already sent one within the heartbeat
+    interval. Returns whether an event was written.
+    """
+    key = session_key(request)
+    if not get_cache().add(f'league:presence:heartbeat:{user.pk}:{key}', 1,
+                           timeout=settings.LEAGUE_PRESENCE_HEARTBEAT_INTERVAL):
+        return False
+    PresenceEvent.objects.create(user=user, session=key, kind=PresenceEvent.HEARTBEAT)
+    return True
+
+
+def maybe_flush():
+    """
+    Flushes the event buffer unless some process already did within the flush interval.
+    """
+    if get_cache().add('league:presence:flush', 1, timeout=settings.LEAGUE_PRESENCE_FLUSH_INTERVAL):
+        return flush()
+    return 0
+
+
+def flush(batch_size=FLUSH_BATCH_SIZE, now=None):
+    """
+    Folds up to `batch_size` buffered events into sessions and User counters, closes
+    sessions that went silent, and deletes the folded events. Returns the number of
+    events processed.
+    """
+    now = now or timezone.now()
+    timeout = datetime.timedelta(seconds=settings.LEAGUE_PRESENCE_TIMEOUT)
+    cutoff = now - timeout
+
+    with transaction.atomic():
+        # Concurrent flushers skip each other's rows where the database supports it.
+        events = list(PresenceEvent.objects.select_for_update(
+            skip_locked=connection.features.has_select_for_update_skip_locked
+        ).order_by('id').values_list('id', 'user_id', 'session', 'kind', 'created_at')[:batch_size])
+        user_ids = {user_id for _, user_id, _, _, _ in events}
+
+        open_sessions = {
+            (row.user_id, row.session): row for row in UserSession.objects.select_for_update().filter(
+                Q(user_id__in=user_ids) | Q(last_seen_at__lt=cutoff), ended_at__isnull=True)
+        }
+        created, changed = [], {}
+        logins = Counter()
+        online_time = defaultdict(datetime.timedelta)
+        last_end = {}
+
+        def close(row, ended_at):
+            row.close(ended_at)
+            online_time[row.user_id] += row.duration
+            last_end[row.user_id] = max(ended_at, last_end.get(row.user_id, ended_at))
+            if row.pk is not None:
+                changed[row.pk] = row
+
+        for _, user_id, session, kind, created_at in events:
+            key = (user_id, session)
+            row = open_sessions.get(key)
+            if kind == PresenceEvent.LOGOUT:
+                if row is not None:
+                    row.last_seen_at = max(row.last_seen_at, created_at)
+                    close(row, row.last_seen_at)
+                    del open_sessions[key]
+                continue
+            if row is not None and created_at - row.last_seen_at > timeout:
+                close(row, row.last_seen_at)
+                row = None
+            if row is None:
+                row = open_sessions[key] = UserSession(user_id=user_id, session=session,
+                                                       started_at=created_at, last_seen_at=created_at)
+                created.append(row)
+                logins[user_id] += 1
+            else:
+                row.last_seen_at = max(row.last_seen_at, created_at)
+                if row.pk is not None:
+                    changed[row.pk] = row
+
+        for key, row in list(open_sessions.items()):
+            if row.last_seen_at < cutoff:
+                close(row, row.last_seen_at)
+                del open_sessions[key]
+
+        UserSession.objects.bulk_create(created, batch_size=1000)
+        UserSession.objects.bulk_update(changed.values(), ['last_seen_at', 'ended_at', 'duration'], batch_size=1000)
+
+        touched = user_ids | set(online_time)
+        online = {user_id for user_id, _ in open_sessions}
+        users = list(User.objects.select_for_update().filter(id__in=touched).only(
+            'id', 'login_count', 'total_login_time', 'last_login_end', 'is_online'))
+        for user in users:
+            user.login_count += logins[user.pk]
+            user.total_login_time += online_time.get(user.pk, datetime.timedelta())
+            user.last_login_end = last_end.get(user.pk, user.last_login_end)
+            user.is_online = user.pk in online
+        # bulk_update sends no signals, so this does not bump the User model version.
+        User.objects.bulk_update(users, ['login_count', 'total_login_time', 'last_login_end', 'is_online'],
+                                 batch_size=1000)
+
+        PresenceEvent.objects.filter(id__in=[event[0] for event in events]).delete()
+    if created or changed:
+        ModelVersion.objects.bump(UserSession)
+    return len(events)
+
+
+def presence_stats(days=30, now=None):
+    """
+    Online count, active-user counts and a session-duration histogram, read from
+    UserSession with two aggregate queries. Reflects events up to the last flush.
+    """
+    now = now or timezone.now()
+    cutoff = now - datetime.timedelta(seconds=settings.LEAGUE_PRESENCE_TIMEOUT)
+    windows = {'day': 1, 'week': 7, 'month': 30}
+
+    active = UserSession.objects.filter(last_seen_at__gte=now - datetime.timedelta(days=max(windows.values()))) \
+        .aggregate(
+            online=Count('user', distinct=True, filter=Q(ended_at__isnull=True, last_seen_at__gte=cutoff)),
+            **{name: Count('user', distinct=True, filter=Q(last_seen_at__gte=now - datetime.timedelta(days=n)))
+               for name, n in windows.items()},
+        )
+
+    bounds = [datetime.timedelta(minutes=minutes) for minutes in DURATION_BUCKETS]
+    buckets = {}
+    lower = datetime.timedelta()
+    for minutes, upper in zip(DURATION_BUCKETS, bounds):
+        buckets[f'<{minutes}m'] = Count('id', filter=Q(duration__gte=lower, duration__lt=upper))
+        lower = upper
+    buckets[f'>={DURATION_BUCKETS[-1]}m'] = Count('id', filter=Q(duration__gte=lower))
+    histogram = UserSession.objects.filter(
+        ended_at__gte=now - datetime.timedelta(days=days)).aggregate(**buckets)
+
+    return {
+        'online': active.pop('online'),
+        'active_users': active,
+        'session_durations': histogram,
+        'days': days,
+    }
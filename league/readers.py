@@ -0,0 +1,195 @@
+# readers.py
+#
+# Read-only fast path for the GET list/retrieve endpoints. Rows come from .values()
+# and are mapped to plain dicts with the exact shape of the matching serializers in
+# serializers.py, so a whole page costs a fixed handful of queries and no
+# per-field DRF work. Every reader takes the request's fieldsets.Shape and skips the
+# queries for fields and relations that were not requested. Viewset querysets may
+# carry prefetches for the serializer path; they are dropped here since they cannot
+# apply to .values() rows.
+
+import hashlib
+import json
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from .fieldsets import FULL
+from .models import User, Team, Player, Tournament, TournamentRound, RoundTeam, TournamentSnapshot
+
+USER_FIELDS = ('id', 'username', 'email', 'is_admin', 'is_coach', 'is_player')
+PLAYER_FIELDS = ('id', 'team_id', 'name', 'height', 'games_participated', 'score_total', 'score_count') + \
+    tuple(f'user__{field}' for field in USER_FIELDS)
+
+
+def _user(row, prefix=''):
+    return {field: row[prefix + field] for field in USER_FIELDS}
+
+
+def player_dict(row, shape=FULL):
+    # Same shape as PlayerSerializer
+    player = {
+        'id': row['id'],
+        'user': _user(row, 'user__') if shape.expands('user') else row['user_id'],
+        'team': row['team_id'],
+        'name': row['name'],
+        'height': row['height'],
+        'games_participated': row['games_participated'],
+    }
+    if shape.wants('average_score'):
+        player['average_score'] = row['score_total'] / row['score_count'] if row['score_count'] else 0
+    return shape.trim(player)
+
+
+def player_dicts(queryset, shape=FULL):
+    fields = PLAYER_FIELDS if shape.expands('user') else PLAYER_FIELDS[:-len(USER_FIELDS)] + ('user_id',)
+    return [player_dict(row, shape) for row in queryset.prefetch_related(None).values(*fields)]
+
+
+def team_dicts(queryset, shape=FULL):
+    """
+    TeamSerializer-shaped dicts for a Team queryset: one query for the teams,
+    one for their coaches and one for their players, each only when requested.
+    """
+    fields = ['id', 'name', 'coach_id']
+    if shape.wants('average_score'):
+        fields += ['stats__games_played', 'stats__points_for']
+    rows = list(queryset.prefetch_related(None).values(*fields))
+    team_ids = [row['id'] for row in rows]
+
+    coaches = {}
+    if shape.expands('coach'):
+        coaches = {user['id']: user for user in User.objects.filter(
+            id__in={row['coach_id'] for row in rows}).values(*USER_FIELDS)}
+    players = {team_id: [] for team_id in team_ids}
+    if shape.expands('players'):
+        for player in player_dicts(Player.objects.filter(team_id__in=team_ids).order_by('id')):
+            players[player['team']].append(player)
+    elif shape.wants('players'):
+        for team_id, player_id in Player.objects.filter(team_id__in=team_ids).order_by('id') \
+                .values_list('team_id', 'id'):
+            players[team_id].append(player_id)
+
+    teams = []
+    for row in rows:
+        team = {
+            'id': row['id'],
+            'name': row['name'],
+            'coach': coaches[row['coach_id']] if shape.expands('coach') else row['coach_id'],
+            'players': players[row['id']],
+        }
+        if shape.wants('average_score'):
+            team['average_score'] = row['stats__points_for'] / row['stats__games_played'] \
+                if row['stats__games_played'] else 0
+        teams.append(shape.trim(team))
+    return teams
+
+
+def teams_by_id(team_ids):
+    return {team['id']: team for team in team_dicts(Team.objects.filter(id__in=set(team_ids)))}
+
+
+def game_dicts(queryset, shape=FULL):
+    rows = list(queryset.prefetch_related(None).values(
+        'id', 'date', 'location', 'referee', 'team_a_id', 'team_b_id', 'team_a_score', 'team_b_score'))
+    expanded = [side for side in ('team_a', 'team_b') if shape.expands(side)]
+    teams = teams_by_id([row[f'{side}_id'] for row in rows for side in expanded]) if expanded else {}
+    return [
+        shape.trim({
+            'id': row['id'],
+            'date': row['date'].isoformat(),
+            'location': row['location'],
+            'referee': row['referee'],
+            'team_a': teams[row['team_a_id']] if 'team_a' in expanded else row['team_a_id'],
+            'team_b': teams[row['team_b_id']] if 'team_b' in expanded else row['team_b_id'],
+            'team_a_score': row['team_a_score'],
+            'team_b_score': row['team_b_score'],
+        })
+        for row in rows
+    ]
+
+
+def tournament_dicts(queryset, shape=FULL):
+    rows = list(queryset.prefetch_related(None).values('id', 'name', 'start_date', 'end_date', 'champion_id'))
+    tournament_ids = [row['id'] for row in rows]
+
+    rounds = {tournament_id: [] for tournament_id in tournament_ids}
+    round_teams = {}
+    entries = []
+    if shape.expands('rounds'):
+        for round_row in TournamentRound.objects.filter(tournament_id__in=tournament_ids) \
+                .order_by('round_number').values('id', 'tournament_id', 'round_number'):
+            round_teams[round_row['id']] = []
+            rounds[round_row['tournament_id']].append({'round_number': round_row['round_number'],
+                                                       'teams': round_teams[round_row['id']]})
+        entries = list(RoundTeam.objects.filter(round_id__in=list(round_teams)).order_by('id')
+                       .values('round_id', 'team_id', 'eliminated'))
+    elif shape.wants('rounds'):
+        for tournament_id, round_id in TournamentRound.objects.filter(tournament_id__in=tournament_ids) \
+                .order_by('round_number').values_list('tournament_id', 'id'):
+            rounds[tournament_id].append(round_id)
+
+    team_ids = [entry['team_id'] for entry in entries]
+    if shape.expands('champion'):
+        team_ids += [row['champion_id'] for row in rows if row['champion_id'] is not None]
+    teams = teams_by_id(team_ids) if team_ids else {}
+    for entry in entries:
+        round_teams[entry['round_id']].append({'team': teams[entry['team_id']], 'eliminated': entry['eliminated']})
+
+    tournaments = []
+    for row in rows:
+        champion = row['champion_id']
+        if champion is not None and shape.expands('champion'):
+            champion = teams[champion]
+        tournaments.append(shape.trim({
+            'id': row['id'],
+            'name': row['name'],
+            'start_date': row['start_date'].isoformat(),
+            'end_date': row['end_date'].isoformat() if row['end_date'] else None,
+            'champion': champion,
+            'rounds': rounds[row['id']],
+        }))
+    return tournaments
+
+
+def standing_dict(row):
+    # A Standing with its team selected.
+    return {
+        'season': row.season,
+        'rank': row.rank,
+        'team': {'id': row.team_id, 'name': row.team.name},
+        'games_played': row.games_played,
+        'wins': row.wins,
+        'losses': row.losses,
+        'draws': row.draws,
+        'win_pct': round(row.win_pct, 3),
+        'points_for': row.points_for,
+        'points_against': row.points_against,
+        'point_diff': row.point_diff,
+        'streak': row.streak,
+        'last_10': row.last_10,
+    }
+
+
+def tournament_snapshot(tournament_id):
+    """
+    Returns the tournament's TournamentSnapshot, rebuilding the payload if it was
+    invalidated, or None when the tournament does not exist.
+    """
+    snapshot = TournamentSnapshot.objects.filter(tournament_id=tournament_id).first()
+    if snapshot is None:
+        if not Tournament.objects.filter(pk=tournament_id).exists():
+            return None
+        snapshot = TournamentSnapshot(tournament_id=tournament_id)
+        TournamentSnapshot.objects.bulk_create([snapshot], ignore_conflicts=True)
+
+    if snapshot.payload is None:
+        rows = tournament_dicts(Tournament.objects.filter(pk=tournament_id))
+        if not rows:
+            return None
+        # Round-trip through the renderer so the stored JSON is exactly what the API sends.
+        payload = json.loads(JSONRenderer().render(rows[0]))
+        etag = hashlib.md5(JSONRenderer().render(payload)).hexdigest()
+        # Only store it if nothing invalidated the snapshot while it was being built.
+        TournamentSnapshot.objects.filter(pk=snapshot.pk, version=snapshot.version).update(
+            payload=payload, etag=etag, updated_at=timezone.now())
+        snapshot.payload, snapshot.etag = payload, etag
+    return snapshot
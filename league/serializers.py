@@ -1,15 +1,35 @@
 # serializers.py
 
 from rest_framework import serializers
-from .models import User, Team, Player, Game, Score, Tournament, TournamentRound, RoundTeam
+from .models import User, Team, Player, Game, Score, Tournament, TournamentRound, RoundTeam, Season, season_of
 # from djoser.serializers import UserSerializer as BaseUserSerializer
 
-class UserSerializer(serializers.ModelSerializer):
+
+class ShapedSerializerMixin:
+    """
+    Applies the `shape` from the serializer context (see fieldsets.py) to the outermost
+    serializer: drops the fields that were not requested and renders nested relations
+    that were not expanded as primary keys.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        shape = self.context.get('shape')
+        if shape is None:
+            return
+        for name, field in list(self.fields.items()):
+            if not shape.wants(name):
+                self.fields.pop(name)
+            elif isinstance(field, serializers.BaseSerializer) and not shape.expands(name):
+                kwargs = {'source': field.source} if field.source != name else {}
+                self.fields[name] = serializers.PrimaryKeyRelatedField(
+                    many=isinstance(field, serializers.ListSerializer), read_only=True, **kwargs)
+
+class UserSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'is_admin', 'is_coach', 'is_player']
 
-class PlayerSerializer(serializers.ModelSerializer):
+class PlayerSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     average_score = serializers.ReadOnlyField()
 
@@ -17,7 +37,7 @@ class PlayerSerializer(serializers.ModelSerializer):
         model = Player
         fields = ['id', 'user', 'team', 'name', 'height', 'games_participated', 'average_score']
 
-class TeamSerializer(serializers.ModelSerializer):
+class TeamSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     coach = UserSerializer(read_only=True)
     players = PlayerSerializer(many=True, read_only=True)
     average_score = serializers.ReadOnlyField()
@@ -26,7 +46,7 @@ class TeamSerializer(serializers.ModelSerializer):
         model = Team
         fields = ['id', 'name', 'coach', 'players', 'average_score']
 
-class GameSerializer(serializers.ModelSerializer):
+class GameSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     team_a = TeamSerializer(read_only=True)
     team_b = TeamSerializer(read_only=True)
 
@@ -34,7 +54,13 @@ class GameSerializer(serializers.ModelSerializer):
         model = Game
         fields = ['id', 'date', 'location', 'referee', 'team_a', 'team_b', 'team_a_score', 'team_b_score']
 
-class ScoreSerializer(serializers.ModelSerializer):
+    def validate_date(self, value):
+        # Archived seasons are read-only; Game.save would refuse the write.
+        if Season.objects.filter(pk=season_of(value), archived_at__isnull=False).exists():
+            raise serializers.ValidationError(f'Season {season_of(value)} is archived.')
+        return value
+
+class ScoreSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     player = PlayerSerializer(read_only=True)
     game = GameSerializer(read_only=True)
 
@@ -42,12 +68,12 @@ class ScoreSerializer(serializers.ModelSerializer):
         model = Score
         fields = ['id', 'player', 'game', 'score']
 
-class SimplePlayerSerializer(serializers.ModelSerializer):
+class SimplePlayerSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Player
         fields = ['id', 'name']
 
-class SimpleTeamSerializer(serializers.ModelSerializer):
+class SimpleTeamSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     coach_name = serializers.CharField(source='coach.username')
     players = SimplePlayerSerializer(many=True, read_only=True)
 
@@ -55,7 +81,7 @@ class SimpleTeamSerializer(serializers.ModelSerializer):
         model = Team
         fields = ['name', 'coach_name', 'players']
 
-class GameDetailsSerializer(serializers.ModelSerializer):
+class GameDetailsSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     team_a = SimpleTeamSerializer(read_only=True)
     team_b = SimpleTeamSerializer(read_only=True)
     winner = serializers.SerializerMethodField()
@@ -72,21 +98,21 @@ class GameDetailsSerializer(serializers.ModelSerializer):
         return "Draw"
     
 
-class RoundTeamSerializer(serializers.ModelSerializer):
+class RoundTeamSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     team = TeamSerializer(read_only=True)
 
     class Meta:
         model = RoundTeam
         fields = ['team', 'eliminated']
 
-class TournamentRoundSerializer(serializers.ModelSerializer):
+class TournamentRoundSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     teams = RoundTeamSerializer(source='roundteam_set', many=True)
 
     class Meta:
         model = TournamentRound
         fields = ['round_number', 'teams']
 
-class TournamentSerializer(serializers.ModelSerializer):
+class TournamentSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     rounds = TournamentRoundSerializer(many=True)
     champion = TeamSerializer(read_only=True)
 
@@ -94,8 +120,36 @@ class TournamentSerializer(serializers.ModelSerializer):
         model = Tournament
         fields = ['id', 'name', 'start_date', 'end_date', 'champion', 'rounds']
     
-class UserStatisticsSerializer(serializers.ModelSerializer):
+class UserStatisticsSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ['username', ]
-
+        fields = ['id', 'username', 'is_admin', 'is_coach', 'is_player', 'login_count', 'total_login_time',
+                  'last_login_end', 'is_online']
+
+
+
+class BoxScoreLineSerializer(serializers.Serializer):
+    player = serializers.IntegerField()
+    points_scored = serializers.IntegerField(min_value=0)
+    score = serializers.DecimalField(max_digits=5, decimal_places=2, required=False)
+
+
+class GameResultSerializer(serializers.Serializer):
+    """
+    One game of a batched result upload. Ids are plain integers; they are checked
+    against the database once per batch in ingest.py rather than once per field.
+    """
+    source_ref = serializers.CharField(max_length=64, required=False)
+    date = serializers.DateField()
+    location = serializers.CharField(max_length=255)
+    referee = serializers.CharField(max_length=100)
+    team_a = serializers.IntegerField()
+    team_b = serializers.IntegerField()
+    team_a_score = serializers.IntegerField(min_value=0)
+    team_b_score = serializers.IntegerField(min_value=0)
+    box_score = BoxScoreLineSerializer(many=True, required=False, default=list)
+
+    def validate(self, attrs):
+        if attrs['team_a'] == attrs['team_b']:
+            raise serializers.ValidationError('A team cannot play itself.')
+        return attrs
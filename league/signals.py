@@ -2,20 +2,272 @@
 
 from django.dispatch import receiver
 from django.contrib.auth.signals import user_logged_in, user_logged_out
-import datetime
-from .models import User
+from django.db.models import F, Q
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from decimal import Decimal
+from . import live, presence
+from .authentication import revoke_claims
+from .models import User, Team, Player, Game, Score, TeamStats, Standing, PlayerGameParticipation, Tournament, \
+    TournamentRound, RoundTeam, TournamentSnapshot, ModelVersion, PresenceEvent, SearchEntry, SEARCHABLE, TeamRating, \
+    season_of
+
+# Logins and logouts are journaled; presence.flush() updates the User counters in batches.
+
+LOGIN_TRACKING_FIELDS = {'last_login', 'is_online', 'login_count', 'total_login_time', 'last_login_end'}
 
 @receiver(user_logged_in)
 def user_logged_in_receiver(sender, request, user: User, **kwargs):
-    user.is_online = True
-    user.login_count += 1
-    user.save(update_fields=['is_online', 'login_count'])
+    if request is not None:
+        presence.record(user, PresenceEvent.LOGIN, request)
 
 @receiver(user_logged_out)
 def user_logged_out_receiver(sender, request, user: User, **kwargs):
-    if user.last_login and user.last_login_end:
-        duration = datetime.datetime.now(datetime.timezone.utc) - user.last_login_end
-        user.total_login_time += duration
-    user.last_login_end = datetime.datetime.now(datetime.timezone.utc)
-    user.is_online = False
-    user.save(update_fields=['last_login_end', 'total_login_time', 'is_online'])
+    if request is not None and user is not None:
+        presence.record(user, PresenceEvent.LOGOUT, request)
+
+@receiver(post_save, sender=Team)
+def team_saved_receiver(sender, instance: Team, created, raw=False, **kwargs):
+    if created and not raw:
+        TeamStats.objects.get_or_create(team=instance)
+
+@receiver(pre_save, sender=Game)
+def game_pre_save_receiver(sender, instance: Game, raw=False, **kwargs):
+    # Remember the stored row so post_save can take its old contribution back out.
+    instance._previous_result = None
+    if instance.pk and not raw:
+        instance._previous_result = Game.objects.filter(pk=instance.pk).only(
+            'date', 'team_a', 'team_b', 'team_a_score', 'team_b_score').first()
+
+@receiver(post_save, sender=Game)
+def game_saved_receiver(sender, instance: Game, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_result', None)
+    if previous is not None:
+        TeamStats.objects.record_game(previous, sign=-1)
+    TeamStats.objects.record_game(instance)
+
+@receiver(post_delete, sender=Game)
+def game_deleted_receiver(sender, instance: Game, **kwargs):
+    TeamStats.objects.record_game(instance, sign=-1)
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def game_standings_receiver(sender, instance: Game, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_result', None)
+    Standing.objects.refresh_games([instance] if previous is None else [previous, instance])
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def game_rating_receiver(sender, instance: Game, raw=False, **kwargs):
+    if raw:
+        return
+    # Ratings carry over between seasons, so the earlier of the old and new season counts.
+    previous = getattr(instance, '_previous_result', None)
+    seasons = [season_of(instance.date)] + ([season_of(previous.date)] if previous is not None else [])
+    TeamRating.objects.invalidate(seasons)
+
+@receiver(post_save, sender=Game)
+def game_season_receiver(sender, instance: Game, raw=False, **kwargs):
+    # A date moved into another season takes the game's scores and participations along.
+    previous = getattr(instance, '_previous_result', None)
+    if raw or previous is None or season_of(previous.date) == instance.season_id:
+        return
+    Score.objects.filter(game=instance).update(season_id=instance.season_id)
+    PlayerGameParticipation.objects.filter(game=instance).update(season_id=instance.season_id)
+
+def _add_to_player_totals(player_id, score, sign=1):
+    Player.objects.filter(pk=player_id).update(
+        score_total=F('score_total') + sign * Decimal(str(score)),
+        score_count=F('score_count') + sign,
+    )
+
+@receiver(pre_save, sender=Score)
+def score_pre_save_receiver(sender, instance: Score, raw=False, **kwargs):
+    instance._previous_score = None
+    if instance.pk and not raw:
+        instance._previous_score = Score.objects.filter(pk=instance.pk).values('player_id', 'score').first()
+
+@receiver(post_save, sender=Score)
+def score_saved_receiver(sender, instance: Score, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_score', None)
+    if previous is not None:
+        _add_to_player_totals(previous['player_id'], previous['score'], sign=-1)
+    _add_to_player_totals(instance.player_id, instance.score)
+
+@receiver(post_delete, sender=Score)
+def score_deleted_receiver(sender, instance: Score, **kwargs):
+    _add_to_player_totals(instance.player_id, instance.score, sign=-1)
+
+# Tournament snapshots: any change to a bracket, or to the teams and scores it embeds,
+# clears the stored payload so the next read rebuilds it.
+
+@receiver(post_save, sender=Tournament)
+@receiver(post_delete, sender=Tournament)
+def tournament_changed_receiver(sender, instance: Tournament, raw=False, **kwargs):
+    if not raw:
+        TournamentSnapshot.objects.invalidate(tournament_ids=[instance.pk])
+
+@receiver(post_save, sender=TournamentRound)
+@receiver(post_delete, sender=TournamentRound)
+def tournament_round_changed_receiver(sender, instance: TournamentRound, raw=False, **kwargs):
+    if not raw:
+        TournamentSnapshot.objects.invalidate(tournament_ids=[instance.tournament_id])
+
+@receiver(post_save, sender=RoundTeam)
+@receiver(post_delete, sender=RoundTeam)
+def round_team_changed_receiver(sender, instance: RoundTeam, raw=False, **kwargs):
+    if not raw:
+        TournamentSnapshot.objects.invalidate(
+            tournament_ids=TournamentRound.objects.filter(pk=instance.round_id).values('tournament_id'))
+
+@receiver(post_save, sender=Team)
+def team_changed_receiver(sender, instance: Team, created, raw=False, **kwargs):
+    if not created and not raw:
+        TournamentSnapshot.objects.invalidate(team_ids=[instance.pk])
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+def player_changed_receiver(sender, instance: Player, raw=False, **kwargs):
+    if not raw:
+        TournamentSnapshot.objects.invalidate(team_ids=[instance.team_id])
+
+def _user_team_ids(user: User):
+    return list(Team.objects.filter(Q(coach=user) | Q(players__user=user)).values_list('id', flat=True).distinct())
+
+@receiver(post_save, sender=User)
+def user_changed_receiver(sender, instance: User, created, raw=False, update_fields=None, **kwargs):
+    # Snapshots embed the coaches' and players' user rows; login bookkeeping is not among them.
+    if created or raw or (update_fields and set(update_fields) <= LOGIN_TRACKING_FIELDS):
+        return
+    TournamentSnapshot.objects.invalidate(team_ids=_user_team_ids(instance))
+
+@receiver(pre_delete, sender=User)
+def user_pre_delete_receiver(sender, instance: User, **kwargs):
+    # The cascade removes the user's teams and player row before post_delete runs.
+    instance._snapshot_team_ids = _user_team_ids(instance)
+
+@receiver(post_delete, sender=User)
+def user_deleted_receiver(sender, instance: User, **kwargs):
+    TournamentSnapshot.objects.invalidate(team_ids=getattr(instance, '_snapshot_team_ids', []))
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def game_changed_receiver(sender, instance: Game, raw=False, **kwargs):
+    if raw:
+        return
+    team_ids = {instance.team_a_id, instance.team_b_id}
+    previous = getattr(instance, '_previous_result', None)
+    if previous is not None:
+        team_ids |= {previous.team_a_id, previous.team_b_id}
+    TournamentSnapshot.objects.invalidate(team_ids=list(team_ids))
+
+@receiver(post_save, sender=Score)
+@receiver(post_delete, sender=Score)
+def score_changed_receiver(sender, instance: Score, raw=False, **kwargs):
+    if not raw:
+        TournamentSnapshot.objects.invalidate(
+            team_ids=Player.objects.filter(pk=instance.player_id).values('team_id'))
+
+# Live updates: small deltas for the /api/live/ stream, published after commit.
+
+@receiver(post_save, sender=Game)
+def game_live_receiver(sender, instance: Game, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_result', None)
+    if created:
+        live.publish_games([instance])
+    elif previous is None or (previous.team_a_score, previous.team_b_score) != \
+            (instance.team_a_score, instance.team_b_score):
+        live.publish_games([instance], kind='score')
+
+@receiver(post_delete, sender=Game)
+def game_deleted_live_receiver(sender, instance: Game, **kwargs):
+    live.publish(live.game_topics(instance), 'game_deleted', {'game': instance.pk})
+
+@receiver(post_save, sender=Score)
+def score_live_receiver(sender, instance: Score, raw=False, **kwargs):
+    if not raw:
+        live.publish([live.topic('game', instance.game_id)], 'box_score', {
+            'game': instance.game_id, 'score': instance.pk, 'player': instance.player_id, 'points': instance.score})
+
+@receiver(post_save, sender=RoundTeam)
+def round_team_live_receiver(sender, instance: RoundTeam, raw=False, **kwargs):
+    if raw:
+        return
+    tournament_id = instance.round.tournament_id
+    live.publish([live.topic('tournament', tournament_id), live.topic('team', instance.team_id)], 'round_team', {
+        'tournament': tournament_id, 'round': instance.round_id, 'team': instance.team_id,
+        'eliminated': instance.eliminated})
+
+# Model versions: drive the response cache keys and the API's ETag/Last-Modified validators.
+
+def bump_model_version_receiver(sender, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # Login bookkeeping does not change anything the API serializes.
+    if sender is User and update_fields and set(update_fields) <= LOGIN_TRACKING_FIELDS:
+        return
+    ModelVersion.objects.bump(sender)
+
+for versioned_model in (User, Team, Player, Game, Score, PlayerGameParticipation, Tournament, TournamentRound,
+                        RoundTeam):
+    post_save.connect(bump_model_version_receiver, sender=versioned_model,
+                      dispatch_uid=f'version-save-{versioned_model.__name__}')
+    post_delete.connect(bump_model_version_receiver, sender=versioned_model,
+                        dispatch_uid=f'version-delete-{versioned_model.__name__}')
+
+# Token claims: role flags and team memberships are embedded in access tokens, so
+# changing them stops the fast path from trusting tokens issued before the change.
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_claims_receiver(sender, instance: User, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and set(update_fields) <= LOGIN_TRACKING_FIELDS):
+        return
+    revoke_claims(instance.pk)
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+def player_claims_receiver(sender, instance: Player, raw=False, **kwargs):
+    if not raw:
+        revoke_claims(instance.user_id)
+
+@receiver(pre_save, sender=Team)
+def team_pre_save_claims_receiver(sender, instance: Team, raw=False, **kwargs):
+    instance._previous_coach_id = None
+    if instance.pk and not raw:
+        instance._previous_coach_id = Team.objects.filter(pk=instance.pk).values_list('coach_id', flat=True).first()
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def team_claims_receiver(sender, instance: Team, raw=False, **kwargs):
+    if raw:
+        return
+    revoke_claims(instance.coach_id)
+    previous = getattr(instance, '_previous_coach_id', None)
+    if previous is not None and previous != instance.coach_id:
+        revoke_claims(previous)
+
+# Search index: rows are rewritten when an indexed field may have changed.
+
+def search_index_saved_receiver(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields and not set(update_fields) & set(SEARCHABLE[sender][1]):
+        return
+    SearchEntry.objects.index([instance], created=created)
+
+def search_index_deleted_receiver(sender, instance, **kwargs):
+    SearchEntry.objects.remove(sender, [instance.pk])
+
+for searchable_model in SEARCHABLE:
+    post_save.connect(search_index_saved_receiver, sender=searchable_model,
+                      dispatch_uid=f'search-save-{searchable_model.__name__}')
+    post_delete.connect(search_index_deleted_receiver, sender=searchable_model,
+                        dispatch_uid=f'search-delete-{searchable_model.__name__}')
@@ -1,3 +1,1491 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import json
+import os
+import statistics
+import time
+from collections import namedtuple
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.core.management.base import CommandError
+from django.db.models import F, Q
+from django.contrib import admin
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from . import distributions, exports, forecast, live, presence, readers
+from .access import get_access
+from .authentication import LeagueJWTAuthentication, LeagueTokenObtainPairSerializer, LeagueTokenUser, \
+    fallback_users
+from .admin import GameAdmin, PlayerAdmin, ScoreAdmin, UserAdmin
+from .fieldsets import Shape
+from .models import User, Team, Player, Game, Score, Tournament, TournamentRound, RoundTeam, TeamStats, Standing, \
+    PlayerGameParticipation, PresenceEvent, UserSession, Season, ArchivedGame, ArchivedScore, ArchivedParticipation, \
+    SearchEntry, ClaimsRevocation, TournamentSnapshot, TeamRating
+from .serializers import TeamSerializer, PlayerSerializer, GameSerializer, TournamentSerializer, \
+    TournamentRoundSerializer, GameDetailsSerializer
+from .urls import router
+from .utils import Percentile
+from .views import TeamViewSet, PlayerViewSet, GameViewSet, GameDetailsViewSet, TournamentViewSet, \
+    TournamentRoundViewSet
+
+
+def seed_league(scale=1):
+    """
+    Seeds the league through populate_data, growing every dimension linearly with `scale`.
+    """
+    call_command('populate_data', teams=4 * scale, players_per_team=5, games=8 * scale, tournaments=scale,
+                 bracket_size=4, seed=scale, stdout=StringIO())
+    # The manager also coaches a team so the coach-only actions behind IsAdminStaff return data.
+    Team.objects.filter(pk=Team.objects.order_by('-id').values('pk')[:1]).update(
+        coach=User.objects.get(username='manager'))
+
+
+class LeagueTestCase(TestCase):
+
+    def setUp(self):
+        # The caches and the fallback user LRU are not rolled back with the test transaction.
+        caches['league'].clear()
+        caches['league-auth'].clear()
+        fallback_users.clear()
+
+
+def ingest_payload(games=2):
+    """
+    A game-result batch between the first two seeded teams, with full box scores.
+    """
+    team_a, team_b = Team.objects.order_by('id')[:2]
+    rosters = {team.pk: list(team.players.order_by('id').values_list('id', flat=True)) for team in (team_a, team_b)}
+    results = []
+    for i in range(games):
+        box_score = [{'player': player_id, 'points_scored': i + j}
+                     for team in (team_a, team_b) for j, player_id in enumerate(rosters[team.pk])]
+        results.append({
+            'date': '2024-03-01', 'location': 'Arena 1', 'referee': 'Referee 1',
+            'team_a': team_a.pk, 'team_b': team_b.pk,
+            'team_a_score': sum(line['points_scored'] for line in box_score[:len(rosters[team_a.pk])]),
+            'team_b_score': sum(line['points_scored'] for line in box_score[len(rosters[team_a.pk]):]),
+            'box_score': box_score,
+        })
+    return {'games': results}
+
+
+# role: which seeded user issues the request; lookup: model whose first pk fills the URL;
+# budget: max queries at the base dataset size, including cold snapshot/cache builds;
+# payload: for write routes, a function returning the JSON body to POST.
+Route = namedtuple('Route', ['role', 'lookup', 'budget', 'payload'], defaults=[None])
+
+ROUTES = {
+    'team-list': Route('admin', None, 5),
+    'team-detail': Route('admin', Team, 4),
+    'team-all-team-details': Route('coach', None, 5),
+    'player-list': Route('admin', None, 3),
+    'player-detail': Route('admin', Player, 2),
+    'player-get-my-info': Route('player', None, 2),
+    'player-get-coach-players': Route('admin', None, 3),
+    'player-get-high-scorers': Route('coach', None, 3),
+    'game-list': Route('admin', None, 6),
+    'game-detail': Route('admin', Game, 5),
+    'game-details-list': Route('admin', None, 5),
+    'game-details-detail': Route('admin', Game, 4),
+    'tournament-list': Route('admin', None, 8),
+    'tournament-detail': Route('admin', Tournament, 10),
+    'tournament-list-tournament-ids': Route('admin', None, 2),
+    'tournament-tournament-structure': Route('admin', Tournament, 10),
+    'tournament-tournament-forecast': Route('admin', Tournament, 10),
+    'tournamentround-list': Route('admin', None, 5),
+    'tournamentround-detail': Route('admin', TournamentRound, 4),
+    'user-stats-list': Route('admin', None, 6),
+    'user-stats-detail': Route('admin', User, 2),
+    'user-stats-presence': Route('admin', None, 2),
+    'export-games': Route('admin', None, 2),
+    'export-scores': Route('admin', None, 2),
+    'export-participations': Route('admin', None, 2),
+    'cache-stats-list': Route('admin', None, 0),
+    'standings-list': Route('player', None, 2),
+    'standings-player-leaderboard': Route('player', None, 4),
+    'distributions-list': Route('player', None, 7),
+    'search-list': Route('player', None, 1),
+    # Writes go last so they do not change the data the read routes are measured on.
+    'game-ingest': Route('admin', None, 36, ingest_payload),
+    'presence-heartbeat': Route('player', None, 10, dict),
+}
+
+class QueryBudgetTests(LeagueTestCase):
+    """
+    Hits every router endpoint and custom @action, recording query count, wall time and
+    response size. Set BENCH_REPORT=1 to print the measurements.
+    """
+    report = []
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.environ.get('BENCH_REPORT'):
+            print(f"\n{'route':<36}{'scale':>6}{'queries':>9}{'ms':>9}{'bytes':>10}")
+            for name, scale, queries, elapsed, size in cls.report:
+                print(f'{name:<36}{scale:>6}{queries:>9}{elapsed * 1000:>9.1f}{size:>10}')
+        super().tearDownClass()
+
+    def measure(self, name, scale=1):
+        route = ROUTES[name]
+        kwargs = {}
+        if route.lookup is not None:
+            kwargs['pk'] = route.lookup.objects.order_by('id').values_list('pk', flat=True).first()
+        users = {
+            'admin': lambda: User.objects.get(username='manager'),
+            'coach': lambda: Team.objects.order_by('id').first().coach,
+            'player': lambda: Player.objects.order_by('id').first().user,
+        }
+        client = APIClient()
+        client.force_authenticate(users[route.role]())
+
+        url = reverse(name, kwargs=kwargs)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            if route.payload is None:
+                response = client.get(url)
+            else:
+                response = client.post(url, route.payload(), format='json')
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed = time.perf_counter() - started
+        self.assertIn(response.status_code, (200,) if route.payload is None else (201, 202), f'{name}: {body[:200]}')
+        self.report.append((name, scale, len(queries), elapsed, len(body)))
+        return len(queries)
+
+    def test_every_route_has_a_budget(self):
+        names = {url.name for url in router.urls if url.name != 'api-root'}
+        self.assertEqual(names - set(ROUTES), set(), 'Declare a query budget for new routes')
+
+    def test_routes_stay_within_query_budget(self):
+        for name, route in ROUTES.items():
+            with self.subTest(route=name):
+                self.assertLessEqual(self.measure(name), route.budget)
+
+    def test_query_count_grows_at_most_linearly(self):
+        baseline = {name: self.measure(name) for name in ROUTES}
+        seed_league(scale=2)
+        for name in ROUTES:
+            with self.subTest(route=name):
+                self.assertLessEqual(self.measure(name, scale=2), baseline[name] * 2)
+
+
+class FastReaderEquivalenceTests(LeagueTestCase):
+    """
+    The readers.py fast path must render byte-for-byte what the serializers render.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+        # Cover the optional/empty branches too: a team without players or games, an unfinished tournament.
+        Team.objects.create(name='Expansion', coach=User.objects.get(username='manager'))
+        Tournament.objects.create(name='Open', start_date='2024-06-01')
+
+    def assertRendersSame(self, fast, serialized):
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(serialized))
+
+    def test_teams(self):
+        queryset = Team.objects.order_by('id')
+        self.assertRendersSame(readers.team_dicts(queryset), TeamSerializer(queryset, many=True).data)
+
+    def test_players(self):
+        queryset = Player.objects.order_by('id')
+        self.assertRendersSame(readers.player_dicts(queryset), PlayerSerializer(queryset, many=True).data)
+
+    def test_games(self):
+        queryset = Game.objects.order_by('id')
+        self.assertRendersSame(readers.game_dicts(queryset), GameSerializer(queryset, many=True).data)
+
+    def test_tournaments(self):
+        queryset = Tournament.objects.order_by('id')
+        self.assertRendersSame(readers.tournament_dicts(queryset), TournamentSerializer(queryset, many=True).data)
+
+
+class KeysetPaginationTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league(scale=2)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(username='manager'))
+
+    def test_walks_games_newest_first_without_gaps(self):
+        seen, url = [], reverse('game-list') + '?page_size=3'
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 3)
+            seen += [(game['date'], game['id']) for game in page['results']]
+            url = page['next']
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertEqual(len(set(seen)), Game.objects.count())
+
+    def test_previous_returns_the_earlier_page(self):
+        first = self.client.get(reverse('player-list') + '?page_size=4').json()
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get(reverse('game-list') + '?cursor=bogus').status_code, 404)
+
+
+class TournamentSnapshotTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+        cls.tournament = Tournament.objects.order_by('id').first()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(username='manager'))
+        self.url = reverse('tournament-tournament-structure', kwargs={'pk': self.tournament.pk})
+
+    def test_structure_matches_serializer_and_honours_etag(self):
+        response = self.client.get(self.url)
+        rounds = self.tournament.rounds.order_by('round_number')
+        self.assertEqual(response.content, JSONRenderer().render(TournamentRoundSerializer(rounds, many=True).data))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_bracket_and_score_changes_invalidate_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+        RoundTeam.objects.filter(round__tournament=self.tournament).first().save()
+        changed = self.client.get(self.url)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed['ETag'], etag)  # same content, so the same ETag after the rebuild
+
+        team = RoundTeam.objects.filter(round__tournament=self.tournament).first().team
+        score = Score.objects.filter(player__team=team).first()
+        score.score += 7
+        score.save()
+        self.assertNotEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_user_changes_invalidate_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+        coach = RoundTeam.objects.filter(round__tournament=self.tournament).first().team.coach
+        version = TournamentSnapshot.objects.get(pk=self.tournament.pk).version
+        coach.login_count += 1
+        coach.save(update_fields=['login_count'])
+        self.assertEqual(TournamentSnapshot.objects.get(pk=self.tournament.pk).version, version)
+
+        coach.username = 'renamed-coach'
+        coach.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'renamed-coach', response.content)
+
+
+class ResponseCacheTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(username='manager'))
+
+    def test_hit_after_miss_and_invalidated_by_writes(self):
+        url = reverse('game-details-list')
+        first = self.client.get(url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url)
+        self.assertEqual((second['X-Cache'], len(queries)), ('HIT', 1))  # just the model versions
+        self.assertEqual(second.content, first.content)
+
+        team = Team.objects.order_by('id').first()
+        team.name = 'Renamed'
+        team.save()
+        third = self.client.get(url)
+        self.assertEqual(third['X-Cache'], 'MISS')
+        self.assertIn(b'Renamed', third.content)
+
+    def test_coach_scope_is_not_shared(self):
+        url = reverse('team-all-team-details')
+        coach = Team.objects.order_by('id').first().coach
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        self.client.force_authenticate(coach)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([team['id'] for team in response.json()],
+                         list(coach.coached_teams.order_by('id').values_list('id', flat=True)))
+
+
+class ConditionalGetTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(username='manager'))
+
+    def test_unchanged_poll_is_one_query(self):
+        url = reverse('game-list')
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        with CaptureQueriesContext(connection) as queries:
+            etag_poll = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            date_poll = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual((etag_poll.status_code, date_poll.status_code), (304, 304))
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(etag_poll.content, b'')
+
+    def test_write_changes_etag(self):
+        url = reverse('team-list')
+        etag = self.client.get(url)['ETag']
+        Player.objects.order_by('id').first().save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_is_per_user(self):
+        url = reverse('game-list')
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(Team.objects.order_by('id').first().coach)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class GameIngestTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(username='manager'))
+        self.url = reverse('game-ingest')
+
+    def test_aggregates_match_a_full_rebuild(self):
+        payload = ingest_payload(games=3)
+        payload['games'][0]['source_ref'] = 'match-1'
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(Game.objects.get(source_ref='match-1').pk, response.data['games'][0])
+
+        stats = list(TeamStats.objects.order_by('team_id').values())
+        players = list(Player.objects.order_by('id').values('id', 'score_total', 'score_count', 'games_participated'))
+        TeamStats.objects.rebuild()
+        Player.objects.refresh_score_totals()
+        Player.objects.refresh_games_participated()
+        self.assertEqual(stats, list(TeamStats.objects.order_by('team_id').values()))
+        self.assertEqual(players, list(Player.objects.order_by('id').values(
+            'id', 'score_total', 'score_count', 'games_participated')))
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        counts = []
+        for games in (1, 10):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, ingest_payload(games=games), format='json')
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_rejected_batch_writes_nothing(self):
+        payload = ingest_payload(games=2)
+        outsider = Player.objects.exclude(team__in=[payload['games'][1]['team_a'], payload['games'][1]['team_b']])
+        payload['games'][1]['box_score'][0]['player'] = outsider.values_list('id', flat=True).first()
+        games = Game.objects.count()
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['games'][0], {})
+        self.assertIn('box_score', response.data['games'][1])
+        self.assertEqual(Game.objects.count(), games)
+
+    def test_source_ref_is_recorded_once(self):
+        payload = ingest_payload(games=1)
+        payload['games'][0]['source_ref'] = 'match-1'
+        self.assertEqual(self.client.post(self.url, payload, format='json').status_code, 201)
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('source_ref', response.data['games'][0])
+
+    def test_coaches_cannot_ingest(self):
+        self.client.force_authenticate(Team.objects.order_by('id').first().coach)
+        self.assertEqual(self.client.post(self.url, ingest_payload(), format='json').status_code, 403)
+
+
+class DenormalizedTotalsTests(LeagueTestCase):
+    """
+    TeamStats and the player score totals stay equal to a full rebuild through every
+    write path: model saves and deletes, queryset update() and bulk_create().
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    def assertTeamStatsMatchRebuild(self):
+        fields = [field.name for field in TeamStats._meta.fields]
+        incremental = list(TeamStats.objects.order_by('team_id').values_list(*fields))
+        TeamStats.objects.rebuild()
+        self.assertEqual(incremental, list(TeamStats.objects.order_by('team_id').values_list(*fields)))
+
+    def assertScoreTotalsMatchRefresh(self):
+        incremental = list(Player.objects.order_by('id').values_list('id', 'score_total', 'score_count'))
+        Player.objects.refresh_score_totals()
+        self.assertEqual(incremental, list(Player.objects.order_by('id').values_list('id', 'score_total',
+                                                                                     'score_count')))
+
+    def test_game_writes_keep_team_stats(self):
+        team_a, team_b, team_c = Team.objects.order_by('id')[:3]
+        game = Game.objects.create(date=datetime.date(2024, 5, 1), location='Arena 1', referee='Referee 1',
+                                   team_a=team_a, team_b=team_b, team_a_score=80, team_b_score=70)
+        self.assertTeamStatsMatchRebuild()
+
+        game.team_a, game.team_b = team_b, team_c
+        game.team_a_score = 95
+        game.save()
+        self.assertTeamStatsMatchRebuild()
+
+        game.delete()
+        self.assertTeamStatsMatchRebuild()
+
+    def test_game_queryset_writes_keep_team_stats(self):
+        team_a, team_b, team_c = Team.objects.order_by('id')[:3]
+        games = Game.objects.filter(team_a=team_a)
+        self.assertEqual(games.update(team_a_score=F('team_a_score') + 10), games.count())
+        self.assertTeamStatsMatchRebuild()
+        Game.objects.filter(pk=games.first().pk).update(team_b=team_c)
+        self.assertTeamStatsMatchRebuild()
+
+        created = Game.objects.bulk_create([
+            Game(date=datetime.date(2024, 5, day), location='Bulk Court', referee='Referee 2',
+                 team_a=team_b, team_b=team_c, team_a_score=60 + day, team_b_score=70)
+            for day in range(1, 4)
+        ])
+        self.assertTeamStatsMatchRebuild()
+        self.assertEqual(Standing.objects.get(season=2024, team=team_c).games_played,
+                         Game.objects.filter(season_id=2024).filter(Q(team_a=team_c) | Q(team_b=team_c)).count())
+        self.assertEqual(len(SearchEntry.objects.lookup('bulk court', ['game'], limit=10)), len(created))
+
+    def test_game_date_update_moves_the_box_scores(self):
+        game = Game.objects.order_by('id').first()
+        Game.objects.filter(pk=game.pk).update(date=datetime.date(2019, 6, 1))
+        self.assertEqual(Game.objects.get(pk=game.pk).season_id, 2019)
+        self.assertEqual(set(game.scores.values_list('season_id', flat=True)), {2019})
+        self.assertEqual(set(game.player_participations.values_list('season_id', flat=True)), {2019})
+        self.assertTrue(Standing.objects.filter(season=2019).exists())
+
+    def test_score_writes_keep_player_totals(self):
+        game = Game.objects.order_by('id').first()
+        first, second = Player.objects.order_by('id')[:2]
+        score = Score.objects.create(player=first, game=game, score=12.5)
+        self.assertScoreTotalsMatchRefresh()
+
+        score.score = 20
+        score.save()
+        self.assertScoreTotalsMatchRefresh()
+        score.player = second
+        score.save()
+        self.assertScoreTotalsMatchRefresh()
+
+        score.delete()
+        self.assertScoreTotalsMatchRefresh()
+
+    def test_score_queryset_writes_keep_player_totals(self):
+        game = Game.objects.order_by('id').first()
+        first, second = Player.objects.order_by('id')[:2]
+        Score.objects.filter(player=first).update(score=F('score') + 1)
+        self.assertScoreTotalsMatchRefresh()
+        Score.objects.filter(pk=Score.objects.filter(player=first).values('pk')[:1]).update(player=second)
+        self.assertScoreTotalsMatchRefresh()
+
+        Score.objects.bulk_create([Score(player=first, game=game, score=points) for points in (3, 4.5)])
+        self.assertScoreTotalsMatchRefresh()
+        self.assertEqual(Player.objects.get(pk=first.pk).score_count, Score.objects.filter(player=first).count())
+
+
+class StandingTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(Player.objects.order_by('id').first().user)
+
+    def snapshot(self):
+        return list(Standing.objects.order_by('season', 'rank').values(
+            'season', 'team_id', 'rank', *Standing.TALLY_FIELDS))
+
+    def test_tally_streak_and_form(self):
+        row = Standing(team_id=1)
+        row.tally([(80, 70)] * 3 + [(60, 60)] + [(50, 70)] * 9 + [(90, 80)] * 2)
+        self.assertEqual((row.games_played, row.wins, row.losses, row.draws), (15, 5, 9, 1))
+        self.assertEqual(row.streak, 'W2')
+        self.assertEqual(row.last_10, 'WWLLLLLLLL')
+
+    def test_game_writes_match_a_full_rebuild(self):
+        game = Game.objects.order_by('id').first()
+        game.team_a_score, game.team_b_score = game.team_b_score + 1, game.team_a_score
+        game.date = game.date.replace(year=game.date.year - 1)
+        game.save()
+        Game.objects.order_by('-id').first().delete()
+        incremental = self.snapshot()
+        Standing.objects.all().delete()
+        Standing.objects.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+        self.assertIn(game.date.year, {row['season'] for row in incremental})
+
+    def test_standings_are_the_latest_season_in_rank_order(self):
+        response = self.client.get(reverse('standings-list'))
+        self.assertEqual(response.status_code, 200)
+        latest = Game.objects.latest('date').date.year
+        self.assertEqual([row['season'] for row in response.data], [latest] * len(response.data))
+        self.assertEqual([row['rank'] for row in response.data], list(range(1, len(response.data) + 1)))
+        self.assertEqual(self.client.get(reverse('standings-list'), {'season': 'x'}).status_code, 400)
+
+    def test_player_leaderboard_sums_participations(self):
+        season = Game.objects.latest('date').date.year
+        response = self.client.get(reverse('standings-player-leaderboard'), {'season': season, 'top_n': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+        leader = response.data[0]
+        points = sum(PlayerGameParticipation.objects.filter(
+            player_id=leader['player']['id'], game__date__year=season).values_list('points_scored', flat=True))
+        self.assertEqual(leader['points'], points)
+        self.assertGreaterEqual(leader['points'], response.data[1]['points'])
+
+
+class PresenceTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    def setUp(self):
+        super().setUp()
+        self.user = Player.objects.order_by('id').first().user
+        self.start = timezone.now() - datetime.timedelta(minutes=12)
+
+    def event(self, kind, session, minutes):
+        PresenceEvent.objects.create(user=self.user, session=session, kind=kind,
+                                     created_at=self.start + datetime.timedelta(minutes=minutes))
+
+    def test_login_is_journaled_without_writing_the_user(self):
+        client = APIClient()
+        client.login(username=self.user.username, password='pass1234')
+        self.assertEqual(PresenceEvent.objects.filter(user=self.user, kind=PresenceEvent.LOGIN).count(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.login_count, self.user.is_online), (0, False))
+
+    def test_concurrent_sessions_are_accounted_separately(self):
+        self.event(PresenceEvent.LOGIN, 'phone', 0)
+        self.event(PresenceEvent.LOGIN, 'laptop', 1)
+        self.event(PresenceEvent.HEARTBEAT, 'laptop', 5)
+        self.event(PresenceEvent.HEARTBEAT, 'laptop', 9)
+        self.event(PresenceEvent.LOGOUT, 'phone', 10)
+        self.assertEqual(presence.flush(), 5)
+        self.assertFalse(PresenceEvent.objects.exists())
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.login_count, self.user.is_online), (2, True))
+        self.assertEqual(self.user.total_login_time, datetime.timedelta(minutes=10))
+
+        # The laptop goes silent and is closed at its last heartbeat.
+        presence.flush(now=timezone.now() + datetime.timedelta(hours=1))
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_online)
+        self.assertEqual(self.user.total_login_time, datetime.timedelta(minutes=18))
+        self.assertEqual(UserSession.objects.filter(user=self.user, ended_at__isnull=True).count(), 0)
+
+    def test_heartbeats_are_throttled_per_session(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('presence-heartbeat')
+        self.assertTrue(client.post(url).data['recorded'])
+        self.assertFalse(client.post(url).data['recorded'])
+
+    def test_presence_stats(self):
+        self.event(PresenceEvent.LOGIN, 'phone', 0)
+        self.event(PresenceEvent.LOGOUT, 'phone', 10)
+        self.event(PresenceEvent.HEARTBEAT, 'laptop', 11)
+        presence.flush()
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='manager'))
+        response = client.get(reverse('user-stats-presence'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['online'], 1)
+        self.assertEqual(response.data['active_users']['day'], 1)
+        self.assertEqual(response.data['session_durations']['<15m'], 1)
+
+
+class UserStatsTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+        for i, user in enumerate(User.objects.order_by('id')[:3]):
+            User.objects.filter(pk=user.pk).update(
+                login_count=10 * i, total_login_time=datetime.timedelta(minutes=5 * i))
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(username='manager'))
+
+    def test_summary_is_computed_in_the_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user-stats-list'), {'top_n': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), 6)
+        data = response.data
+        self.assertEqual(data['users']['total'], User.objects.count())
+        self.assertEqual(data['users']['by_role']['player']['users'], User.objects.filter(is_player=True).count())
+        self.assertEqual(data['users']['by_role']['coach']['logins'], sum(
+            User.objects.filter(is_coach=True).values_list('login_count', flat=True)))
+        self.assertEqual([row['login_seconds'] for row in data['top_login_time']], [600, 300])
+        self.assertEqual(sum(data['login_count_distribution'].values()), User.objects.count())
+        self.assertEqual(data['login_count_distribution']['11-50'], 1)
+
+    def test_summary_is_cached_until_users_change(self):
+        url = reverse('user-stats-list')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        User.objects.get(username='manager').save()
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+    def test_online_status_is_never_answered_with_304(self):
+        for url in (reverse('user-stats-list'), reverse('user-stats-detail', kwargs={'pk': User.objects.first().pk})):
+            response = self.client.get(url)
+            self.assertNotIn('ETag', response)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT').status_code,
+                             200)
+
+
+class AccessContextTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.order_by('id').first()
+        self.client = APIClient()
+        self.client.force_authenticate(self.team.coach)
+
+    def test_coaches_only_see_their_teams_games(self):
+        response = self.client.get(reverse('game-list'), {'page_size': 500})
+        own = Game.objects.filter(Q(team_a=self.team) | Q(team_b=self.team))
+        self.assertEqual({game['id'] for game in response.data['results']}, set(own.values_list('id', flat=True)))
+        other = Game.objects.exclude(Q(team_a=self.team) | Q(team_b=self.team)).first()
+        self.assertEqual(self.client.get(reverse('game-detail', kwargs={'pk': other.pk})).status_code, 404)
+
+    def test_team_ids_are_cached_until_teams_change(self):
+        url = reverse('player-get-high-scorers')
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as warm:
+            self.client.get(url)
+        self.assertEqual(len(warm), len(cold) - 1)
+
+        other = Team.objects.exclude(pk=self.team.pk).first()
+        other.coach = self.team.coach
+        other.save()
+        response = self.client.get(url)
+        self.assertEqual({team['team_id'] for team in response.data}, {self.team.pk, other.pk})
+
+    def test_high_scorer_percentile_bounds(self):
+        url = reverse('player-get-high-scorers')
+        roster = self.team.players.count()
+        everyone = self.client.get(url, {'percentile': 0}).data[0]['high_scorers']
+        self.assertEqual(len(everyone), roster)
+        self.assertEqual(everyone[-1]['percentile'], 1.0)
+        top = self.client.get(url, {'percentile': 100}).data[0]['high_scorers']
+        self.assertEqual([player['id'] for player in top],
+                         [player['id'] for player in everyone if player['percentile'] == 0])
+
+    def test_players_cannot_list_games(self):
+        self.client.force_authenticate(Player.objects.order_by('id').first().user)
+        self.assertEqual(self.client.get(reverse('game-list')).status_code, 403)
+
+
+class JWTFastPathTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.order_by('id').first()
+        self.coach = self.team.coach
+
+    def token(self, user):
+        response = APIClient().post(reverse('jwt-create'), {'username': user.username, 'password': 'pass1234'})
+        return response.data['access']
+
+    def authenticate(self, token, method='get'):
+        request = Request(getattr(APIRequestFactory(), method)('/', HTTP_AUTHORIZATION=f'JWT {token}'))
+        user, _ = LeagueJWTAuthentication().authenticate(request)
+        request.user = user
+        return request
+
+    def test_reads_authenticate_from_claims_without_queries(self):
+        token = self.token(self.coach)
+        # The first read confirms the revocation state from the table; later ones use the auth cache.
+        with self.assertNumQueries(1):
+            self.authenticate(token)
+        with self.assertNumQueries(0):
+            request = self.authenticate(token)
+            access = get_access(request)
+            self.assertTrue(access.is_coach)
+            self.assertEqual(access.coached_team_ids, {self.team.pk})
+        self.assertIsInstance(request.user, LeagueTokenUser)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+        self.assertEqual(client.get(reverse('player-get-high-scorers')).data[0]['team_id'], self.team.pk)
+
+    def test_writes_load_the_user(self):
+        request = self.authenticate(self.token(self.coach), method='post')
+        self.assertIsInstance(request.user, User)
+
+    def test_role_changes_revoke_the_claims(self):
+        token = self.token(self.coach)
+        self.coach.is_coach = False
+        self.coach.save()
+        request = self.authenticate(token)
+        self.assertIsInstance(request.user, User)
+        self.assertFalse(get_access(request).is_coach)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+        self.assertEqual(client.get(reverse('player-get-high-scorers')).status_code, 403)
+
+    def test_revocations_survive_cache_eviction_and_other_processes(self):
+        token = self.token(self.coach)
+        self.coach.is_coach = False
+        self.coach.save()
+        # Response entries evicting everything else, or a worker whose cache never saw the revocation.
+        caches['league'].clear()
+        caches['league-auth'].clear()
+        fallback_users.clear()
+        request = self.authenticate(token)
+        self.assertIsInstance(request.user, User)
+        self.assertFalse(get_access(request).is_coach)
+        self.assertTrue(ClaimsRevocation.objects.filter(user_id=self.coach.pk).exists())
+
+        # Tokens issued after the revocation are trusted again.
+        self.assertIsInstance(self.authenticate(self.token(self.coach)).user, LeagueTokenUser)
+
+    def test_populate_data_keeps_revocations_and_revokes_the_removed_users(self):
+        admin_user = User.objects.create_superuser('root', password='pass1234', is_admin=True)
+        admin_token = self.token(admin_user)
+        admin_user.is_admin = False
+        admin_user.save()
+        coach_token = self.token(self.coach)
+        with CaptureQueriesContext(connection) as queries:
+            seed_league()
+        # The users go in one statement, not one delete (and revocation) per user.
+        self.assertEqual(sum(query['sql'].startswith('DELETE FROM "league_user"') for query in queries), 1)
+        self.assertTrue(User.objects.filter(pk=admin_user.pk).exists())
+        caches['league-auth'].clear()
+        fallback_users.clear()
+        self.assertIsInstance(self.authenticate(admin_token).user, User)
+        self.assertTrue(ClaimsRevocation.objects.filter(user_id=self.coach.pk).exists())
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(coach_token)
+
+
+class SparseFieldsetTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(username='manager'))
+
+    def assertRendersSame(self, fast, serialized):
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(serialized))
+
+    def test_readers_match_the_shaped_serializers(self):
+        shapes = [
+            Shape(expand=frozenset()),
+            Shape(fields=frozenset({'id', 'name', 'players'})),
+            Shape(fields=frozenset({'id', 'coach', 'champion', 'team_a', 'rounds', 'user'}),
+                  expand=frozenset({'team_a'})),
+        ]
+        cases = [
+            (readers.team_dicts, TeamSerializer, Team.objects.order_by('id')),
+            (readers.player_dicts, PlayerSerializer, Player.objects.order_by('id')),
+            (readers.game_dicts, GameSerializer, Game.objects.order_by('id')),
+            (readers.tournament_dicts, TournamentSerializer, Tournament.objects.order_by('id')),
+        ]
+        for shape in shapes:
+            for reader, serializer, queryset in cases:
+                with self.subTest(reader=reader.__name__, fields=shape.fields, expand=shape.expand):
+                    self.assertRendersSame(reader(queryset, shape),
+                                           serializer(queryset, many=True, context={'shape': shape}).data)
+
+    def test_unexpanded_relations_are_primary_keys(self):
+        game = Game.objects.order_by('-date', '-id').first()
+        row = self.client.get(reverse('game-list'), {'fields': 'id,team_a,team_b', 'expand': ''}).data['results'][0]
+        self.assertEqual(row, {'id': game.pk, 'team_a': game.team_a_id, 'team_b': game.team_b_id})
+
+        row = self.client.get(reverse('game-details-detail', kwargs={'pk': game.pk}), {'expand': 'team_a'}).data
+        self.assertEqual(row['team_b'], game.team_b_id)
+        self.assertEqual(row['team_a']['name'], game.team_a.name)
+
+    def test_slim_requests_skip_the_joins(self):
+        def count(name, params=None):
+            caches['league'].clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse(name), params).status_code, 200)
+            return len(queries)
+
+        slim = {'fields': 'id,date,team_a,team_b,team_a_score,team_b_score', 'expand': ''}
+        self.assertLess(count('game-list', slim), count('game-list'))
+        self.assertLess(count('game-details-list', {'expand': ''}), count('game-details-list'))
+        self.assertLess(count('tournamentround-list', {'fields': 'round_number'}), count('tournamentround-list'))
+
+    def test_snapshot_endpoints_trim_fields(self):
+        tournament = Tournament.objects.order_by('id').first()
+        url = reverse('tournament-detail', kwargs={'pk': tournament.pk})
+        full = self.client.get(url)
+        slim = self.client.get(url, {'fields': 'id,name'})
+        self.assertEqual(slim.data, {'id': tournament.pk, 'name': tournament.name})
+        self.assertNotEqual(slim['ETag'], full['ETag'])
+
+
+class EagerLoadingTests(LeagueTestCase):
+    """
+    Every viewset's get_queryset loads what its serializer renders, so the serializer
+    path costs the same number of queries however many rows it renders.
+    """
+    viewsets = (TeamViewSet, PlayerViewSet, GameViewSet, GameDetailsViewSet, TournamentViewSet,
+                TournamentRoundViewSet)
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    def serialize(self, viewset, params=None):
+        request = Request(APIRequestFactory().get('/', params))
+        request.user = User.objects.get(username='manager')
+        view = viewset(request=request, format_kwarg=None, action='list')
+        with CaptureQueriesContext(connection) as queries:
+            data = view.get_serializer(view.get_queryset(), many=True).data
+        return len(queries), len(data)
+
+    def test_serializer_queries_do_not_depend_on_row_count(self):
+        baseline = {viewset: self.serialize(viewset) for viewset in self.viewsets}
+        seed_league(scale=2)
+        for viewset in self.viewsets:
+            with self.subTest(viewset=viewset.__name__):
+                queries, rows = self.serialize(viewset)
+                self.assertGreater(rows, baseline[viewset][1])
+                self.assertEqual(queries, baseline[viewset][0])
+
+    def test_unexpanded_relations_cost_no_more_queries(self):
+        for viewset in self.viewsets:
+            with self.subTest(viewset=viewset.__name__):
+                full, _ = self.serialize(viewset)
+                slim, _ = self.serialize(viewset, {'expand': ''})
+                self.assertLessEqual(slim, full)
+
+    def test_page_size_does_not_change_query_count(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='manager'))
+        for name in ('game-list', 'game-details-list'):
+            counts = []
+            for page_size in (1, 5, 50):
+                caches['league'].clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(client.get(reverse(name), {'page_size': page_size}).status_code, 200)
+                counts.append(len(queries))
+            self.assertEqual(len(set(counts)), 1, f'{name}: {counts}')
+
+
+class ExportTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(username='manager'))
+
+    def export(self, name, **params):
+        response = self.client.get(reverse(f'export-{name}'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def rows(self, name, **params):
+        _, body = self.export(name, **params)
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_exports_stream_ndjson_and_csv(self):
+        response, _ = self.export('games')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        games = self.rows('games')
+        self.assertEqual([row['id'] for row in games], list(Game.objects.order_by('id').values_list('id', flat=True)))
+        game = Game.objects.select_related('team_a', 'team_b').get(pk=games[0]['id'])
+        self.assertEqual(games[0], {
+            'id': game.pk, 'season': game.season_id, 'date': game.date.isoformat(), 'location': game.location,
+            'referee': game.referee, 'team_a_id': game.team_a_id, 'team_a_name': game.team_a.name,
+            'team_b_id': game.team_b_id, 'team_b_name': game.team_b.name,
+            'team_a_score': game.team_a_score, 'team_b_score': game.team_b_score,
+        })
+        self.assertEqual(len(self.rows('scores')), Score.objects.count())
+        self.assertEqual(len(self.rows('participations')), PlayerGameParticipation.objects.count())
+
+        response, body = self.export('scores', export_format='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="scores.csv"')
+        lines = body.splitlines()
+        self.assertEqual(lines[0], 'id,season,game_id,game_date,player_id,player_name,username,team_id,team_name,score')
+        self.assertEqual(len(lines), Score.objects.count() + 1)
+
+    def test_exports_read_keyset_chunks(self):
+        expected = {name: self.rows(name) for name in ('games', 'scores', 'participations')}
+        chunk_size, exports.CHUNK_SIZE = exports.CHUNK_SIZE, 4
+        try:
+            for name, rows in expected.items():
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(self.rows(name), rows)
+                # One query per chunk of each table, with the last chunk short or empty.
+                self.assertGreaterEqual(len(queries), len(rows) // 4 + 1)
+                self.assertTrue(any('"id" >' in query['sql'] for query in queries))
+        finally:
+            exports.CHUNK_SIZE = chunk_size
+
+    def test_exports_filter_by_date_and_team(self):
+        dates = sorted(Game.objects.values_list('date', flat=True))
+        date_from, date_to = dates[len(dates) // 4], dates[3 * len(dates) // 4]
+        games = self.rows('games', date_from=date_from.isoformat(), date_to=date_to.isoformat())
+        self.assertEqual({row['id'] for row in games},
+                         set(Game.objects.filter(date__range=(date_from, date_to)).values_list('id', flat=True)))
+
+        team = Team.objects.order_by('id').first()
+        games = self.rows('games', team=team.pk)
+        self.assertTrue(games)
+        self.assertTrue(all(team.pk in (row['team_a_id'], row['team_b_id']) for row in games))
+        self.assertEqual(len(games), Game.objects.filter(Q(team_a=team) | Q(team_b=team)).count())
+        scores = self.rows('scores', team=team.pk)
+        self.assertEqual(len(scores), Score.objects.filter(player__team=team).count())
+        self.assertEqual({row['team_id'] for row in scores}, {team.pk})
+        participations = self.rows('participations', team=team.pk, date_to=date_to.isoformat())
+        self.assertEqual(len(participations),
+                         PlayerGameParticipation.objects.filter(team=team, game__date__lte=date_to).count())
+
+    def test_exports_reject_bad_params(self):
+        for params in ({'export_format': 'xml'}, {'date_from': '2020-13-01'}, {'date_to': 'yesterday'},
+                       {'team': 'first'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('export-games'), params).status_code, 400)
+
+    def test_exports_need_admin_staff(self):
+        client = APIClient()
+        client.force_authenticate(Player.objects.order_by('id').first().user)
+        self.assertEqual(client.get(reverse('export-games')).status_code, 403)
+
+
+class SeasonArchiveTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(username='manager'))
+        payload = ingest_payload()
+        for game in payload['games']:
+            game['date'] = '2020-03-01'
+        self.assertEqual(self.client.post(reverse('game-ingest'), payload, format='json').status_code, 201)
+
+    def aggregates(self):
+        return (
+            list(TeamStats.objects.order_by('team_id').values()),
+            list(Player.objects.order_by('id').values_list('score_total', 'score_count', 'games_participated')),
+            list(Standing.objects.order_by('season', 'rank').values()),
+        )
+
+    def test_rows_are_filed_under_their_games_season(self):
+        self.assertFalse(Game.objects.exclude(season_id=F('date__year')).exists())
+        for model in (Score, PlayerGameParticipation):
+            self.assertFalse(model.objects.exclude(season_id=F('game__season_id')).exists())
+
+        game = Game.objects.filter(season_id=2020).first()
+        game.date = datetime.date(2021, 5, 1)
+        game.save()
+        self.assertEqual(set(game.scores.values_list('season_id', flat=True)), {2021})
+        self.assertEqual(set(game.player_participations.values_list('season_id', flat=True)), {2021})
+
+    def test_archiving_moves_the_season_and_keeps_the_aggregates(self):
+        leaderboard = self.client.get(reverse('standings-player-leaderboard'), {'season': 2020}).data
+        before = self.aggregates()
+        call_command('archive_seasons', season=[2020], batch_size=3, stdout=StringIO())
+
+        self.assertFalse(Game.objects.filter(season_id=2020).exists())
+        self.assertFalse(Score.objects.filter(season_id=2020).exists())
+        self.assertEqual(ArchivedGame.objects.filter(season_id=2020).count(), 2)
+        self.assertEqual(ArchivedScore.objects.count(), ArchivedParticipation.objects.count())
+        self.assertEqual(self.aggregates(), before)
+
+        # Rebuilds count the archive tables.
+        TeamStats.objects.rebuild()
+        Player.objects.refresh_score_totals()
+        Player.objects.refresh_games_participated()
+        Standing.objects.rebuild()
+        self.assertEqual(self.aggregates(), before)
+
+        season = Season.objects.get(pk=2020)
+        self.assertEqual(season.summary['games'], 2)
+        self.assertEqual(season.summary['champion']['id'], Standing.objects.get(season=2020, rank=1).team_id)
+        caches['league'].clear()
+        self.assertEqual(self.client.get(reverse('standings-player-leaderboard'), {'season': 2020}).data, leaderboard)
+
+    def test_exports_include_archived_seasons_in_keyset_chunks(self):
+        def exported(name, **params):
+            response = self.client.get(reverse(f'export-{name}'), params)
+            return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+        before = {name: exported(name) for name in ('games', 'scores', 'participations')}
+        call_command('archive_seasons', season=[2020], stdout=StringIO())
+        chunk_size, exports.CHUNK_SIZE = exports.CHUNK_SIZE, 3
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                after = {name: exported(name) for name in before}
+        finally:
+            exports.CHUNK_SIZE = chunk_size
+        for name, rows in before.items():
+            self.assertEqual(sorted(after[name], key=lambda row: row['id']), rows)
+        self.assertEqual(after['games'][:2], [row for row in before['games'] if row['season'] == 2020])
+        self.assertGreater(len(queries), 6)  # more than one chunk per table
+
+        self.assertEqual({row['season'] for row in exported('games', date_to='2020-12-31')}, {2020})
+
+    def test_populate_data_spreads_games_over_calendar_year_seasons(self):
+        call_command('populate_data', teams=4, players_per_team=2, games=40, seasons=2, tournaments=2,
+                     bracket_size=4, seed=1, stdout=StringIO())
+        year = timezone.localdate().year
+        self.assertEqual(set(Season.objects.values_list('year', flat=True)), {year - 1, year})
+        self.assertEqual(set(Game.objects.values_list('season_id', flat=True)), {year - 1, year})
+        self.assertFalse(Game.objects.filter(date__gt=timezone.localdate()).exists())
+
+    def test_archived_and_running_seasons_reject_writes(self):
+        call_command('archive_seasons', season=[2020], stdout=StringIO())
+        payload = ingest_payload(games=1)
+        payload['games'][0]['date'] = '2020-06-01'
+        response = self.client.post(reverse('game-ingest'), payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date', response.data['games'][0])
+
+        with self.assertRaises(CommandError):
+            call_command('archive_seasons', season=[timezone.localdate().year], stdout=StringIO())
+
+        game = Game.objects.exclude(season_id=2020).first()
+        url = reverse('game-detail', kwargs={'pk': game.pk})
+        response = self.client.patch(url, {'date': '2020-06-01'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['date'], ['Season 2020 is archived.'])
+        self.assertEqual(self.client.patch(url, {'date': '2021-06-01'}, format='json').status_code, 200)
+
+
+class LiveUpdatesTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    async def test_broker_fans_out_by_topic_and_drops_slow_clients(self):
+        broker = live.LocalBroker(queue_size=2)
+        game, team = broker.subscribe(['game:1']), broker.subscribe(['team:2', 'team:3'])
+        self.assertEqual(broker.publish(['game:1', 'team:2'], 'score', {'game': 1}), 2)
+        self.assertEqual(broker.publish(['team:9'], 'score', {'game': 2}), 0)
+        self.assertIn('event: score', await asyncio.wait_for(game.get(), 1))
+        self.assertIn('"game": 1', await asyncio.wait_for(team.get(), 1))
+
+        for _ in range(3):
+            broker.publish(['game:1'], 'score', {'game': 1})
+        await asyncio.sleep(0)
+        self.assertIsNone(await asyncio.wait_for(game.get(), 1))
+        game.close()
+        team.close()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    async def test_stream_receives_score_deltas_after_commit(self):
+        game = await Game.objects.order_by('id').afirst()
+        user = await User.objects.aget(username='manager')
+        token = await sync_to_async(lambda: str(LeagueTokenObtainPairSerializer.get_token(user).access_token))()
+        response = await AsyncClient().get(reverse('live-updates'), {'game': game.pk},
+                                           headers={'Authorization': f'JWT {token}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        received = asyncio.Queue()
+
+        async def consume():
+            async for chunk in response.streaming_content:
+                await received.put(chunk.decode())
+        client = asyncio.create_task(consume())
+        self.assertTrue((await asyncio.wait_for(received.get(), 1)).startswith('retry:'))
+
+        def score():
+            with self.captureOnCommitCallbacks(execute=True):
+                game.team_a_score += 2
+                game.save()
+        await sync_to_async(score)()
+        event = await asyncio.wait_for(received.get(), 1)
+        self.assertIn('event: score', event)
+        self.assertIn(f'"team_a_score": {game.team_a_score}', event)
+
+        # A disconnect cancels the response task, which unsubscribes.
+        client.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await client
+        self.assertEqual(live.get_broker().subscriber_count(), 0)
+
+    def test_stream_requires_asgi_authentication_and_topics(self):
+        self.assertEqual(APIClient().get(reverse('live-updates'), {'game': 1}).status_code, 501)
+
+        async def request(**params):
+            return (await AsyncClient().get(reverse('live-updates'), params)).status_code
+        self.assertEqual(async_to_sync(request)(game=1), 401)
+        token = str(LeagueTokenObtainPairSerializer.get_token(User.objects.get(username='manager')).access_token)
+        # async_to_sync keeps the ORM calls on this thread's connection, inside the test transaction.
+        self.assertEqual(async_to_sync(request)(token=token), 400)
+        self.assertEqual(async_to_sync(request)(token=token, game='x'), 400)
+
+
+class AsyncReadTests(LeagueTestCase):
+    """
+    The async endpoints render what their DRF counterparts render.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+
+    def setUp(self):
+        super().setUp()
+        self.token = str(LeagueTokenObtainPairSerializer.get_token(
+            User.objects.get(username='manager')).access_token)
+
+    def sync_get(self, name, **kwargs):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'JWT {self.token}')
+        return client.get(reverse(name, kwargs=kwargs))
+
+    async def async_get(self, name, token=None, headers=None, **kwargs):
+        headers = {'Authorization': f'JWT {token or self.token}', **(headers or {})}
+        return await AsyncClient().get(reverse(name, kwargs=kwargs), headers=headers)
+
+    async def test_responses_match_the_drf_endpoints(self):
+        game = await Game.objects.order_by('id').afirst()
+        team = await Team.objects.order_by('id').afirst()
+        tournament = await Tournament.objects.order_by('id').afirst()
+        pairs = [
+            ('game-details-detail', 'async-game-details', {'pk': game.pk}),
+            ('team-detail', 'async-team-details', {'pk': team.pk}),
+            ('tournament-tournament-structure', 'async-tournament-structure', {'pk': tournament.pk}),
+            ('standings-list', 'async-standings', {}),
+        ]
+        for sync_name, async_name, kwargs in pairs:
+            with self.subTest(route=async_name):
+                expected = await sync_to_async(self.sync_get)(sync_name, **kwargs)
+                response = await self.async_get(async_name, **kwargs)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected.json())
+
+    async def test_snapshot_etag_and_permissions(self):
+        tournament = await Tournament.objects.order_by('id').afirst()
+        response = await self.async_get('async-tournament-structure', pk=tournament.pk)
+        cached = await self.async_get('async-tournament-structure', pk=tournament.pk,
+                                      headers={'If-None-Match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+        team = await Team.objects.select_related('coach').order_by('id').afirst()
+        coach_token = await sync_to_async(
+            lambda: str(LeagueTokenObtainPairSerializer.get_token(team.coach).access_token))()
+        self.assertEqual((await self.async_get('async-team-details', token=coach_token, pk=team.pk)).status_code,
+                         403)
+        self.assertEqual((await AsyncClient().get(reverse('async-standings'))).status_code, 401)
+        self.assertEqual((await self.async_get('async-game-details', pk=0)).status_code, 404)
+
+
+class ForecastTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league()
+        cls.teams = list(Team.objects.order_by('id').values_list('id', flat=True))
+        cls.tournament = Tournament.objects.create(name='Open', start_date=datetime.date(2024, 6, 1))
+        first_round = TournamentRound.objects.create(tournament=cls.tournament, round_number=1)
+        RoundTeam.objects.bulk_create([RoundTeam(round=first_round, team_id=team_id) for team_id in cls.teams])
+
+    def test_bracket_odds_are_exact(self):
+        ratings = {1: 1600, 2: 1500, 3: 1500, 4: 1400}
+        rounds, champion = forecast.bracket_odds([(team_id, False) for team_id in ratings], ratings)
+        win = lambda a, b: forecast.win_probability(ratings[a], ratings[b])
+        self.assertAlmostEqual(rounds[1][1], win(1, 2))
+        self.assertAlmostEqual(champion[1], win(1, 2) * (win(3, 4) * win(1, 3) + win(4, 3) * win(1, 4)))
+        self.assertAlmostEqual(sum(champion.values()), 1)
+
+        # 2 already lost to 1, and 5 has a bye into round 2.
+        entries = [(1, False), (2, True), (3, False), (4, False), (5, False)]
+        rounds, champion = forecast.bracket_odds(entries, ratings)
+        self.assertEqual(rounds[1][1], 1)
+        self.assertNotIn(2, champion)
+        self.assertEqual([round(sum(reach.values()), 9) for reach in rounds], [5, 3, 2])
+        self.assertAlmostEqual(sum(champion.values()), 1)
+
+    def test_endpoint_and_command(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='manager'))
+        url = reverse('tournament-tournament-forecast', kwargs={'pk': self.tournament.pk})
+        data = client.get(url).data
+        self.assertEqual(data['round'], 1)
+        self.assertEqual(sorted(team['team'] for team in data['teams']), self.teams)
+        self.assertAlmostEqual(sum(team['champion'] for team in data['teams']), 1)
+        ratings = forecast.team_ratings()
+        self.assertEqual([team['rating'] for team in data['teams']],
+                         [round(ratings.get(team['team'], forecast.INITIAL_RATING), 1) for team in data['teams']])
+        self.assertEqual(client.get(reverse('tournament-tournament-forecast', kwargs={'pk': 0})).status_code, 404)
+
+        loser = RoundTeam.objects.get(round__tournament=self.tournament, team_id=self.teams[1])
+        loser.eliminated = True
+        loser.save()
+        data = client.get(url).data
+        self.assertNotIn(self.teams[1], [team['team'] for team in data['teams']])
+        first = next(team for team in data['teams'] if team['team'] == self.teams[0])
+        self.assertEqual(first['rounds'][2], 1)
+
+        out = StringIO()
+        call_command('forecast_tournament', self.tournament.pk, stdout=out)
+        self.assertIn('champion', out.getvalue())
+
+    def test_closed_seasons_are_rated_once(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='manager'))
+        payload = ingest_payload()
+        for game in payload['games']:
+            game['date'] = '2020-03-01'
+        self.assertEqual(client.post(reverse('game-ingest'), payload, format='json').status_code, 201)
+        ratings = forecast.team_ratings()
+        self.assertEqual(set(TeamRating.objects.values_list('season', flat=True)), {2020})
+
+        # Stored seasons are not replayed.
+        caches['league'].clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(forecast.team_ratings(), ratings)
+        self.assertEqual([query['sql'] for query in queries if 'season_id" = 2020' in query['sql']], [])
+
+        # A changed game drops its season's ratings, and the next read replays it.
+        game = Game.objects.filter(season_id=2020).first()
+        Game.objects.filter(pk=game.pk).update(team_a_score=0, team_b_score=99)
+        self.assertFalse(TeamRating.objects.exists())
+        replayed = forecast.team_ratings()
+        self.assertLess(replayed[game.team_a_id], ratings[game.team_a_id])
+        expected = {}
+        for model in (ArchivedGame, Game):
+            forecast.replay(expected, model.objects.order_by('season_id'))
+        self.assertEqual(replayed, expected)
+
+
+class DistributionTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league(scale=2)
+
+    def test_percentiles_match_reference(self):
+        data = distributions.distribution('points', group_by='team', percentiles=[50, 90])
+        self.assertEqual(len(data['groups']), Team.objects.filter(playergameparticipation__isnull=False)
+                         .distinct().count())
+        for group in data['groups']:
+            values = list(PlayerGameParticipation.objects.filter(team=group['team'])
+                          .values_list('points_scored', flat=True))
+            self.assertEqual(group['count'], len(values))
+            self.assertAlmostEqual(group['mean'], statistics.mean(values))
+            self.assertEqual(group['median'], statistics.median(values))
+            self.assertEqual(group['percentiles']['50'], group['median'])
+            for quartile, expected in zip(group['quantiles'], statistics.quantiles(values, n=4, method='inclusive')):
+                self.assertAlmostEqual(quartile, expected)
+            self.assertEqual(sum(group['histogram']), len(values))
+        self.assertEqual(len(data['bin_edges']), 11)
+
+    def test_archived_seasons_are_included(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='manager'))
+        payload = ingest_payload()
+        for game in payload['games']:
+            game['date'] = '2020-03-01'
+        self.assertEqual(client.post(reverse('game-ingest'), payload, format='json').status_code, 201)
+        queries = [('points', 'season'), ('points', None), ('score', 'team')]
+        before = [distributions.distribution(metric, group_by=group_by) for metric, group_by in queries]
+        self.assertIn(2020, [group['season'] for group in before[0]['groups']])
+
+        call_command('archive_seasons', season=[2020], stdout=StringIO())
+        for (metric, group_by), expected in zip(queries, before):
+            with self.subTest(metric=metric, group_by=group_by):
+                data = distributions.distribution(metric, group_by=group_by)
+                for group, expected_group in zip(data['groups'], expected['groups']):
+                    self.assertAlmostEqual(group.pop('mean'), expected_group.pop('mean'))
+                self.assertEqual(data, expected)
+        season = distributions.distribution('points', season=2020)['groups'][0]
+        self.assertEqual(season['count'], ArchivedParticipation.objects.count())
+
+    def test_percentile_pass_reads_keyset_chunks(self):
+        expected = distributions.distribution('score', group_by='team', percentiles=[1, 50, 99])
+        caches['league'].clear()
+        chunk_size, distributions.CHUNK_SIZE = distributions.CHUNK_SIZE, 7
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                chunked = distributions.distribution('score', group_by='team', percentiles=[1, 50, 99])
+        finally:
+            distributions.CHUNK_SIZE = chunk_size
+        self.assertEqual(chunked, expected)
+        ordered = [query for query in queries if 'ORDER BY' in query['sql'] and 'LIMIT 7' in query['sql']]
+        self.assertGreater(len(ordered), Score.objects.count() // 7)
+
+    def test_native_percentile_sql(self):
+        queryset = PlayerGameParticipation.objects.values('team').annotate(p=Percentile('points_scored', 0.5))
+        self.assertIn('PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY', str(queryset.query))
+
+    def test_results_are_cached_per_version(self):
+        before = distributions.distribution('score', group_by='season')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(distributions.distribution('score', group_by='season'), before)
+        self.assertEqual(len(queries), 1)
+
+        score = Score.objects.order_by('-score').first()
+        score.score += 100
+        score.save()
+        after = distributions.distribution('score', group_by='season')
+        self.assertNotEqual(after['bin_edges'][-1], before['bin_edges'][-1])
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(Player.objects.order_by('id').first().user)
+        url = reverse('distributions-list')
+        response = client.get(url, {'metric': 'height', 'group_by': 'team', 'bins': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(sum(group['histogram']) for group in response.data['groups']), Player.objects.count())
+        for params in ({'metric': 'height', 'season': 2024}, {'metric': 'weight'}, {'bins': 0},
+                       {'percentiles': 'high'}, {'group_by': 'player'}):
+            with self.subTest(params=params):
+                self.assertEqual(client.get(url, params).status_code, 400)
+
+
+class SearchTests(LeagueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_league(scale=3)
+
+    def labels(self, query, kinds=None):
+        return [row['label'] for row in SearchEntry.objects.lookup(query, kinds, limit=50)]
+
+    def test_prefix_and_typeahead_matching(self):
+        self.assertEqual(self.labels('team 1', ['team']), ['Team 1', 'Team 10', 'Team 11', 'Team 12'])
+        self.assertEqual(self.labels('player 2 of team 12'), ['Player 2 of Team 12'])
+        self.assertIn('Player 3 of Team 4', self.labels('3 of tea'))
+        self.assertEqual(self.labels('team 1 of'), [])
+        self.assertEqual(self.labels('  '), [])
+        plan = str(SearchEntry.objects.matching('team').order_by('term').explain())
+        self.assertIn('league_sear_term', plan)
+
+    def test_signals_keep_the_index_current(self):
+        team = Team.objects.get(name='Team 2')
+        team.name = 'Zoë O\'Neil Rockets'
+        team.save()
+        self.assertEqual(self.labels('zoe o ne'), ['Zoë O\'Neil Rockets'])
+        self.assertEqual(self.labels('rock'), ['Zoë O\'Neil Rockets'])
+        self.assertNotIn('Team 2', self.labels('team 2', ['team']))
+
+        player = Player.objects.get(name='Player 1 of Team 1')
+        user = player.user
+        player.delete()
+        self.assertEqual(self.labels('player 1 of team 1'), ['Player 1 of Team 10', 'Player 1 of Team 11',
+                                                              'Player 1 of Team 12'])
+        user.last_login = timezone.now()
+        with CaptureQueriesContext(connection) as queries:
+            user.save(update_fields=['last_login'])
+        self.assertFalse([query for query in queries if 'league_search_index' in query['sql']])
+
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='manager'))
+        payload = ingest_payload(games=1)
+        payload['games'][0]['location'] = 'Riverside Arena'
+        self.assertEqual(client.post(reverse('game-ingest'), payload, format='json').status_code, 201)
+        game = Game.objects.get(location='Riverside Arena')
+        self.assertEqual(SearchEntry.objects.lookup('riverside'), [
+            {'kind': 'game', 'id': game.pk, 'field': 'location', 'label': 'Riverside Arena'}])
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(Player.objects.order_by('id').first().user)
+        url = reverse('search-list')
+        response = client.get(url, {'q': 'team 3', 'kind': 'team,tournament', 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['kind'] for row in response.data], ['team'])
+        self.assertEqual(len(client.get(url, {'q': 'player', 'limit': 500}).data), 50)
+        self.assertEqual(client.get(url, {'q': 'x', 'kind': 'score'}).status_code, 400)
+        self.assertEqual(client.get(url, {'q': 'x', 'limit': 'many'}).status_code, 400)
+
+    def test_admin_changelists_search_the_index(self):
+        players, _ = PlayerAdmin(Player, admin.site).get_search_results(None, Player.objects.all(), 'player 2 of team 5')
+        self.assertEqual([player.name for player in players], ['Player 2 of Team 5'])
+
+        team = Team.objects.get(name='Team 7')
+        games, _ = GameAdmin(Game, admin.site).get_search_results(None, Game.objects.all(), 'team 7')
+        self.assertEqual(set(games), set(Game.objects.filter(Q(team_a=team) | Q(team_b=team))))
+
+        user = Player.objects.get(name='Player 2 of Team 5').user
+        user.email = 'point.guard@example.com'
+        user.save()
+        users, _ = UserAdmin(User, admin.site).get_search_results(None, User.objects.all(), 'guard@example')
+        self.assertEqual(list(users), [user])
+
+        game = Score.objects.order_by('id').first().game
+        scores = ScoreAdmin(Score, admin.site)
+        for term in (f'{game.date:%Y}', f'{game.date:%Y-%m}', f'{game.date:%Y-%m-%d}'):
+            found, _ = scores.get_search_results(None, Score.objects.all(), term)
+            self.assertIn(game, {score.game for score in found})
+        found, _ = scores.get_search_results(None, Score.objects.all(), f'{game.date:%Y}-13')
+        self.assertFalse(found.exists())
+
+    def test_lookup_fills_the_limit_with_distinct_objects(self):
+        # The first game's six rows sort before any other game's, filling the first window.
+        first, *others = Game.objects.order_by('id')[:3]
+        Game.objects.filter(pk=first.pk).update(location='dup a dup b dup c', referee='dup a dup b dup c')
+        Game.objects.filter(pk__in=[game.pk for game in others]).update(location='dup d')
+        SearchEntry.objects.rebuild([Game])
+        self.assertEqual([row['id'] for row in SearchEntry.objects.lookup('dup', ['game'], limit=2)],
+                         [first.pk, others[0].pk])
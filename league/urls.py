@@ -2,7 +2,9 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TeamViewSet, PlayerViewSet, GameViewSet, GameDetailsViewSet, UserStatisticsViewSet, TournamentViewSet, TournamentRoundViewSet
+from . import async_views
+from .views import TeamViewSet, PlayerViewSet, GameViewSet, GameDetailsViewSet, UserStatisticsViewSet, TournamentViewSet, TournamentRoundViewSet, \
+    ExportViewSet, CacheStatsViewSet, StandingViewSet, DistributionViewSet, SearchViewSet, PresenceViewSet, live_updates
 
 router = DefaultRouter()
 router.register(r'teams', TeamViewSet)
@@ -12,10 +14,22 @@ router.register(r'tournaments', TournamentViewSet)
 router.register(r'tournament_rounds', TournamentRoundViewSet)
 router.register(r'game-details', GameDetailsViewSet, basename='game-details')
 router.register(r'user-stats', UserStatisticsViewSet, basename='user-stats')
+router.register(r'standings', StandingViewSet, basename='standings')
+router.register(r'distributions', DistributionViewSet, basename='distributions')
+router.register(r'search', SearchViewSet, basename='search')
+router.register(r'presence', PresenceViewSet, basename='presence')
+router.register(r'export', ExportViewSet, basename='export')
+router.register(r'cache-stats', CacheStatsViewSet, basename='cache-stats')
 
 # from pprint import pprint
 # pprint(router.urls)
 
 urlpatterns = [
+    path('live/', live_updates, name='live-updates'),
+    path('async/game-details/<int:pk>/', async_views.game_details, name='async-game-details'),
+    path('async/teams/<int:pk>/', async_views.team_details, name='async-team-details'),
+    path('async/tournaments/<int:pk>/tournament-structure/', async_views.tournament_structure,
+         name='async-tournament-structure'),
+    path('async/standings/', async_views.standings, name='async-standings'),
     path('', include(router.urls)),
 ]
@@ -0,0 +1,95 @@
+# user_stats.py
+#
+# Usage statistics over all users, computed in the database with a handful of grouped
+# aggregates, so the cost does not depend on paging through the user table.
+
+import datetime
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from .models import User, UserSession
+
+ROLES = ('admin', 'coach', 'player')
+
+# (label, lowest, highest) login counts; None is unbounded.
+LOGIN_COUNT_BUCKETS = (
+    ('0', 0, 0),
+    ('1', 1, 1),
+    ('2-5', 2, 5),
+    ('6-10', 6, 10),
+    ('11-50', 11, 50),
+    ('51-100', 51, 100),
+    ('101+', 101, None),
+)
+
+
+def _seconds(duration):
+    return int(duration.total_seconds()) if duration else 0
+
+
+def role_totals():
+    """
+    (total users, per-role users/logins/login time), from one GROUP BY over the role flags.
+    A user with several roles counts towards each of them; 'none' has no role at all.
+    """
+    total = 0
+    totals = {role: {'users': 0, 'logins': 0, 'login_seconds': 0} for role in ROLES + ('none',)}
+    rows = User.objects.order_by().values('is_admin', 'is_coach', 'is_player').annotate(
+        users=Count('id'), logins=Sum('login_count'), login_time=Sum('total_login_time'))
+    for row in rows:
+        total += row['users']
+        for role in [role for role in ROLES if row[f'is_{role}']] or ['none']:
+            totals[role]['users'] += row['users']
+            totals[role]['logins'] += row['logins'] or 0
+            totals[role]['login_seconds'] += _seconds(row['login_time'])
+    return total, totals
+
+
+def top_login_time(top_n):
+    rows = User.objects.order_by('-total_login_time', 'id').values(
+        'id', 'username', 'login_count', 'total_login_time')[:top_n]
+    return [
+        {
+            'id': row['id'],
+            'username': row['username'],
+            'logins': row['login_count'],
+            'login_seconds': _seconds(row['total_login_time']),
+        }
+        for row in rows
+    ]
+
+
+def login_count_distribution():
+    buckets = {}
+    for label, lowest, highest in LOGIN_COUNT_BUCKETS:
+        condition = Q(login_count__gte=lowest)
+        if highest is not None:
+            condition &= Q(login_count__lte=highest)
+        buckets[label] = Count('id', filter=condition)
+    return User.objects.aggregate(**buckets)
+
+
+def online_users(limit):
+    """
+    Users with an open session seen within the presence timeout, as of the last flush.
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.LEAGUE_PRESENCE_TIMEOUT)
+    sessions = UserSession.objects.filter(ended_at__isnull=True, last_seen_at__gte=cutoff)
+    count = sessions.aggregate(n=Count('user', distinct=True))['n']
+    users = sessions.order_by('user__username').values('user_id', 'user__username').distinct()[:limit]
+    return count, [{'id': row['user_id'], 'username': row['user__username']} for row in users]
+
+
+def summary(top_n=10):
+    total, roles = role_totals()
+    online_count, online = online_users(limit=top_n)
+    return {
+        'users': {
+            'total': total,
+            'online': online_count,
+            'by_role': roles,
+        },
+        'top_login_time': top_login_time(top_n),
+        'login_count_distribution': login_count_distribution(),
+        'online_users': online,
+    }
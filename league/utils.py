@@ -1,10 +1,19 @@
 # utils.py
 
-from django.db.models import Func
+from django.db.models import Aggregate, FloatField
 
-class Percentile(Func):
+# Backends with the ordered-set aggregate PERCENTILE_CONT(...) WITHIN GROUP (ORDER BY ...).
+PERCENTILE_VENDORS = ('postgresql', 'oracle')
+
+
+class Percentile(Aggregate):
+    """
+    Continuous percentile (0-1) of the expression within each group; only on PERCENTILE_VENDORS.
+    """
     function = 'PERCENTILE_CONT'
+    name = 'Percentile'
     template = "%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
 
     def __init__(self, expression, percentile, **extra):
-        super().__init__(expression, percentile=percentile, **extra)
+        super().__init__(expression, percentile=float(percentile), **extra)
@@ -1,142 +1,638 @@
 # views.py
 
-from django.db.models import Avg, Window, F, Prefetch
-from django.db.models.functions import PercentRank
-from .models import User, Team, Player, Game, Tournament, TournamentRound, RoundTeam
+import asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Window, F, FloatField, Prefetch, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf, PercentRank, RowNumber
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from .models import User, Team, Player, Game, Score, Tournament, TournamentRound, RoundTeam, Standing, \
+    PlayerGameParticipation, UserSession, Season, ArchivedParticipation, SearchEntry
 from .serializers import TeamSerializer, PlayerSerializer, GameSerializer, \
         GameDetailsSerializer, UserStatisticsSerializer, TournamentSerializer, \
-        TournamentRoundSerializer
+        TournamentRoundSerializer, GameResultSerializer
 from .permissions import IsAdminOrReadOnly, IsAdminStaff, IsAdminOrCoach, IsAuthenticated
+from .pagination import GameKeysetPagination
+from .access import get_access, get_view_access
+from .caching import ConditionalGetMixin, cache_response, cache_stats
+from .fieldsets import FULL, ShapeMixin
+from . import distributions, exports, forecast, ingest, live, presence, readers, user_stats
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
 
-class TeamViewSet(viewsets.ModelViewSet):
+def eager_team(queryset, path='', shape=FULL):
+    """
+    Loads what TeamSerializer renders for the team at `path` (e.g. 'team_a__') with the
+    rows of `queryset`: stats and coach joined, players and their users prefetched.
+    The shape only applies to a top-level team; nested teams are rendered in full.
+    """
+    if shape.wants('average_score'):
+        queryset = queryset.select_related(f'{path}stats')
+    if shape.expands('coach'):
+        queryset = queryset.select_related(f'{path}coach')
+    if shape.expands('players'):
+        queryset = queryset.prefetch_related(
+            Prefetch(f'{path}players', queryset=eager_player(Player.objects.order_by('id'))))
+    elif shape.wants('players'):
+        queryset = queryset.prefetch_related(Prefetch(f'{path}players', queryset=Player.objects.order_by('id')))
+    return queryset
+
+
+def eager_player(queryset, shape=FULL):
+    # Averages come from the denormalized score totals, so only the user needs a join.
+    return queryset.select_related('user') if shape.expands('user') else queryset
+
+
+def eager_round_teams():
+    return Prefetch('roundteam_set', queryset=eager_team(RoundTeam.objects.order_by('id'), 'team__'))
+
+
+class FastReadMixin(ShapeMixin):
+    """
+    Serves GET list/retrieve from `fast_reader`, a function in readers.py that maps a
+    queryset and the request's shape to serializer-shaped dicts. Writes still go
+    through serializer_class.
+    """
+    fast_reader = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.fast_reader(page, self.get_shape()))
+        return Response(self.fast_reader(queryset, self.get_shape()))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            rows = self.fast_reader(queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]}),
+                                    self.get_shape())
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if not rows:
+            raise Http404
+        return Response(rows[0])
+
+
+class TeamViewSet(ConditionalGetMixin, FastReadMixin, viewsets.ModelViewSet):
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
     permission_classes = [IsAdminStaff]
+    fast_reader = staticmethod(readers.team_dicts)
+    version_models = (User, Team, Player, Game, Score)
+
+    def get_queryset(self):
+        return eager_team(super().get_queryset(), shape=self.get_shape())
     
     @action(detail=False, methods=['get'], url_path='my-team-details', permission_classes=[IsAdminOrCoach])
+    @cache_response(User, Team, Player, Game, Score, scope='role', name='team-details')
     def all_team_details(self, request):
         """
         Custom endpoint for managers to view all teams with player details and average scores.
         For coaches, it shows only the teams they coach.
         """
-        if request.user.is_admin:
-            teams = self.get_queryset()  # Admins can see all teams
-        else:
-            teams = request.user.coached_teams.all()  # Coaches can see only their teams
-
-        serializer = self.get_serializer(teams, many=True)
-        return Response(serializer.data)
+        # Admins can see all teams; coaches see only their teams
+        teams = get_access(request).coached_teams(self.get_queryset())
+        return Response(readers.team_dicts(teams, self.get_shape()))
 
 
-class PlayerViewSet(viewsets.ModelViewSet):
+class PlayerViewSet(ConditionalGetMixin, FastReadMixin, viewsets.ModelViewSet):
     queryset = Player.objects.all()
     serializer_class = PlayerSerializer
     permission_classes = [IsAdminStaff]
+    fast_reader = staticmethod(readers.player_dicts)
+    version_models = (User, Team, Player, Score)
+
+    def get_queryset(self):
+        return eager_player(super().get_queryset(), shape=self.get_shape())
 
     @action(detail=False, methods=['get'], url_path='my-info', permission_classes=[IsAuthenticated])
     def get_my_info(self, request):
         """
         Endpoint for a player to view their own details.
         """
-        player = self.queryset.filter(user=request.user).first()
+        player = readers.player_dicts(Player.objects.filter(user_id=request.user.pk)[:1], self.get_shape())
         if not player:
             return Response({'error': 'Player not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = self.get_serializer(player)
-        return Response(serializer.data)
+        return Response(player[0])
 
     @action(detail=False, methods=['GET'], url_path='my-players')
     def get_coach_players(self, request):
-        teams = request.user.coached_teams.all()
-        if not teams.exists():
+        team_ids = get_access(request).coached_team_ids
+        if not team_ids:
             return Response({'error': 'No teams found for this coach'}, status=status.HTTP_404_NOT_FOUND)
-        players = Player.objects.filter(team__in=teams).select_related('user')
-        serializer = self.get_serializer(players, many=True)
-        return Response(serializer.data)
+        players = Player.objects.filter(team_id__in=team_ids)
+        return Response(readers.player_dicts(players, self.get_shape()))
     
     @action(detail=False, methods=['get'], url_path='high-scorers', permission_classes=[IsAdminOrCoach])
     def get_high_scorers(self, request):
         """
         Endpoint for a coach to view players whose average scores are in the 90th percentile or higher within their teams.
+        Query params: `percentile` (0-100, default 90) and `top_n` (per team cap).
+        Admins see every team, or one league-wide ranking with `scope=league`.
         """
+        try:
+            percentile = float(request.query_params.get('percentile', 90))
+            top_n = request.query_params.get('top_n')
+            top_n = int(top_n) if top_n is not None else None
+        except ValueError:
+            return Response({'error': 'percentile and top_n must be numeric'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 <= percentile <= 100 or (top_n is not None and top_n < 1):
+            return Response({'error': 'percentile must be within 0-100 and top_n positive'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        # Assuming a coach might have multiple teams, this endpoint now fetches high scorers for all their teams.
-        coached_teams = request.user.coached_teams.all()
-        if not coached_teams:
-            return Response({'error': 'No teams found for this coach'}, status=status.HTTP_404_NOT_FOUND)
+        access = get_access(request)
+        league_wide = access.is_admin and request.query_params.get('scope') == 'league'
+        if league_wide:
+            players = Player.objects.all()
+            partition = {}
+        else:
+            teams = list(access.coached_teams().order_by('id').values_list('id', 'name'))
+            if not teams:
+                return Response({'error': 'No teams found for this coach'}, status=status.HTTP_404_NOT_FOUND)
+            players = Player.objects.filter(team__in=[team_id for team_id, _ in teams])
+            partition = {'partition_by': F('team')}
 
-        high_scorers_list = []
-        for team in coached_teams:
-            players = Player.objects.filter(team=team).annotate(
-                avg_score=Avg('scores__score'),
-                percentile=Window(
-                    expression=PercentRank(),
-                    order_by=F('avg_score').desc()
-                )
-            )
-            high_scorers = players.filter(percentile__lt=0.1)  # get top 10%
-            high_scorers_data = PlayerSerializer(high_scorers, many=True).data
-            high_scorers_list.append({
-                'team_id': team.id,
-                'team_name': team.name,
-                'high_scorers': high_scorers_data
-            })
-
-        return Response(high_scorers_list)
-
-
-class GameViewSet(viewsets.ModelViewSet):
+        players = players.annotate(
+            avg_score=Coalesce(Cast('score_total', FloatField()) / NullIf('score_count', 0), 0.0),
+        ).annotate(
+            percentile=Window(expression=PercentRank(), order_by=F('avg_score').desc(), **partition),
+            rank=Window(expression=RowNumber(), order_by=[F('avg_score').desc(), F('id').asc()], **partition),
+        ).filter(percentile__lte=(100 - percentile) / 100)
+        if top_n is not None:
+            players = players.filter(rank__lte=top_n)
+        rows = players.order_by(*(['rank'] if league_wide else ['team_id', 'rank'])).values_list(
+            'id', 'name', 'team_id', 'team__name', 'avg_score', 'percentile', 'rank')
+
+        if league_wide:
+            return Response([
+                {'id': player_id, 'name': name, 'team_id': team_id, 'team_name': team_name,
+                 'average_score': avg_score, 'percentile': percent_rank, 'rank': rank}
+                for player_id, name, team_id, team_name, avg_score, percent_rank, rank in rows
+            ])
+
+        high_scorers_by_team = {team_id: [] for team_id, _ in teams}
+        for player_id, name, team_id, _, avg_score, percent_rank, rank in rows:
+            high_scorers_by_team[team_id].append(
+                {'id': player_id, 'name': name, 'average_score': avg_score, 'percentile': percent_rank, 'rank': rank})
+
+        return Response([
+            {'team_id': team_id, 'team_name': team_name, 'high_scorers': high_scorers_by_team[team_id]}
+            for team_id, team_name in teams
+        ])
+
+
+class GameViewSet(ConditionalGetMixin, FastReadMixin, viewsets.ModelViewSet):
     queryset = Game.objects.all()
     serializer_class = GameSerializer
     permission_classes = [IsAdminOrCoach]
+    pagination_class = GameKeysetPagination
+    fast_reader = staticmethod(readers.game_dicts)
+    version_models = (User, Team, Player, Game, Score)
 
+    def get_queryset(self):
+        # Coaches only see and edit games their teams played in.
+        queryset = get_access(self.request).filter(super().get_queryset(), 'team_a', 'team_b')
+        shape = self.get_shape()
+        for side in ('team_a', 'team_b'):
+            if shape.expands(side):
+                queryset = eager_team(queryset, f'{side}__')
+        return queryset
 
-class GameDetailsViewSet(ReadOnlyModelViewSet):
-    queryset = Game.objects.all().select_related('team_a', 'team_b').prefetch_related('team_a__players', 'team_b__players')
+    @action(detail=False, methods=['post'], url_path='ingest', url_name='ingest',
+            permission_classes=[IsAdminOrReadOnly])
+    def ingest_results(self, request):
+        """
+        Records a batch of finished games with their box scores:
+        {"games": [{"source_ref", "date", "location", "referee", "team_a", "team_b",
+                    "team_a_score", "team_b_score", "box_score": [{"player", "points_scored", "score"}]}]}
+        """
+        games = request.data.get('games') if isinstance(request.data, dict) else None
+        if not isinstance(games, list) or not games:
+            return Response({'error': 'Expected a non-empty "games" list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(games) > ingest.MAX_GAMES:
+            return Response({'error': f'At most {ingest.MAX_GAMES} games per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        serializer = GameResultSerializer(data=games, many=True)
+        if not serializer.is_valid():
+            return Response({'games': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        game_ids = ingest.ingest_games(serializer.validated_data)
+        return Response({'created': len(game_ids), 'games': game_ids}, status=status.HTTP_201_CREATED)
+
+
+class GameDetailsViewSet(ConditionalGetMixin, ShapeMixin, ReadOnlyModelViewSet):
+    queryset = Game.objects.all()
     serializer_class = GameDetailsSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = GameKeysetPagination
+    version_models = (User, Team, Player, Game)
+
+    def get_queryset(self):
+        # Only join the sides that are rendered; the winner needs both team rows.
+        shape = self.get_shape()
+        queryset = super().get_queryset()
+        for side in ('team_a', 'team_b'):
+            if shape.expands(side):
+                queryset = queryset.select_related(f'{side}__coach').prefetch_related(
+                    Prefetch(f'{side}__players', queryset=Player.objects.order_by('id')))
+            elif shape.wants('winner'):
+                queryset = queryset.select_related(side)
+        return queryset
+
+    @cache_response(User, Team, Player, Game, name='game-details-list')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(User, Team, Player, Game, name='game-details-detail')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
 
-class TournamentRoundViewSet(viewsets.ModelViewSet):
-    queryset = TournamentRound.objects.all().prefetch_related('roundteam_set__team')
+class TournamentRoundViewSet(ConditionalGetMixin, ShapeMixin, viewsets.ModelViewSet):
+    queryset = TournamentRound.objects.all()
     serializer_class = TournamentRoundSerializer
     permission_classes = [IsAdminOrReadOnly]
+    version_models = (User, Team, Player, Game, Score, TournamentRound, RoundTeam)
+
+    def get_queryset(self):
+        shape = self.get_shape()
+        queryset = super().get_queryset()
+        if shape.expands('teams'):
+            return queryset.prefetch_related(eager_round_teams())
+        if shape.wants('teams'):
+            return queryset.prefetch_related(Prefetch('roundteam_set', queryset=RoundTeam.objects.order_by('id')))
+        return queryset
+
+    @cache_response(*version_models, name='tournament-rounds-list')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
+    @cache_response(*version_models, name='tournament-rounds-detail')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
-class TournamentViewSet(viewsets.ModelViewSet):
-    queryset = Tournament.objects.all().prefetch_related(
-        Prefetch('rounds', queryset=TournamentRound.objects.order_by('round_number')),
-        'rounds__roundteam_set__team'
-    )
+
+class TournamentViewSet(ConditionalGetMixin, FastReadMixin, viewsets.ModelViewSet):
+    queryset = Tournament.objects.all()
     serializer_class = TournamentSerializer
     permission_classes = [IsAdminStaff]
+    fast_reader = staticmethod(readers.tournament_dicts)
+    version_models = (User, Team, Player, Game, Score, Tournament, TournamentRound, RoundTeam)
+    # retrieve and tournament-structure carry the snapshot's own ETag.
+    conditional_actions = ('list', 'list_tournament_ids')
+
+    def get_queryset(self):
+        shape = self.get_shape()
+        queryset = super().get_queryset()
+        if shape.expands('champion'):
+            queryset = eager_team(queryset, 'champion__')
+        rounds = TournamentRound.objects.order_by('round_number')
+        if shape.expands('rounds'):
+            rounds = rounds.prefetch_related(eager_round_teams())
+        if shape.wants('rounds'):
+            queryset = queryset.prefetch_related(Prefetch('rounds', queryset=rounds))
+        return queryset
 
     @action(detail=False, methods=['get'], url_path='list-ids')
     def list_tournament_ids(self, request):
         tournament_ids = list(Tournament.objects.values_list('id', flat=True))
         return Response(tournament_ids)
     
+    def snapshot_response(self, request, pk, select=lambda payload: payload):
+        """
+        The snapshot is stored fully expanded, so only `?fields=` applies here.
+        """
+        snapshot = readers.tournament_snapshot(pk)
+        if snapshot is None:
+            raise Http404
+        shape = self.get_shape()
+        etag = f'"{snapshot.etag}"' if shape.fields is None else \
+            f'"{snapshot.etag}-{",".join(sorted(shape.fields))}"'
+        headers = {'ETag': etag, 'X-Snapshot-Version': str(snapshot.version)}
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        body = select(snapshot.payload)
+        body = [shape.trim(row) for row in body] if isinstance(body, list) else shape.trim(body)
+        return Response(body, headers=headers)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Served from the tournament's materialized snapshot.
+        """
+        try:
+            pk = int(kwargs['pk'])
+        except ValueError:
+            raise Http404
+        return self.snapshot_response(request, pk)
+
     @action(detail=True, methods=['get'], url_path='tournament-structure', permission_classes=[IsAuthenticated])
     def tournament_structure(self, request, pk=None):
         """
         Custom endpoint to view the structure of a tournament including rounds, teams, and players without details.
+        Served from the tournament's materialized snapshot.
         """
-        tournament = self.get_object()
-        rounds = tournament.rounds.all()
-        serializer = TournamentRoundSerializer(rounds, many=True)
-        return Response(serializer.data)
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+        return self.snapshot_response(request, pk, select=lambda payload: payload['rounds'])
 
+    @action(detail=True, methods=['get'], url_path='forecast', permission_classes=[IsAuthenticated])
+    @cache_response(Team, Game, Tournament, TournamentRound, RoundTeam, name='tournament-forecast')
+    def tournament_forecast(self, request, pk=None):
+        """
+        Each remaining team's probability of reaching every later round and of becoming
+        champion, from Elo ratings over the game history.
+        """
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+        data = forecast.forecast(pk)
+        if data is None:
+            raise Http404
+        return Response(data)
 
 
-class UserStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
+class UserStatisticsViewSet(ShapeMixin, viewsets.ReadOnlyModelViewSet):
+    # No conditional GETs: who is online changes as sessions go silent, without any write
+    # that would bump a model version, so a 304 could confirm a stale online status.
     queryset = User.objects.all()
     serializer_class = UserStatisticsSerializer
     permission_classes = [IsAdminStaff]
 
     def get_queryset(self):
-        return User.objects.all()
\ No newline at end of file
+        return User.objects.all()
+
+    @cache_response(User, UserSession, name='user-stats', timeout=settings.LEAGUE_USER_STATS_CACHE_TIMEOUT)
+    def list(self, request, *args, **kwargs):
+        """
+        One summary document: users per role, top `top_n` (default 10, at most 100) by
+        login time, the login-count distribution and who is online.
+        """
+        try:
+            top_n = max(1, min(int(request.query_params.get('top_n', 10)), 100))
+        except ValueError:
+            return Response({'error': 'top_n must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(user_stats.summary(top_n=top_n))
+
+    @action(detail=False, methods=['get'])
+    def presence(self, request):
+        """
+        Online count, active users per day/week/month and the session-duration histogram
+        of the last `days` (default 30) days, as of the last presence flush.
+        """
+        try:
+            days = max(1, int(request.query_params.get('days', 30)))
+        except ValueError:
+            return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(presence.presence_stats(days=days))
+
+
+class PresenceViewSet(viewsets.ViewSet):
+    """
+    Clients POST a heartbeat every LEAGUE_PRESENCE_HEARTBEAT_INTERVAL seconds while open.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['post'])
+    def heartbeat(self, request):
+        recorded = presence.heartbeat(request.user, request)
+        presence.maybe_flush()
+        return Response({'recorded': recorded}, status=status.HTTP_202_ACCEPTED)
+
+class ExportViewSet(viewsets.ViewSet):
+    """
+    Streams flat game, score and participation rows as NDJSON (default) or CSV, archived
+    seasons included. Query params: `export_format` (ndjson/csv), `date_from`, `date_to` (YYYY-MM-DD) and `team` (id).
+    """
+    permission_classes = [IsAdminStaff]
+
+    def export(self, request, name):
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            return Response({'error': 'export_format must be ndjson or csv'}, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {}
+        try:
+            for param in ('date_from', 'date_to'):
+                if param in request.query_params:
+                    filters[param] = parse_date(request.query_params[param])
+                    if filters[param] is None:
+                        raise ValueError
+            if 'team' in request.query_params:
+                filters['team_id'] = int(request.query_params['team'])
+        except ValueError:
+            return Response({'error': 'date_from/date_to must be YYYY-MM-DD and team an id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return exports.export_response(name, export_format, **filters)
+
+    @action(detail=False, methods=['get'])
+    def games(self, request):
+        return self.export(request, 'games')
+
+    @action(detail=False, methods=['get'])
+    def scores(self, request):
+        return self.export(request, 'scores')
+
+    @action(detail=False, methods=['get'])
+    def participations(self, request):
+        return self.export(request, 'participations')
+
+
+class StandingViewSet(ConditionalGetMixin, viewsets.ViewSet):
+    """
+    Season standings, read from the precomputed Standing table. Query param `season`
+    (a year); defaults to the latest season with games.
+    """
+    permission_classes = [IsAdminOrReadOnly]
+    version_models = (Team, Player, Game, Standing, PlayerGameParticipation)
+
+    def get_season(self, request):
+        season = request.query_params.get('season')
+        return int(season) if season is not None else None
+
+    def list(self, request):
+        try:
+            season = self.get_season(request)
+        except ValueError:
+            return Response({'error': 'season must be a year'}, status=status.HTTP_400_BAD_REQUEST)
+        if season is None:
+            # The latest season, resolved inside the same query.
+            season = Subquery(Standing.objects.order_by('-season').values('season')[:1])
+        standings = Standing.objects.filter(season=season).select_related('team').order_by('rank')
+        return Response([readers.standing_dict(row) for row in standings])
+
+    @action(detail=False, methods=['get'], url_path='players')
+    @cache_response(Team, Player, Game, Standing, PlayerGameParticipation, name='player-leaderboard')
+    def player_leaderboard(self, request):
+        """
+        Players ranked by points scored in the season, from PlayerGameParticipation or,
+        for archived seasons, the archive table. Query params: `season` and `top_n` (default 10, at most 100).
+        """
+        try:
+            top_n = max(1, min(int(request.query_params.get('top_n', 10)), 100))
+            season = self.get_season(request)
+        except ValueError:
+            return Response({'error': 'season must be a year and top_n an integer'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if season is None:
+            season = Standing.objects.order_by('-season').values_list('season', flat=True).first()
+        if season is None:
+            return Response([])
+
+        archived = Season.objects.filter(pk=season, archived_at__isnull=False).exists()
+        participations = ArchivedParticipation if archived else PlayerGameParticipation
+        rows = participations.objects.filter(season_id=season) \
+            .values('player_id', 'player__name', 'player__team_id', 'player__team__name') \
+            .annotate(points=Sum('points_scored'), games=Count('id')) \
+            .order_by('-points', 'player_id')[:top_n]
+        return Response([
+            {
+                'season': season,
+                'rank': rank,
+                'player': {'id': row['player_id'], 'name': row['player__name']},
+                'team': {'id': row['player__team_id'], 'name': row['player__team__name']},
+                'points': row['points'],
+                'games': row['games'],
+                'points_per_game': round(row['points'] / row['games'], 2),
+            }
+            for rank, row in enumerate(rows, start=1)
+        ])
+
+
+class DistributionViewSet(viewsets.ViewSet):
+    """
+    Distribution statistics of `metric` (points, score or height), league-wide or per
+    `group_by` (team or season), archived seasons included. Other query params:
+    `season`, `team`, `percentiles` (comma-separated, 0-100), `quantiles` (equal-count
+    buckets, default 4) and `bins` (histogram bins, default 10).
+    """
+    permission_classes = [IsAdminOrReadOnly]
+
+    def list(self, request):
+        params = request.query_params
+        try:
+            season = int(params['season']) if 'season' in params else None
+            team = int(params['team']) if 'team' in params else None
+            percentiles = [float(value) for value in params.get('percentiles', '').split(',') if value.strip()]
+            quantiles = int(params.get('quantiles', 4))
+            bins = int(params.get('bins', 10))
+        except ValueError:
+            return Response({'error': 'season, team, percentiles, quantiles and bins must be numeric'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            data = distributions.distribution(params.get('metric', 'points'), params.get('group_by'), season, team,
+                                              percentiles or distributions.DEFAULT_PERCENTILES, quantiles, bins)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """
+    Typeahead search over player names, usernames, team and tournament names and game
+    locations and referees, from the search index. Query params: `q` (matched against
+    the text from the start of any word, so it can be typed ahead), `kind`
+    (comma-separated kinds) and `limit` (default 10, at most 50).
+    """
+    permission_classes = [IsAdminOrReadOnly]
+    max_limit = 50
+
+    def list(self, request):
+        kinds = request.query_params.get('kind')
+        if kinds is not None:
+            kinds = [kind.strip() for kind in kinds.split(',') if kind.strip()]
+            known = {kind for kind, _ in SearchEntry.KIND_CHOICES}
+            if not set(kinds) <= known:
+                return Response({'error': f"kind must be among {', '.join(sorted(known))}"},
+                                status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({'error': 'limit must be numeric'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), self.max_limit)
+        return Response(SearchEntry.objects.lookup(request.query_params.get('q', ''), kinds, limit))
+
+
+class CacheStatsViewSet(viewsets.ViewSet):
+    """
+    Response cache hit/miss counters for this process.
+    """
+    permission_classes = [IsAdminStaff]
+
+    def list(self, request):
+        return Response(cache_stats())
+
+
+def _live_access(request):
+    # EventSource cannot set headers, so ?token= is accepted too.
+    token = request.GET.get('token')
+    if token and 'HTTP_AUTHORIZATION' not in request.META:
+        request.META['HTTP_AUTHORIZATION'] = f'JWT {token}'
+    return get_view_access(request)
+
+
+def _live_topics(params):
+    topics = []
+    for kind in live.TOPIC_KINDS:
+        for value in params.getlist(kind):
+            topics.extend(live.topic(kind, int(pk)) for pk in value.split(',') if pk.strip())
+    return topics
+
+
+async def live_updates(request):
+    """
+    Server-Sent Events stream of live deltas. Query params `game`, `team` and
+    `tournament` (comma-separated ids) select the topics. Events: game, score,
+    game_deleted, box_score, round_team, and resync when the client fell behind.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Live updates are only served by the ASGI application'},
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+    try:
+        access = await sync_to_async(_live_access)(request)
+    except AuthenticationFailed as exc:
+        return JsonResponse({'error': str(exc.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if not (access.is_admin or access.is_coach or access.is_player):
+        return JsonResponse({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+    try:
+        topics = _live_topics(request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'Topic ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < len(topics) <= settings.LEAGUE_LIVE_MAX_TOPICS:
+        return JsonResponse({'error': f'Subscribe to between 1 and {settings.LEAGUE_LIVE_MAX_TOPICS} topics'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    subscription = live.get_broker().subscribe(topics)
+
+    async def events():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), timeout=settings.LEAGUE_LIVE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                if message is None:
+                    yield 'event: resync\ndata: {}\n\n'
+                    return
+                yield message
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response